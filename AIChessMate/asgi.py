@@ -4,11 +4,13 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 
 from django.core.asgi import get_asgi_application
-import chessgame.routing  # ton fichier routing.py dans chessgame/
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AIChessMate.settings')
 django.setup()
 
+# Après django.setup() : les consumers importent les modèles
+import chessgame.routing  # noqa: E402  ton fichier routing.py dans chessgame/
+
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
@@ -7,10 +7,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Sécurité
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "dev-secret-key")
-print(SECRET_KEY)
 DEBUG = os.environ.get("DEBUG", "True") == "True"
 ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "localhost").split(",")
-print(ALLOWED_HOSTS)
 
 # Applications
 INSTALLED_APPS = [
@@ -65,6 +63,25 @@ DATABASES = {
     'default': dj_database_url.config(default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'))
 }
 
+# Caches : "engine" garde les coups déjà calculés par les IA (clé : moteur,
+# position, profondeur, version du modèle). La mémoire locale (LRU) suffit
+# pour un seul processus ; pour partager les résultats entre workers, utiliser
+# par exemple django.core.cache.backends.filebased.FileBasedCache ou
+# django.core.cache.backends.db.DatabaseCache (ENGINE_CACHE_LOCATION :
+# dossier ou nom de table). Ces backends suppriment une fraction des entrées
+# quand MAX_ENTRIES est atteint, au lieu des moins récemment utilisées.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "engine": {
+        "BACKEND": os.environ.get("ENGINE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("ENGINE_CACHE_LOCATION", "engine-moves"),
+        "TIMEOUT": int(os.environ.get("ENGINE_CACHE_TTL_S", "86400")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("ENGINE_CACHE_MAX_ENTRIES", "100000"))},
+    },
+}
+
 # Validation des mots de passe
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,17 +113,110 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Default auto field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# WebSockets / Channels
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# WebSockets / Channels : "memory" (un seul processus) ou "sqlite" (partagé
+# entre plusieurs workers Daphne de la même machine, sans Redis)
+CHANNEL_LAYER_BACKEND = os.environ.get("CHANNEL_LAYER_BACKEND", "memory")
+CHANNEL_LAYER_DB_PATH = os.environ.get("CHANNEL_LAYER_DB_PATH", str(BASE_DIR / "channels.sqlite3"))
+if CHANNEL_LAYER_BACKEND == "sqlite":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "chessgame.channel_layer.SQLiteChannelLayer",
+            "CONFIG": {"path": CHANNEL_LAYER_DB_PATH},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# Parties en cours : "memory" (propres au processus) ou "sqlite" (partagées
+# entre workers, indispensable dès que les joueurs d'une partie peuvent être
+# servis par des workers différents). Par défaut, comme le channel layer.
+GAME_STATE_BACKEND = os.environ.get("GAME_STATE_BACKEND", CHANNEL_LAYER_BACKEND)
+GAME_STATE_DB_PATH = os.environ.get("GAME_STATE_DB_PATH", str(BASE_DIR / "games.sqlite3"))
 
 CSRF_TRUSTED_ORIGINS = [
     'https://aichessmate.onrender.com',
 ]
 
+# Moteur d'échecs
+# Taille maximale de la table de transposition de chaque worker (en Mo)
+ENGINE_TT_SIZE_MB = int(os.environ.get("ENGINE_TT_SIZE_MB", "64"))
+# Budget de temps d'un coup de l'IA (ms) et profondeur maximale : les valeurs
+# envoyées par le client sont plafonnées par ces réglages
+ENGINE_TIME_BUDGET_MS = int(os.environ.get("ENGINE_TIME_BUDGET_MS", "1500"))
+ENGINE_MAX_DEPTH = int(os.environ.get("ENGINE_MAX_DEPTH", "8"))
+# Pool de processus des moteurs : nombre de workers et taille de la file
+# (au-delà, l'API répond 429 et le WebSocket un message "busy")
+ENGINE_POOL_WORKERS = int(os.environ.get("ENGINE_POOL_WORKERS", str(os.cpu_count() or 1)))
+ENGINE_POOL_MAX_PENDING = int(os.environ.get("ENGINE_POOL_MAX_PENDING", str(4 * ENGINE_POOL_WORKERS)))
+# Moteurs importés et préparés au démarrage de chaque worker du pool
+# (random, minimax, nn). Les autres le sont au premier coup demandé :
+# "nn" charge torch, soit plusieurs centaines de Mo par worker.
+ENGINE_PRELOAD = [name for name in os.environ.get("ENGINE_PRELOAD", "random,minimax").split(",") if name]
+# Processus par recherche alpha-beta (Lazy SMP, table de transposition partagée) :
+# chaque worker du pool en lance ENGINE_SEARCH_THREADS - 1 de plus, il faut donc
+# garder ENGINE_POOL_WORKERS * ENGINE_SEARCH_THREADS proche du nombre de cœurs.
+# Le client peut en demander moins ("threads"), jamais plus.
+ENGINE_SEARCH_THREADS = int(os.environ.get("ENGINE_SEARCH_THREADS", "1"))
+# Réflexion pendant le temps de l'adversaire (parties contre l'IA minimax) :
+# budget d'une réflexion (0 = désactivée) et nombre maximal en parallèle,
+# pour laisser des workers libres aux vraies demandes
+ENGINE_PONDER_MS = int(os.environ.get("ENGINE_PONDER_MS", "10000"))
+ENGINE_PONDER_MAX_ACTIVE = int(os.environ.get("ENGINE_PONDER_MAX_ACTIVE", str(max(1, ENGINE_POOL_WORKERS // 2))))
+# Réseau de neurones : fichier de poids (rechargé à chaud s'il change),
+# threads torch par worker et profondeur de recherche
+NN_MODEL_PATH = os.environ.get("NN_MODEL_PATH", str(BASE_DIR / "models" / "simple_chess_nn.pt"))
+NN_NUM_THREADS = int(os.environ.get("NN_NUM_THREADS", "1"))
+NN_SEARCH_DEPTH = int(os.environ.get("NN_SEARCH_DEPTH", "2"))
+# Livre d'ouvertures Polyglot, consulté avant toute recherche (voir la
+# commande build_book) ; ignoré si le fichier n'existe pas
+OPENING_BOOK_PATH = os.environ.get("OPENING_BOOK_PATH", str(BASE_DIR / "books" / "openings.bin"))
+# Tables de finales Syzygy (.rtbw/.rtbz), plusieurs dossiers séparés par ":" ;
+# sans fichiers, les finales sont simplement recherchées comme le reste
+SYZYGY_PATH = os.environ.get("SYZYGY_PATH", str(BASE_DIR / "syzygy"))
+SYZYGY_PROBE_LIMIT = int(os.environ.get("SYZYGY_PROBE_LIMIT", "7"))  # nombre maximal de pièces
+SYZYGY_CACHE_SIZE = int(os.environ.get("SYZYGY_CACHE_SIZE", "100000"))  # résultats gardés en mémoire
+
+# Analyse de parties (/api/analysis/, ws/analysis/) : nombre maximal de
+# positions par demande ; chaque position a le budget ENGINE_TIME_BUDGET_MS
+ANALYSIS_MAX_POSITIONS = int(os.environ.get("ANALYSIS_MAX_POSITIONS", "300"))
+
+# Parties : temps de réflexion par joueur en millisecondes (0 = sans pendule)
+GAME_CLOCK_MS = int(os.environ.get("GAME_CLOCK_MS", "0")) or None
+
+# Enregistrement des parties terminées, par lots : au plus GAME_SAVE_INTERVAL_MS
+# d'attente (0 = parties non enregistrées), ou dès GAME_SAVE_BATCH_SIZE parties
+GAME_SAVE_INTERVAL_MS = int(os.environ.get("GAME_SAVE_INTERVAL_MS", "1000"))
+GAME_SAVE_BATCH_SIZE = int(os.environ.get("GAME_SAVE_BATCH_SIZE", "100"))
+
+# File d'attente : "memory" (un seul processus) ou "sqlite" (partagée entre
+# plusieurs workers Daphne de la même machine), intervalle entre deux appariements
+MATCHMAKING_BACKEND = os.environ.get("MATCHMAKING_BACKEND", "memory")
+MATCHMAKING_DB_PATH = os.environ.get("MATCHMAKING_DB_PATH", str(BASE_DIR / "matchmaking.sqlite3"))
+MATCHMAKING_TICK_MS = int(os.environ.get("MATCHMAKING_TICK_MS", "250"))
+
+# Journaux : un résumé par recherche (nœuds, profondeur, temps) au niveau INFO,
+# chaque coup des parties au niveau DEBUG
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "%(asctime)s %(levelname)s %(name)s : %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "simple"},
+    },
+    "loggers": {
+        "chessgame": {
+            "handlers": ["console"],
+            "level": os.environ.get("CHESSGAME_LOG_LEVEL", "INFO"),
+        },
+    },
+}
+
 # Pour éviter des problèmes de cookie cross-site
 CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_SECURE = True
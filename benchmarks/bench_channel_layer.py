@@ -0,0 +1,108 @@
+"""
+Débit des channel layers, en messages livrés par seconde :
+- "mémoire" : InMemoryChannelLayer (un seul processus)
+- "sqlite" : SQLiteChannelLayer, émetteur et récepteurs dans le même processus
+- "sqlite 2 proc." : SQLiteChannelLayer, récepteurs dans un autre processus
+  (plusieurs workers Daphne sur la même machine)
+
+Deux scénarios : envoi direct vers un canal (send), et diffusion à un
+groupe de N membres (group_send, une partie et ses spectateurs).
+
+Usage : python -m benchmarks.bench_channel_layer [messages] [membres]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from channels.layers import InMemoryChannelLayer
+
+from chessgame.channel_layer import SQLiteChannelLayer
+
+GROUP = "bench"
+MESSAGE = {"type": "broadcast_move", "uci": "e2e4", "seq": 1}
+
+
+async def drain(layer, channel, count):
+    for _ in range(count):
+        await layer.receive(channel)
+
+
+async def send_all(layer, channels, count, group):
+    for seq in range(count):
+        if group:
+            await layer.group_send(GROUP, {**MESSAGE, "seq": seq})
+        else:
+            await layer.send(channels[0], {**MESSAGE, "seq": seq})
+
+
+async def join(layer, members):
+    channels = [await layer.new_channel() for _ in range(members)]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+    return channels
+
+
+async def run_local(layer, members, count, group):
+    channels = await join(layer, members)
+    receivers = [asyncio.create_task(drain(layer, channel, count)) for channel in channels]
+    start = time.perf_counter()
+    await send_all(layer, channels, count, group)
+    await asyncio.gather(*receivers)
+    elapsed = time.perf_counter() - start
+    await layer.flush()
+    return count * members / elapsed
+
+
+def receiver_process(path, members, count, names, done):
+    async def main():
+        layer = SQLiteChannelLayer(path, capacity=count)
+        channels = await join(layer, members)
+        receivers = [asyncio.create_task(drain(layer, channel, count)) for channel in channels]
+        names.put(channels)
+        await asyncio.gather(*receivers)
+        await layer.close()
+
+    asyncio.run(main())
+    done.set()
+
+
+async def run_remote(path, members, count, group):
+    names, done = multiprocessing.Queue(), multiprocessing.Event()
+    process = multiprocessing.Process(target=receiver_process, args=(path, members, count, names, done))
+    process.start()
+    channels = await asyncio.to_thread(names.get)
+    layer = SQLiteChannelLayer(path, capacity=count)
+    start = time.perf_counter()
+    await send_all(layer, channels, count, group)
+    await asyncio.to_thread(done.wait)
+    elapsed = time.perf_counter() - start
+    process.join()
+    await layer.flush()
+    await layer.close()
+    return count * members / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    members = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{os.cpu_count()} cœurs, {count} messages, groupe de {members} membres")
+    print(f"{'layer':>15} {'direct msg/s':>13} {'groupe msg/s':>13}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "channels.sqlite3")
+        runs = {
+            "mémoire": lambda n, group: run_local(InMemoryChannelLayer(capacity=count), n, count, group),
+            "sqlite": lambda n, group: run_local(SQLiteChannelLayer(path, capacity=count), n, count, group),
+            "sqlite 2 proc.": lambda n, group: run_remote(path, n, count, group),
+        }
+        for name, run in runs.items():
+            direct = asyncio.run(run(1, False))
+            fan_out = asyncio.run(run(members, True))
+            print(f"{name:>15} {direct:>13.0f} {fan_out:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare le coût d'une évaluation de feuille :
+- evaluate_board (scan des 64 cases + attaquants par pièce)
+- IncrementalEvaluator (push/pop incrémental + cartes d'attaque)
+
+Usage : python -m benchmarks.bench_eval [nombre_de_parties]
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+
+import chess
+
+from chessgame.ai.ai_minimax import evaluate_board
+from chessgame.ai.evaluation import IncrementalEvaluator
+
+
+def random_games(num_games, seed=0, max_plies=120):
+    """Suites de coups aléatoires (reproductibles) servant de corpus."""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(num_games):
+        board = chess.Board()
+        moves = []
+        for _ in range(rng.randint(10, max_plies)):
+            legal = list(board.legal_moves)
+            if not legal:
+                break
+            move = rng.choice(legal)
+            board.push(move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def bench_legacy(games):
+    count = 0
+    start = time.perf_counter()
+    # evaluate_board affiche un compteur à chaque appel : on jette la sortie
+    with contextlib.redirect_stdout(io.StringIO()):
+        for moves in games:
+            board = chess.Board()
+            for move in moves:
+                board.push(move)
+                evaluate_board(board)
+                count += 1
+    return count, time.perf_counter() - start
+
+
+def bench_incremental(games):
+    count = 0
+    start = time.perf_counter()
+    for moves in games:
+        evaluator = IncrementalEvaluator(chess.Board())
+        for move in moves:
+            evaluator.push(move)
+            evaluator.evaluate()
+            count += 1
+    return count, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    games = random_games(num_games)
+
+    legacy_count, legacy_time = bench_legacy(games)
+    incremental_count, incremental_time = bench_incremental(games)
+
+    legacy_us = legacy_time / legacy_count * 1e6
+    incremental_us = incremental_time / incremental_count * 1e6
+    print(f"Positions évaluées : {legacy_count}")
+    print(f"evaluate_board        : {legacy_us:8.1f} µs/éval")
+    print(f"IncrementalEvaluator  : {incremental_us:8.1f} µs/éval (push inclus)")
+    print(f"Accélération          : x{legacy_us / incremental_us:.1f}")
@@ -0,0 +1,58 @@
+"""
+Compare l'évaluation des feuilles par le réseau :
+- nn_minimax : un passage du réseau (batch de 1) par feuille
+- nn_minimax_batched : toutes les feuilles en un seul passage
+
+Usage : python -m benchmarks.bench_nn [profondeur]
+"""
+import sys
+import time
+
+import chess
+import torch
+
+from chessgame.ai.ai_nn import LeafBatch, SimpleChessNN, nn_minimax, nn_minimax_batched
+
+POSITIONS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7",
+    "8/5pk1/6p1/8/3R4/6P1/5PK1/2r5 b - - 0 40",
+]
+
+
+def count_leaves(board, depth):
+    if depth == 0 or board.is_game_over():
+        return 1
+    total = 0
+    for move in board.legal_moves:
+        board.push(move)
+        total += count_leaves(board, depth - 1)
+        board.pop()
+    return total
+
+
+def bench(search, depth, model):
+    elapsed = 0.0
+    for fen in POSITIONS:
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        search(board, depth, model, board.turn)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    torch.manual_seed(0)
+    model = SimpleChessNN().eval()
+    batch = LeafBatch()
+
+    leaves = sum(count_leaves(chess.Board(fen), depth) for fen in POSITIONS)
+    single_time = bench(nn_minimax, depth, model)
+    batched_time = bench(lambda b, d, m, maxi: nn_minimax_batched(b, d, m, maxi, batch), depth, model)
+
+    print(f"Profondeur {depth}, {leaves} feuilles")
+    print(f"Par feuille : {leaves / single_time:10.0f} positions/s")
+    print(f"En lot      : {leaves / batched_time:10.0f} positions/s")
+    print(f"Accélération: x{single_time / batched_time:.1f}")
@@ -0,0 +1,94 @@
+"""
+Test de charge de la diffusion des coups, avec N parties simultanées :
+- "global" : tous les joueurs dans un seul groupe (ancien "chess_game")
+- "salles" : un groupe par partie (ws/chess/<game_id>/)
+
+Chaque partie joue un coup ; on mesure le temps par coup et le nombre de
+messages livrés par coup. Avec les salles, le coût reste constant.
+
+Usage : python -m benchmarks.bench_rooms [N1 N2 ...]
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AIChessMate.settings")
+django.setup()
+
+from channels.layers import get_channel_layer  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+
+from chessgame.routing import websocket_urlpatterns  # noqa: E402
+
+application = URLRouter(websocket_urlpatterns)
+
+
+async def connect(game_id):
+    communicator = WebsocketCommunicator(application, f"/ws/chess/{game_id}/")
+    await communicator.connect()
+    await communicator.receive_json_from()  # assign_color
+    return communicator
+
+
+async def wait_deliveries(communicators, expected, timeout=60):
+    start = time.monotonic()
+    while sum(c.output_queue.qsize() for c in communicators) < expected:
+        if time.monotonic() - start > timeout:
+            raise TimeoutError("messages perdus")
+        await asyncio.sleep(0.001)
+
+
+async def run(num_games, mode):
+    communicators = []
+    for index in range(num_games):
+        game_id = f"bench_{index}"
+        communicators += [await connect(game_id), await connect(game_id)]
+    layer = get_channel_layer()
+
+    if mode == "global":
+        # Ancien comportement : chaque connexion dans un groupe commun
+        channels = {channel for members in layer.groups.values() for channel in members}
+        for channel in channels:
+            await layer.group_add("chess_game", channel)
+        expected = num_games * len(communicators)
+        start = time.perf_counter()
+        for _ in range(num_games):
+            await layer.group_send("chess_game", {"type": "broadcast_move", "uci": "e2e4", "seq": 1})
+    else:
+        expected = num_games * 2
+        start = time.perf_counter()
+        for white in communicators[::2]:
+            await white.send_json_to({"type": "move", "uci": "e2e4"})
+
+    await wait_deliveries(communicators, expected)
+    elapsed = time.perf_counter() - start
+
+    for communicator in communicators:
+        await communicator.disconnect()
+    await layer.flush()
+    return elapsed / num_games, expected / num_games
+
+
+def main():
+    from django.conf import settings
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 50, 200]
+    # Les files par canal doivent absorber la diffusion globale sans perte
+    settings.CHANNEL_LAYERS["default"]["CONFIG"] = {"capacity": max(sizes) * 4}
+
+    print(f"{'parties':>8} {'mode':>8} {'ms/coup':>10} {'messages/coup':>14}")
+    for num_games in sizes:
+        for mode in ("global", "salles"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                per_move, messages = asyncio.run(run(num_games, mode))
+            print(f"{num_games:>8} {mode:>8} {per_move * 1000:>10.3f} {messages:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Accélération de la recherche Lazy SMP : temps pour atteindre chaque
+profondeur avec 1, 2, 4 et 8 processus, sur les positions de la suite
+de bench_engine (ouvertures et tactiques).
+
+Chaque mesure part d'une table partagée vide ; l'accélération est le
+rapport des temps cumulés pour atteindre la profondeur finale. Elle ne
+peut dépasser le nombre de cœurs de la machine.
+
+Usage : python -m benchmarks.bench_smp [profondeur] [processus ...]
+"""
+import os
+import sys
+import time
+
+import chess
+
+from chessgame.ai.benchmark import SUITE
+from chessgame.ai.smp import HelperPool
+from chessgame.ai.transposition import SharedTranspositionTable
+
+TT_SIZE_MB = 64
+
+
+def time_to_depth(pool, fen, depth, threads):
+    times = []
+    start = time.perf_counter()
+
+    def on_iteration(reached, score, pv, ctx):
+        times.append(time.perf_counter() - start)
+
+    pool.tt.clear()
+    _, _, ctx = pool.search(chess.Board(fen), depth, threads, on_iteration=on_iteration)
+    return times, ctx.stats.nodes
+
+
+def run(depth, thread_counts):
+    positions = [position for position in SUITE if position["category"] in ("opening", "tactic")]
+    tt = SharedTranspositionTable(TT_SIZE_MB)
+    pool = HelperPool(max(thread_counts) - 1, tt)
+    results = {}
+    try:
+        for threads in thread_counts:
+            totals = [0.0] * depth
+            nodes = 0
+            for position in positions:
+                times, position_nodes = time_to_depth(pool, position["fen"], depth, threads)
+                # Mat trouvé avant la profondeur finale : le reste ne coûte rien
+                times += [times[-1]] * (depth - len(times))
+                totals = [total + elapsed for total, elapsed in zip(totals, times)]
+                nodes += position_nodes
+            results[threads] = (totals, nodes)
+    finally:
+        pool.close()
+    return results
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    thread_counts = [int(arg) for arg in sys.argv[2:]] or [1, 2, 4, 8]
+    if 1 not in thread_counts:
+        thread_counts.insert(0, 1)
+    print(f"{os.cpu_count()} cœurs, profondeur {depth}")
+
+    results = run(depth, thread_counts)
+    reference = results[1][0][-1]
+    print(f"{'processus':>9} " + " ".join(f"{'p' + str(d):>8}" for d in range(1, depth + 1))
+          + f" {'nœuds':>9} {'accél.':>7}")
+    for threads, (totals, nodes) in results.items():
+        print(f"{threads:>9} " + " ".join(f"{total * 1000:>6.0f}ms" for total in totals)
+              + f" {nodes:>9} {reference / totals[-1]:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
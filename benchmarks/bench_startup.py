@@ -0,0 +1,92 @@
+"""
+Coût du démarrage d'un worker Daphne et d'un worker du pool de moteurs :
+durée et mémoire résidente (RSS), avec et sans torch chargé.
+
+Chaque scénario tourne dans un nouveau processus Python :
+- "web" : application ASGI et URLs importées, aucun moteur
+- "web + minimax" : plus random et minimax préparés (réglage par défaut
+  des workers du pool)
+- "web + nn" : plus le réseau de neurones (torch et les poids)
+- "pool (preload)" : worker du pool démarré avec ENGINE_PRELOAD,
+  et "pool (+ nn)" avec le réseau en plus (mesures prises dans le worker)
+
+Usage : python -m benchmarks.bench_startup
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    "web": [],
+    "web + minimax": ["random", "minimax"],
+    "web + nn": ["random", "minimax", "nn"],
+}
+POOL_SCENARIOS = {
+    "pool (preload)": None,
+    "pool (+ nn)": ["random", "minimax", "nn"],
+}
+
+
+def rss_mb(pid="self"):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker_info():
+    return os.getpid(), "torch" in sys.modules
+
+
+def measure(name):
+    """Exécuté dans le processus mesuré : affiche durée, RSS et présence de torch (JSON)."""
+    start = time.perf_counter()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AIChessMate.settings")
+    import AIChessMate.asgi  # noqa: F401
+    import AIChessMate.urls  # noqa: F401
+    from chessgame.engines import warm_up
+
+    if name in SCENARIOS:
+        warm_up(SCENARIOS[name])
+        result = {"time_ms": (time.perf_counter() - start) * 1000, "rss_mb": rss_mb()}
+    else:
+        from django.conf import settings
+
+        from chessgame.engine_pool import EngineExecutor
+
+        preload = POOL_SCENARIOS[name] or settings.ENGINE_PRELOAD
+        executor = EngineExecutor(max_workers=1, max_pending=1, preload=preload)
+        pool_start = time.perf_counter()
+        pid, torch = asyncio.run(executor.run(worker_info))
+        result = {"time_ms": (time.perf_counter() - pool_start) * 1000, "rss_mb": rss_mb(pid), "torch": torch}
+        executor.shutdown()
+    result.setdefault("torch", "torch" in sys.modules)
+    print(json.dumps(result))
+
+
+def run(name):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--measure", name],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "CHESSGAME_LOG_LEVEL": "WARNING"},
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--measure":
+        measure(sys.argv[2])
+        return
+    print(f"{'scénario':>16} {'démarrage':>10} {'RSS':>9} {'torch':>6}")
+    for name in [*SCENARIOS, *POOL_SCENARIOS]:
+        result = run(name)
+        torch = "oui" if result["torch"] else "non"
+        print(f"{name:>16} {result['time_ms']:>8.0f}ms {result['rss_mb']:>6.0f} Mo {torch:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from chessgame.models import Game
+
+
+@admin.register(Game)
+class GameAdmin(admin.ModelAdmin):
+    list_display = ("game_id", "mode", "white", "black", "result", "termination", "ply_count", "ended_at")
+    list_filter = ("mode", "result")
+    date_hierarchy = "ended_at"
+    readonly_fields = ("pgn",)
+    exclude = ("moves",)
@@ -1,5 +1,15 @@
 import chess
+import logging
 import math
+import time
+
+from chessgame.ai.config import get_setting
+from chessgame.ai.evaluation import IncrementalEvaluator, see
+from chessgame.ai.opening_book import book_move
+from chessgame.ai.tablebase import get_tablebase
+from chessgame.ai.transposition import EXACT, LOWER, UPPER, get_transposition_table, zobrist_key
+
+logger = logging.getLogger(__name__)
 
 # Valeurs classiques des pièces
 piece_values = {
@@ -14,9 +24,6 @@ piece_values = {
 # Cases du centre : important à contrôler
 central_squares = [chess.D4, chess.E4, chess.D5, chess.E5]
 
-# Compteur pour le nombre d'évaluations
-evaluation_count = 0
-
 
 def evaluate_board(board: chess.Board):
     """
@@ -26,9 +33,6 @@ def evaluate_board(board: chess.Board):
     - Roi sécurisé
     - Pièces vulnérables (non défendues ou attaquées)
     """
-    global evaluation_count  # Permet de modifier la variable globale
-    evaluation_count += 1
-    print(evaluation_count)
     score = 0
 
     for square in chess.SQUARES:
@@ -62,13 +66,18 @@ def evaluate_board(board: chess.Board):
     return score
 
 
-def minimax(board: chess.Board, depth, maximizing):
+def minimax(board: chess.Board, depth, maximizing, stats=None):
     """
     Algorithme Minimax simple :
     - sans élagage alpha-beta (plus lent mais plus simple à lire)
+    - stats (SearchStats, optionnel) compte les nœuds et les évaluations
     """
+    if stats is not None:
+        stats.nodes += 1
 
     if depth == 0 or board.is_game_over():
+        if stats is not None:
+            stats.evals += 1
         return evaluate_board(board), None
 
     best_move = None
@@ -78,7 +87,7 @@ def minimax(board: chess.Board, depth, maximizing):
         max_eval = -math.inf
         for move in moves:
             board.push(move)
-            eval_score, _ = minimax(board, depth - 1, False)
+            eval_score, _ = minimax(board, depth - 1, False, stats)
             board.pop()
 
             if eval_score > max_eval:
@@ -90,7 +99,7 @@ def minimax(board: chess.Board, depth, maximizing):
         min_eval = math.inf
         for move in moves:
             board.push(move)
-            eval_score, _ = minimax(board, depth - 1, True)
+            eval_score, _ = minimax(board, depth - 1, True, stats)
             board.pop()
 
             if eval_score < min_eval:
@@ -100,22 +109,486 @@ def minimax(board: chess.Board, depth, maximizing):
         return min_eval, best_move
 
 
-def get_minimax_move(fen, depth=3):
+# Bornes des scores de la recherche alpha-beta (mat = très au-delà du matériel)
+MATE_SCORE = 10000
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = math.inf
+
+# Profondeur par défaut de chaque mode de recherche
+DEFAULT_DEPTHS = {
+    "minimax": 3,
+    "alphabeta": 4,  # + quiescence : les prises en cours sont résolues jusqu'au bout
+}
+# Profondeur maximale quand seule la limite de temps compte
+MAX_SEARCH_DEPTH = 32
+
+# L'horloge n'est consultée que tous les N nœuds
+TIME_CHECK_INTERVAL = 256
+
+# Quiescence : marge du delta pruning (une prise qui ne peut pas remonter
+# alpha même avec cette marge n'est pas essayée) et profondeur maximale
+DELTA_MARGIN = 2
+QUIESCENCE_MAX_PLY = 16
+
+# Bonus de tri des coups : captures > killers > historique
+CAPTURE_BONUS = 1_000_000
+KILLER_BONUS = 900_000
+
+
+class SearchTimeout(Exception):
+    """Levée dans la recherche quand le temps alloué est écoulé."""
+
+
+class SearchStats:
+    """
+    Compteurs d'une recherche. Rien n'est écrit pendant la recherche :
+    le résumé est journalisé et publié dans les métriques à la fin.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.evals = 0  # évaluations de feuilles
+        self.cutoffs = 0  # coupures beta
+        self.tt_hits = 0
+        self.tb_hits = 0
+        self.depth = 0  # dernière itération terminée
+        self.time_ms = 0.0
+        self.threads = 1  # processus de la recherche (Lazy SMP), nœuds comptés pour tous
+
+    def as_dict(self):
+        return {
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "evals": self.evals,
+            "cutoffs": self.cutoffs,
+            "tt_hits": self.tt_hits,
+            "tb_hits": self.tb_hits,
+            "time_ms": round(self.time_ms, 1),
+            "threads": self.threads,
+        }
+
+
+class SearchContext:
+    """
+    État propre à une recherche (jamais partagé entre deux requêtes) :
+    - compteurs (SearchStats)
+    - coups killers par ply (coups calmes ayant provoqué une coupure)
+    - table d'historique (from, to) -> bonus
+    - variante principale de l'itération précédente (pv[ply])
+    - table de transposition (partagée entre les requêtes)
+    - évaluateur incrémental, par lequel passent tous les coups joués
+    - échéance (time.perf_counter()) au-delà de laquelle on abandonne
+    - should_stop() : demande d'arrêt venant de l'extérieur (client parti)
+    - tables de finales Syzygy, sondées quand il reste peu de pièces
+    - quiescence : prolonge les feuilles par les prises ; sinon, les feuilles
+      sont évaluées telles quelles avec les termes d'attaque de evaluate_board
+    """
+
+    def __init__(self, board, max_depth, tt=None, deadline=None, should_stop=None, tablebase=None,
+                 quiescence=True):
+        self.quiescence = quiescence
+        self.evaluator = IncrementalEvaluator(board, attack_terms=not quiescence)
+        self.tt = tt
+        self.tablebase = tablebase
+        self.tb_pieces = tablebase.max_pieces if tablebase is not None else 0
+        self.should_stop = should_stop
+        self.deadline = None
+        self._deadline = deadline
+        self.stats = SearchStats()
+        self.killers = [[None, None] for _ in range(max_depth + 1)]
+        self.history = {}
+        self.pv = []
+
+    def arm_deadline(self):
+        """L'échéance n'est active qu'après une première itération complète."""
+        self.deadline = self._deadline
+
+    def check_time(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.should_stop is not None and self.should_stop():
+            raise SearchTimeout()
+
+    def pv_move(self, ply, on_pv):
+        if on_pv and ply < len(self.pv):
+            return self.pv[ply]
+        return None
+
+    def store_killer(self, move, ply):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+    def store_history(self, board, move, depth):
+        key = (board.turn, move.from_square, move.to_square)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+
+def score_to_tt(score, ply):
+    """Les scores de mat sont stockés relativement au nœud, pas à la racine."""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def mvv_lva(board: chess.Board, move: chess.Move):
+    """
+    Most Valuable Victim / Least Valuable Attacker :
+    on essaie d'abord de prendre la plus grosse pièce avec la plus petite.
+    """
+    if board.is_en_passant(move):
+        victim = chess.PAWN
+    else:
+        victim = board.piece_type_at(move.to_square)
+    attacker = board.piece_type_at(move.from_square)
+    return piece_values.get(victim, 0) * 10 - piece_values.get(attacker, 0)
+
+
+def order_moves(board: chess.Board, moves, ctx: SearchContext, ply, first_move=None):
+    """
+    Trie les coups pour maximiser les coupures alpha-beta :
+    1. meilleur coup connu (variante principale ou table de transposition)
+    2. captures et promotions (MVV-LVA)
+    3. coups killers du ply
+    4. coups calmes selon l'historique
+    """
+    killers = ctx.killers[ply] if ply < len(ctx.killers) else (None, None)
+
+    def score(move):
+        if move == first_move:
+            return 2 * CAPTURE_BONUS
+        if board.is_capture(move):
+            return CAPTURE_BONUS + mvv_lva(board, move)
+        if move.promotion:
+            return CAPTURE_BONUS + piece_values[move.promotion]
+        if move == killers[0]:
+            return KILLER_BONUS
+        if move == killers[1]:
+            return KILLER_BONUS - 1
+        return ctx.history.get((board.turn, move.from_square, move.to_square), 0)
+
+    return sorted(moves, key=score, reverse=True)
+
+
+def tactical_moves(board: chess.Board):
+    """Prises et promotions en dame, les plus prometteuses d'abord (MVV-LVA)."""
+    moves = list(board.generate_legal_captures())
+    pawns = board.pieces_mask(chess.PAWN, board.turn)
+    seventh = chess.BB_RANK_7 if board.turn == chess.WHITE else chess.BB_RANK_2
+    for move in board.generate_legal_moves(pawns & seventh, ~board.occupied & chess.BB_ALL):
+        if move.promotion == chess.QUEEN:
+            moves.append(move)
+    moves.sort(key=lambda move: mvv_lva(board, move) if board.is_capture(move) else piece_values[chess.QUEEN],
+               reverse=True)
+    return moves
+
+
+def quiescence(board: chess.Board, alpha, beta, ply, ctx: SearchContext, qply=0):
+    """
+    Recherche de quiescence : aux feuilles, on continue tant qu'il reste des
+    prises ou des promotions, pour ne jamais évaluer au milieu d'un échange.
+    - stand pat : le joueur au trait peut refuser toute prise (sauf en échec)
+    - delta pruning : prise inutile si même son gain + DELTA_MARGIN n'atteint pas alpha
+    - SEE : les prises perdantes (échange défavorable sur la case) sont ignorées
+    En échec, toutes les parades sont essayées (un mat est détecté).
+    """
+    stats = ctx.stats
+    stats.nodes += 1
+    if stats.nodes % TIME_CHECK_INTERVAL == 0:
+        ctx.check_time()
+
+    in_check = board.is_check()
+    if in_check:
+        moves = order_moves(board, board.legal_moves, ctx, ply)
+        if not moves:
+            return -MATE_SCORE + ply
+        best_score = -INFINITY
+    else:
+        stats.evals += 1
+        best_score = ctx.evaluator.evaluate()
+        if best_score >= beta or qply >= QUIESCENCE_MAX_PLY:
+            return best_score
+        alpha = max(alpha, best_score)
+        moves = tactical_moves(board)
+
+    evaluator = ctx.evaluator
+    for move in moves:
+        if not in_check:
+            gain = see(board, move)
+            if gain < 0:
+                continue
+            if not move.promotion and best_score + gain / 10 + DELTA_MARGIN <= alpha:
+                continue
+        evaluator.push(move)
+        score = -quiescence(board, -beta, -alpha, ply + 1, ctx, qply + 1)
+        evaluator.pop()
+
+        if score > best_score:
+            best_score = score
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            stats.cutoffs += 1
+            break
+    return best_score
+
+
+def negamax(board: chess.Board, depth, alpha, beta, ply, ctx: SearchContext, on_pv=False):
+    """
+    Negamax avec élagage alpha-beta.
+    Le score est toujours exprimé du point de vue du joueur au trait,
+    comme evaluate_board. Retourne (score, variante principale).
+    """
+    if depth == 0 and ctx.quiescence:
+        return quiescence(board, alpha, beta, ply, ctx), []
+
+    stats = ctx.stats
+    stats.nodes += 1
+    if stats.nodes % TIME_CHECK_INTERVAL == 0:
+        ctx.check_time()
+
+    if depth == 0:
+        stats.evals += 1
+        return ctx.evaluator.evaluate(), []
+
+    moves = list(board.legal_moves)
+    if not moves:
+        # Mat (le plus rapide possible est préféré) ou pat
+        if board.is_check():
+            return -MATE_SCORE + ply, []
+        return 0, []
+    if ply > 0 and board.is_insufficient_material():
+        return 0, []
+    # Finale dans les tables : le résultat exact remplace toute la sous-arbre
+    if ply > 0 and chess.popcount(board.occupied) <= ctx.tb_pieces and not board.castling_rights:
+        tb_score = ctx.tablebase.search_score(board)
+        if tb_score is not None:
+            stats.tb_hits += 1
+            return tb_score, []
+
+    tt = ctx.tt
+    tt_move = None
+    if tt is not None:
+        key = zobrist_key(board)
+        entry = tt.probe(key)
+        if entry is not None:
+            stats.tt_hits += 1
+            _, tt_depth, flag, tt_score, tt_move, _ = entry
+            if ply > 0 and tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if flag == EXACT or \
+                        (flag == LOWER and tt_score >= beta) or \
+                        (flag == UPPER and tt_score <= alpha):
+                    return tt_score, [tt_move] if tt_move else []
+
+    alpha_orig = alpha
+    best_score = -INFINITY
+    best_pv = []
+    pv_move = ctx.pv_move(ply, on_pv) or tt_move
+
+    evaluator = ctx.evaluator
+    for move in order_moves(board, moves, ctx, ply, pv_move):
+        evaluator.push(move)
+        score, child_pv = negamax(board, depth - 1, -beta, -alpha, ply + 1, ctx, move == pv_move)
+        score = -score
+        evaluator.pop()
+
+        if score > best_score:
+            best_score = score
+            best_pv = [move] + child_pv
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            # Coupure : on mémorise les coups calmes responsables
+            stats.cutoffs += 1
+            if not board.is_capture(move) and not move.promotion:
+                ctx.store_killer(move, ply)
+                ctx.store_history(board, move, depth)
+            break
+
+    if tt is not None:
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(key, depth, flag, score_to_tt(best_score, ply), best_pv[0])
+
+    return best_score, best_pv
+
+
+def iterative_deepening(board: chess.Board, max_depth, tt=None, time_ms=None, should_stop=None, tablebase=None,
+                        on_iteration=None, quiescence=True):
+    """
+    Approfondissement itératif : profondeur 1, 2, ..., max_depth.
+    Chaque itération suit d'abord la variante principale de la précédente
+    et réutilise ses killers et son historique, ce qui rend le tri des coups
+    bien plus efficace. Avec une table de transposition, les positions déjà
+    vues (même lors d'une requête précédente) ne sont pas recherchées à nouveau.
+
+    Avec time_ms, la recherche s'arrête dès que le budget est épuisé et
+    retourne le meilleur coup de la dernière itération terminée.
+    should_stop() permet d'interrompre la recherche de la même façon.
+    on_iteration(depth, score, pv, ctx) est appelé à la fin de chaque itération.
+    quiescence=False évalue les feuilles directement (scores identiques à evaluate_board).
+    """
+    start = time.perf_counter()
+    deadline = start + time_ms / 1000 if time_ms is not None else None
+    if tt is not None:
+        tt.new_search()
+    ctx = SearchContext(board, max_depth, tt, deadline, should_stop, tablebase, quiescence)
+    root_plies = len(board.move_stack)
+    best_score, best_move = 0, None
+
+    for depth in range(1, max_depth + 1):
+        try:
+            score, pv = negamax(board, depth, -INFINITY, INFINITY, 0, ctx, on_pv=True)
+        except SearchTimeout:
+            # Itération interrompue : on remet le plateau dans son état initial
+            while len(board.move_stack) > root_plies:
+                ctx.evaluator.pop()
+            break
+        if not pv:
+            # Aucun coup possible
+            break
+        best_score, best_move = score, pv[0]
+        ctx.pv = pv
+        ctx.stats.depth = depth
+        ctx.arm_deadline()
+        if on_iteration is not None:
+            on_iteration(depth, score, pv, ctx)
+        if abs(best_score) >= MATE_THRESHOLD:
+            # Mat trouvé : inutile d'aller plus loin
+            break
+        if deadline is not None and time.perf_counter() - start > (deadline - start) / 2:
+            # L'itération suivante coûte bien plus que toutes les précédentes :
+            # elle n'aurait presque aucune chance de finir à temps
+            break
+
+    ctx.stats.time_ms = (time.perf_counter() - start) * 1000
+    return best_score, best_move, ctx
+
+
+def helper_search(board: chess.Board, max_depth, tt, start_depth=1, should_stop=None, tablebase=None):
+    """
+    Recherche d'un processus auxiliaire Lazy SMP : même approfondissement
+    itératif, sans limite de temps (should_stop l'arrête), à partir de
+    start_depth. Son seul rôle est de remplir la table partagée ; son
+    résultat n'est pas utilisé. Retourne ses compteurs.
+    """
+    ctx = SearchContext(board, max_depth, tt, None, should_stop, tablebase)
+    root_plies = len(board.move_stack)
+    for depth in range(start_depth, max_depth + 1):
+        try:
+            _, pv = negamax(board, depth, -INFINITY, INFINITY, 0, ctx, on_pv=True)
+        except SearchTimeout:
+            while len(board.move_stack) > root_plies:
+                ctx.evaluator.pop()
+            break
+        if not pv:
+            break
+        ctx.pv = pv
+        ctx.stats.depth = depth
+    return ctx.stats
+
+
+def known_move(board, use_book=True, tablebase=None):
+    """
+    Coup connu sans recherche : livre d'ouvertures, puis tables de finales.
+    Retourne (coup, "book" | "tablebase"), ou (None, None).
+    """
+    if use_book:
+        move = book_move(board)
+        if move:
+            return move, "book"
+    if tablebase is not None:
+        move = tablebase.root_move(board)
+        if move:
+            return move, "tablebase"
+    return None, None
+
+
+def warm_up():
+    """Table de transposition et tables de finales prêtes avant la première recherche."""
+    get_transposition_table()
+    get_tablebase()
+
+
+def get_minimax_move(fen, depth=None, mode="alphabeta", time_ms=None, should_stop=None, use_book=True,
+                     threads=None):
     """
     Point d'entrée appelé depuis le backend Django.
+    - mode "alphabeta" : negamax alpha-beta + approfondissement itératif
+    - mode "minimax" : ancien minimax complet (référence, sans limite de temps)
+
+    depth est la profondeur maximale, time_ms le budget en millisecondes.
+    Si la position est dans le livre d'ouvertures ou dans les tables de
+    finales, le coup est joué sans recherche.
+    threads (plafonné par ENGINE_SEARCH_THREADS) : processus de la recherche
+    alpha-beta ; au-delà de 1, recherche parallèle Lazy SMP.
+    La réponse contient les compteurs de la recherche (SearchStats.as_dict),
+    et pour alpha-beta le score (en pions, pour le camp au trait) et la variante principale.
     """
-    global evaluation_count  # Réinitialise le compteur à chaque appel
-    evaluation_count = 0
+    if depth is None:
+        depth = DEFAULT_DEPTHS[mode] if time_ms is None else MAX_SEARCH_DEPTH
+    start = time.perf_counter()
     board = chess.Board(fen)
-    _, move = minimax(board, depth, board.turn)
-    print(f"Nombre d'évaluations du plateau: {evaluation_count}")  # Affichage du compteur
+
+    tablebase = get_tablebase()
+    move, source = known_move(board, use_book, tablebase)
+    score, pv = None, []
+    if move:
+        stats = SearchStats()
+    elif mode == "alphabeta":
+        max_threads = get_setting("ENGINE_SEARCH_THREADS", 1)
+        threads = max_threads if threads is None else min(threads, max_threads)
+        if threads > 1:
+            from chessgame.ai.smp import get_helper_pool
+            score, move, ctx = get_helper_pool().search(board, depth, threads, time_ms, should_stop, tablebase)
+        else:
+            score, move, ctx = iterative_deepening(board, depth, get_transposition_table(), time_ms, should_stop,
+                                                   tablebase)
+        stats = ctx.stats
+        pv = ctx.pv
+    elif mode == "minimax":
+        stats = SearchStats()
+        _, move = minimax(board, depth, board.turn, stats)
+        stats.depth = depth
+    else:
+        raise ValueError(f"Mode de recherche inconnu : {mode}")
+    stats.time_ms = (time.perf_counter() - start) * 1000
+
+    logger.info(
+        "%s : %s en %.1f ms (%s, profondeur %d, %d nœuds, %d évaluations, %d coupures, %d succès TT, %d processus)",
+        mode, move.uci() if move else "aucun coup", stats.time_ms, source or "recherche",
+        stats.depth, stats.nodes, stats.evals, stats.cutoffs, stats.tt_hits, stats.threads,
+    )
     if move:
         return {
             "from": move.uci()[:2],
-            "to": move.uci()[2:4]
+            "to": move.uci()[2:4],
+            "uci": move.uci(),
+            "score": round(score, 2) if score is not None else None,
+            "pv": [pv_move.uci() for pv_move in pv],
+            **stats.as_dict(),
+            "book": source == "book",
+            "tablebase": source == "tablebase",
         }
     return None
 
+# Minimax complet (nombre d'évaluations)
 # 3 -> 13160
 # 4 -> 197 281 -> après e4 -> 405 385
 # 5 -> 4 865 617
@@ -4,6 +4,8 @@ import torch.nn.functional as f
 import chess
 import numpy as np
 
+from chessgame.ai.encoding import PACKED_WORDS, TENSOR_SIZE, pack_board, unpack_batch
+
 
 class SimpleChessNN(nn.Module):
     def __init__(self):
@@ -60,13 +62,114 @@ def nn_minimax(board, depth, model, maximizing):
     return best_score, best_move
 
 
-def simulate_self_play_game(model, depth=1, max_moves=100):
+class LeafBatch:
+    """
+    Feuilles d'une recherche, stockées sous forme compacte (13 uint64 par position).
+    Une position déjà présente (transposition) n'est ni ajoutée ni évaluée deux fois.
+
+    Au moment d'évaluer, tout le lot est décodé d'un coup dans un tampon
+    (N, 773) float32 réutilisé d'une recherche à l'autre ; le tenseur torch
+    partage la mémoire de ce tampon : aucune copie.
+    """
+
+    def __init__(self, capacity=1024):
+        self.packed = np.empty((capacity, PACKED_WORDS), dtype=np.uint64)
+        self._allocate_floats(capacity)
+        self._index = {}
+        self.size = 0
+
+    def _allocate_floats(self, capacity):
+        self.floats = np.empty((capacity, TENSOR_SIZE), dtype=np.float32)
+        self.tensor = torch.from_numpy(self.floats)
+
+    def clear(self):
+        self._index.clear()
+        self.size = 0
+
+    def add(self, board: chess.Board):
+        """Encode la position (si elle est nouvelle) et retourne son index."""
+        if self.size == len(self.packed):
+            self.packed = np.concatenate([self.packed, np.empty_like(self.packed)])
+        row = pack_board(board, self.packed[self.size])
+        key = row.tobytes()
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = self.size
+            self.size += 1
+        return index
+
+    def evaluate(self, model):
+        """Un seul passage du réseau pour toutes les feuilles."""
+        if len(self.floats) < self.size:
+            self._allocate_floats(len(self.packed))
+        unpack_batch(self.packed[:self.size], self.floats)
+        with torch.inference_mode():
+            scores = model(self.tensor[:self.size])
+        return scores.view(-1).tolist()
+
+
+def _expand(board, depth, batch: LeafBatch):
+    """
+    Développe l'arbre : une feuille devient l'index de sa position dans le lot,
+    un nœud interne la liste de ses (coup, sous-arbre).
+    """
+    if depth == 0 or board.is_game_over():
+        return batch.add(board)
+
+    children = []
+    for move in board.legal_moves:
+        board.push(move)
+        children.append((move, _expand(board, depth - 1, batch)))
+        board.pop()
+    return children
+
+
+def _backup(node, scores, maximizing):
+    """Remonte les scores des feuilles dans l'arbre (minimax)."""
+    if isinstance(node, int):
+        return scores[node], None
+
+    best_move = None
+    best_score = -float("inf") if maximizing else float("inf")
+    for move, child in node:
+        score, _ = _backup(child, scores, not maximizing)
+        if maximizing and score > best_score:
+            best_score = score
+            best_move = move
+        elif not maximizing and score < best_score:
+            best_score = score
+            best_move = move
+    return best_score, best_move
+
+
+def nn_minimax_batched(board, depth, model, maximizing, batch=None):
+    """
+    Même résultat que nn_minimax, mais toutes les feuilles sont évaluées
+    en un seul lot au lieu d'un passage du réseau par feuille.
+    """
+    batch = batch or LeafBatch()
+    batch.clear()
+    tree = _expand(board, depth, batch)
+    scores = batch.evaluate(model)
+    return _backup(tree, scores, maximizing)
+
+
+def choose_move(board, model, depth=1, batched=True, batch=None):
+    """Meilleur coup pour le joueur au trait (les blancs maximisent)."""
+    if batched:
+        _, move = nn_minimax_batched(board, depth, model, board.turn, batch)
+    else:
+        _, move = nn_minimax(board, depth, model, board.turn)
+    return move
+
+
+def simulate_self_play_game(model, depth=1, max_moves=100, batched=True):
     board = chess.Board()
     move_count = 0
+    batch = LeafBatch()
 
     while not board.is_game_over() and move_count < max_moves:
-        maximizing = board.turn
-        _, move = nn_minimax(board, depth, model, maximizing)
+        move = choose_move(board, model, depth, batched, batch)
         if move is None:
             break
         board.push(move)
@@ -75,11 +178,11 @@ def simulate_self_play_game(model, depth=1, max_moves=100):
     return board.result()  # ex: "1-0", "0-1", "1/2-1/2"
 
 
-def self_play(model, num_games=10, depth=1):
-    results = {"1-0": 0, "0-1": 0, "1/2-1/2": 0}
+def self_play(model, num_games=10, depth=1, batched=True):
+    results = {"1-0": 0, "0-1": 0, "1/2-1/2": 0, "*": 0}
     for i in range(num_games):
         print(f"🎮 Partie {i+1}/{num_games}...")
-        result = simulate_self_play_game(model, depth)
+        result = simulate_self_play_game(model, depth, batched=batched)
         results[result] += 1
     return results
 
@@ -0,0 +1,166 @@
+import random
+import time
+
+import chess
+
+from chessgame.ai.ai_minimax import iterative_deepening
+from chessgame.ai.ai_random import get_random_move
+from chessgame.ai.transposition import TranspositionTable
+
+# Positions fixes : ouvertures, tactiques (coups attendus) et finales
+SUITE = [
+    {"name": "start", "category": "opening", "fen": chess.STARTING_FEN},
+    {"name": "ruy_lopez", "category": "opening",
+     "fen": "r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3"},
+    {"name": "sicilian", "category": "opening",
+     "fen": "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"},
+    {"name": "queens_gambit", "category": "opening",
+     "fen": "rnbqkbnr/ppp2ppp/4p3/3p4/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 0 3"},
+    {"name": "back_rank_mate", "category": "tactic",
+     "fen": "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1", "best": ["a1a8"]},
+    {"name": "scholar_mate", "category": "tactic",
+     "fen": "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4", "best": ["h5f7"]},
+    {"name": "morphy_mate_in_2", "category": "tactic",
+     "fen": "kbK5/pp6/1P6/8/8/8/8/R7 w - - 0 1", "best": ["a1a6"]},
+    {"name": "knight_fork", "category": "tactic",
+     "fen": "r3k3/8/8/1N6/8/8/8/4K3 w - - 0 1", "best": ["b5c7"]},
+    {"name": "hanging_queen", "category": "tactic",
+     "fen": "4k3/8/8/3q4/8/8/8/3QK3 w - - 0 1", "best": ["d1d5"]},
+    {"name": "promotion", "category": "tactic",
+     "fen": "8/1P6/8/8/8/8/5k2/K7 w - - 0 1", "best": ["b7b8q"]},
+    {"name": "kq_vs_k", "category": "endgame", "fen": "8/8/8/4k3/8/8/3QK3/8 w - - 0 1"},
+    {"name": "kp_vs_k", "category": "endgame", "fen": "8/8/8/8/4k3/8/4P3/4K3 w - - 0 1"},
+    {"name": "rook_endgame", "category": "endgame", "fen": "8/5k2/8/8/8/8/R5K1/6r1 w - - 0 1"},
+]
+
+ENGINES = ("minimax", "nn", "random")
+
+BENCH_TT_SIZE_MB = 16
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def bench_minimax(board, depth, nn_depth):
+    # Table neuve à chaque position : le nombre de nœuds est reproductible
+    tt = TranspositionTable(BENCH_TT_SIZE_MB)
+    time_to_depth = []
+    start = time.perf_counter()
+
+    def on_iteration(reached, score, pv, ctx):
+        time_to_depth.append(_elapsed_ms(start))
+
+    _, move, ctx = iterative_deepening(board, depth, tt, on_iteration=on_iteration)
+    return {
+        "move": move.uci() if move else None,
+        "nodes": ctx.stats.nodes,
+        "depth": ctx.stats.depth,
+        "time_ms": _elapsed_ms(start),
+        "time_to_depth_ms": time_to_depth,
+    }
+
+
+def bench_nn(board, depth, nn_depth):
+    from chessgame.ai.ai_nn import LeafBatch, choose_move
+    from chessgame.ai.nn_registry import get_model_registry
+
+    model = get_model_registry().get().model
+    batch = LeafBatch()
+    start = time.perf_counter()
+    move = choose_move(board, model, nn_depth, batched=True, batch=batch)
+    return {
+        "move": move.uci() if move else None,
+        "nodes": batch.size,
+        "depth": nn_depth,
+        "time_ms": _elapsed_ms(start),
+    }
+
+
+def bench_random(board, depth, nn_depth):
+    start = time.perf_counter()
+    move = get_random_move(board.fen())
+    return {
+        "move": move.uci() if move else None,
+        "nodes": 0,
+        "depth": 0,
+        "time_ms": _elapsed_ms(start),
+    }
+
+
+RUNNERS = {"minimax": bench_minimax, "nn": bench_nn, "random": bench_random}
+
+
+def run_benchmark(engines=ENGINES, depth=4, nn_depth=2, names=None, progress=None):
+    """
+    Fait jouer chaque moteur sur la suite (sans livre ni tables de finales).
+    Retourne un rapport JSON : résultats par position et résumé par moteur
+    (nœuds, nœuds/s, temps, taux de résolution des tactiques).
+    """
+    positions = [position for position in SUITE if names is None or position["name"] in names]
+    report = {"depth": depth, "nn_depth": nn_depth, "positions": len(positions), "engines": {}}
+
+    for engine in engines:
+        runner = RUNNERS[engine]
+        random.seed(0)  # moteur aléatoire reproductible
+        results = []
+        for position in positions:
+            result = runner(chess.Board(position["fen"]), depth, nn_depth)
+            result = {"name": position["name"], "category": position["category"], **result}
+            if "best" in position:
+                result["solved"] = result["move"] in position["best"]
+            results.append(result)
+            if progress:
+                progress(engine, result)
+
+        report["engines"][engine] = {"summary": summarize(results), "positions": results}
+    return report
+
+
+def summarize(results):
+    """Résumé d'une liste de résultats par position : nœuds, nœuds/s, temps, tactiques résolues."""
+    nodes = sum(result["nodes"] for result in results)
+    time_ms = sum(result["time_ms"] for result in results)
+    tactics = [result for result in results if "solved" in result]
+    solved = sum(result["solved"] for result in tactics)
+    return {
+        "nodes": nodes,
+        "time_ms": round(time_ms, 1),
+        "nps": round(nodes / time_ms * 1000) if time_ms else 0,
+        "solved": solved,
+        "tactics": len(tactics),
+        "solve_rate": round(solved / len(tactics), 3) if tactics else None,
+    }
+
+
+def compare(report, baseline, tolerance=0.3):
+    """
+    Régressions par rapport à un rapport de référence (liste de messages, vide si tout va bien) :
+    - moins de tactiques résolues
+    - plus de nœuds (de plus de tolerance) : la recherche élague moins bien
+    - moins de nœuds/s (de plus de tolerance) : le code est devenu plus lent
+    Les résumés sont recalculés sur les positions présentes dans les deux
+    rapports : une suite restreinte (--positions) se compare aux mêmes positions.
+    """
+    if (report["depth"], report["nn_depth"]) != (baseline["depth"], baseline["nn_depth"]):
+        return [f"Référence mesurée à d'autres profondeurs ({baseline['depth']}, {baseline['nn_depth']})"]
+
+    problems = []
+    for engine, data in report["engines"].items():
+        reference = baseline["engines"].get(engine)
+        if reference is None:
+            continue
+        names = ({result["name"] for result in data["positions"]}
+                 & {result["name"] for result in reference["positions"]})
+        if not names:
+            continue
+        current = summarize([result for result in data["positions"] if result["name"] in names])
+        previous = summarize([result for result in reference["positions"] if result["name"] in names])
+        if (current["solve_rate"] or 0) < (previous["solve_rate"] or 0):
+            problems.append(f"{engine} : {current['solved']}/{current['tactics']} tactiques résolues, "
+                            f"contre {previous['solved']}/{previous['tactics']}")
+        if previous["nodes"] and current["nodes"] > previous["nodes"] * (1 + tolerance):
+            problems.append(f"{engine} : {current['nodes']} nœuds, contre {previous['nodes']}")
+        if previous["nps"] and current["nps"] < previous["nps"] * (1 - tolerance):
+            problems.append(f"{engine} : {current['nps']} nœuds/s, contre {previous['nps']}")
+    return problems
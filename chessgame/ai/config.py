@@ -0,0 +1,13 @@
+def get_setting(name, default):
+    """
+    Lit un réglage du moteur dans settings.py si Django est configuré,
+    sinon retourne la valeur par défaut (ex: lancement en script autonome).
+    """
+    try:
+        from django.conf import settings
+    except ImportError:
+        return default
+
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
@@ -0,0 +1,62 @@
+import chess
+import numpy as np
+
+# Une position = 13 mots de 64 bits :
+# - 12 bitboards, dans l'ordre des plans de board_to_tensor
+#   (pion, cavalier, fou, tour, dame, roi blancs puis noirs)
+# - 1 mot de drapeaux : trait et droits de roque
+PACKED_WORDS = 13
+FLAGS_WORD = 12
+
+FLAG_TURN = 1 << 0
+FLAG_WHITE_KINGSIDE = 1 << 1
+FLAG_WHITE_QUEENSIDE = 1 << 2
+FLAG_BLACK_KINGSIDE = 1 << 3
+FLAG_BLACK_QUEENSIDE = 1 << 4
+
+# Taille du vecteur d'entrée de SimpleChessNN
+TENSOR_SIZE = 773
+
+_FLAG_SHIFTS = np.arange(5, dtype=np.uint64)
+
+
+def pack_board(board: chess.Board, out=None):
+    """Encode la position en 13 uint64 (104 octets) au lieu de 773 float32."""
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    pieces = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+
+    flags = FLAG_TURN if board.turn else 0
+    # Plus aucun droit de roque : cas le plus fréquent hors ouverture
+    if board.castling_rights:
+        if board.has_kingside_castling_rights(chess.WHITE):
+            flags |= FLAG_WHITE_KINGSIDE
+        if board.has_queenside_castling_rights(chess.WHITE):
+            flags |= FLAG_WHITE_QUEENSIDE
+        if board.has_kingside_castling_rights(chess.BLACK):
+            flags |= FLAG_BLACK_KINGSIDE
+        if board.has_queenside_castling_rights(chess.BLACK):
+            flags |= FLAG_BLACK_QUEENSIDE
+    words = [mask & white for mask in pieces] + [mask & black for mask in pieces] + [flags]
+    if out is None:
+        return np.array(words, dtype=np.uint64)
+    out[:] = words
+    return out
+
+
+def unpack_batch(packed, out=None):
+    """
+    Décode un lot (N, 13) uint64 en (N, 773) float32, disposition de board_to_tensor.
+    out permet de réutiliser un tampon existant (au moins N lignes).
+    """
+    packed = np.ascontiguousarray(packed, dtype="<u8")
+    n = len(packed)
+    if out is None:
+        out = np.empty((n, TENSOR_SIZE), dtype=np.float32)
+    target = out[:n]
+
+    # bit i du bitboard p -> bits[:, p, i], puis réordonné en [case][plan]
+    bits = np.unpackbits(packed[:, :12].view(np.uint8), axis=1, bitorder="little").reshape(n, 12, 64)
+    target[:, :768] = bits.transpose(0, 2, 1).reshape(n, 768)
+    target[:, 768:] = (packed[:, FLAGS_WORD:] >> _FLAG_SHIFTS) & 1
+    return target
@@ -0,0 +1,197 @@
+import chess
+
+# Les termes de evaluate_board, en dixièmes de pion pour rester en entiers
+PIECE_TENTHS = {
+    chess.PAWN: 10,
+    chess.KNIGHT: 30,
+    chess.BISHOP: 30,
+    chess.ROOK: 50,
+    chess.QUEEN: 90,
+    chess.KING: 1000,
+}
+CENTER_TENTHS = 3
+KING_BACK_RANK_TENTHS = 5
+HANGING_TENTHS = -5     # pièce attaquée et non défendue
+EXCHANGE_TENTHS = -1    # pièce attaquée et défendue
+PROTECTED_TENTHS = 2    # pièce défendue et non attaquée
+
+CENTER_MASK = chess.BB_D4 | chess.BB_E4 | chess.BB_D5 | chess.BB_E5
+
+
+def _piece_square_tenths(color, piece_type, square):
+    """Partie 'statique' de evaluate_board pour une pièce, vue des blancs."""
+    value = PIECE_TENTHS[piece_type]
+    if chess.BB_SQUARES[square] & CENTER_MASK:
+        value += CENTER_TENTHS
+    if piece_type == chess.KING and chess.square_rank(square) == (0 if color == chess.WHITE else 7):
+        value += KING_BACK_RANK_TENTHS
+    return value if color == chess.WHITE else -value
+
+
+# PIECE_SQUARE[color][piece_type][square]
+PIECE_SQUARE = {
+    color: {
+        piece_type: [_piece_square_tenths(color, piece_type, square) for square in chess.SQUARES]
+        for piece_type in chess.PIECE_TYPES
+    }
+    for color in chess.COLORS
+}
+
+
+def attack_map(board: chess.Board, color):
+    """Cases attaquées (ou défendues) par un camp, en un seul bitboard."""
+    pawns = board.pieces_mask(chess.PAWN, color)
+    if color == chess.WHITE:
+        attacks = ((pawns << 7) & ~chess.BB_FILE_H) | ((pawns << 9) & ~chess.BB_FILE_A)
+    else:
+        attacks = ((pawns >> 7) & ~chess.BB_FILE_A) | ((pawns >> 9) & ~chess.BB_FILE_H)
+    attacks &= chess.BB_ALL
+
+    for square in chess.scan_forward(board.pieces_mask(chess.KNIGHT, color)):
+        attacks |= chess.BB_KNIGHT_ATTACKS[square]
+    for square in chess.scan_forward(board.pieces_mask(chess.KING, color)):
+        attacks |= chess.BB_KING_ATTACKS[square]
+
+    sliders = board.occupied_co[color] & (board.bishops | board.rooks | board.queens)
+    for square in chess.scan_forward(sliders):
+        attacks |= board.attacks_mask(square)
+    return attacks
+
+
+def attack_tenths(board: chess.Board):
+    """
+    Termes 'pièce en danger / échangée / protégée' de evaluate_board, vus des blancs,
+    calculés avec deux cartes d'attaque au lieu de deux scans par pièce.
+    """
+    white_attacks = attack_map(board, chess.WHITE)
+    black_attacks = attack_map(board, chess.BLACK)
+    score = 0
+    for color, own, enemy in ((chess.WHITE, white_attacks, black_attacks),
+                              (chess.BLACK, black_attacks, white_attacks)):
+        pieces = board.occupied_co[color]
+        hanging = chess.popcount(pieces & ~own & enemy)
+        exchanged = chess.popcount(pieces & own & enemy)
+        protected = chess.popcount(pieces & own & ~enemy)
+        term = HANGING_TENTHS * hanging + EXCHANGE_TENTHS * exchanged + PROTECTED_TENTHS * protected
+        score += term if color == chess.WHITE else -term
+    return score
+
+
+def see(board: chess.Board, move: chess.Move):
+    """
+    Static Exchange Evaluation : gain matériel (dixièmes de pion, pour le camp
+    qui joue) de la suite de prises sur la case d'arrivée, chaque camp reprenant
+    avec sa pièce la moins chère et pouvant s'arrêter quand il y perdrait.
+    Les pièces qui se découvrent (tour derrière une dame...) sont prises en compte ;
+    les clouages ne le sont pas.
+    """
+    to_square = move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
+    if board.is_en_passant(move):
+        captured = chess.PAWN
+        occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn == chess.WHITE else to_square + 8]
+    else:
+        captured = board.piece_type_at(to_square)
+    on_square = move.promotion or board.piece_type_at(move.from_square)
+
+    gains = [PIECE_TENTHS[captured] if captured else 0]
+    if move.promotion:
+        gains[0] += PIECE_TENTHS[move.promotion] - PIECE_TENTHS[chess.PAWN]
+    color = not board.turn
+    while True:
+        attackers = board.attackers_mask(color, to_square, occupied) & occupied
+        if not attackers:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            candidates = attackers & board.pieces_mask(piece_type, color)
+            if candidates:
+                break
+        square_mask = candidates & -candidates
+        if piece_type == chess.KING and board.attackers_mask(not color, to_square, occupied ^ square_mask) & occupied:
+            break  # le roi ne peut pas reprendre sur une case défendue
+        gains.append(PIECE_TENTHS[on_square] - gains[-1])
+        occupied ^= square_mask
+        on_square = piece_type
+        color = not color
+
+    # Chaque camp choisit entre reprendre et s'arrêter, en partant de la fin
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+def static_tenths(board: chess.Board):
+    """Matériel + centre + roi sur sa première rangée, recalculé depuis zéro."""
+    score = 0
+    for square, piece in board.piece_map().items():
+        score += PIECE_SQUARE[piece.color][piece.piece_type][square]
+    return score
+
+
+class IncrementalEvaluator:
+    """
+    Évaluateur équivalent à evaluate_board, tenu à jour coup par coup.
+
+    Les termes qui ne dépendent que d'une pièce et de sa case (matériel,
+    centre, roi) sont ajoutés/retirés à chaque push/pop : seules les cases
+    touchées par le coup sont recalculées. Les termes d'attaque dépendent
+    de toute la position et sont recalculés une fois par nœud, à partir
+    des cartes d'attaque.
+
+    Sans attack_terms, l'évaluation se limite aux termes statiques : la
+    recherche de quiescence résout les prises en cours bien plus sûrement
+    que ces termes, qui coûtent deux cartes d'attaque par évaluation.
+
+    Tous les coups doivent passer par push()/pop() de l'évaluateur.
+    """
+
+    def __init__(self, board: chess.Board, attack_terms=True):
+        self.board = board
+        self.attack_terms = attack_terms
+        self.static = static_tenths(board)
+        self._deltas = []
+
+    def _touched_squares(self, move: chess.Move):
+        board = self.board
+        if board.is_en_passant(move):
+            captured = chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square))
+            return (move.from_square, move.to_square, captured)
+        if board.is_castling(move):
+            # Roi et tour changent de case (coup noté e1g1 ou e1h1)
+            rank = chess.square_rank(move.from_square)
+            files = (4, 5, 6, 7) if board.is_kingside_castling(move) else (0, 2, 3, 4)
+            return {move.from_square, move.to_square} | {chess.square(file, rank) for file in files}
+        return (move.from_square, move.to_square)
+
+    def _squares_tenths(self, squares):
+        board = self.board
+        score = 0
+        for square in squares:
+            piece_type = board.piece_type_at(square)
+            if piece_type:
+                color = bool(board.occupied_co[chess.WHITE] & chess.BB_SQUARES[square])
+                score += PIECE_SQUARE[color][piece_type][square]
+        return score
+
+    def push(self, move: chess.Move):
+        squares = self._touched_squares(move)
+        before = self._squares_tenths(squares)
+        self.board.push(move)
+        delta = self._squares_tenths(squares) - before
+        self.static += delta
+        self._deltas.append(delta)
+
+    def pop(self):
+        self.static -= self._deltas.pop()
+        return self.board.pop()
+
+    def evaluate_tenths(self):
+        """Score vu des blancs, en dixièmes de pion."""
+        if not self.attack_terms:
+            return self.static
+        return self.static + attack_tenths(self.board)
+
+    def evaluate(self):
+        """Même convention que evaluate_board : score du point de vue du joueur au trait."""
+        score = self.evaluate_tenths() / 10
+        return score if self.board.turn == chess.WHITE else -score
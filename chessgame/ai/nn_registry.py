@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+import chess
+
+from chessgame.ai.config import get_setting
+from chessgame.ai.tablebase import get_tablebase
+
+# torch et ai_nn ne sont importés qu'au premier chargement du modèle :
+# le démarrage de l'application ne paie pas leur coût.
+
+DEFAULT_SEARCH_DEPTH = 2
+
+# Délai minimal entre deux vérifications de la date du fichier de poids
+RELOAD_CHECK_INTERVAL = 5.0
+
+UNTRAINED_VERSION = "untrained"
+
+
+def model_version(path, mtime):
+    """Version d'un fichier de poids : son nom et sa date (UNTRAINED_VERSION sans fichier)."""
+    if mtime is None:
+        return UNTRAINED_VERSION
+    return f"{os.path.basename(path)}@{int(mtime)}"
+
+
+class LoadedModel:
+    """Un modèle prêt à servir et sa version (nom du fichier + date)."""
+
+    def __init__(self, model, version, mtime):
+        self.model = model
+        self.version = version
+        self.mtime = mtime
+
+
+class ModelRegistry:
+    """
+    Charge les poids de SimpleChessNN une fois par processus.
+
+    Si le fichier de poids change sur le disque, le nouveau modèle est
+    construit à part puis publié d'un seul coup : les requêtes en cours
+    gardent leur référence vers l'ancien modèle et se terminent normalement.
+    Sans fichier de poids, un réseau non entraîné (graine fixe) est servi.
+    """
+
+    def __init__(self, path, num_threads=1, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = str(path)
+        self.num_threads = num_threads
+        self.check_interval = check_interval
+        self._current = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Version du fichier de poids actuellement sur le disque, sans le charger."""
+        return model_version(self.path, self._file_mtime())
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _needs_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        return self._file_mtime() != self._current.mtime
+
+    def _load(self):
+        import torch
+        from chessgame.ai.ai_nn import SimpleChessNN
+
+        torch.set_num_threads(self.num_threads)
+        mtime = self._file_mtime()
+        if mtime is None:
+            torch.manual_seed(0)
+        model = SimpleChessNN()
+        if mtime is not None:
+            model.load_state_dict(torch.load(self.path, map_location="cpu", weights_only=True))
+        version = model_version(self.path, mtime)
+        model.eval()
+        model.requires_grad_(False)
+        return LoadedModel(model, version, mtime)
+
+    def get(self):
+        """Modèle courant, (re)chargé si nécessaire."""
+        current = self._current
+        if current is None or self._needs_reload():
+            with self._lock:
+                if self._current is None or self._current is current:
+                    self._current = self._load()
+                    self._last_check = time.monotonic()
+                current = self._current
+        return current
+
+    def reload(self):
+        """Force le rechargement (ex: après un entraînement)."""
+        with self._lock:
+            self._current = self._load()
+            self._last_check = time.monotonic()
+        return self._current
+
+
+_registry = None
+_local = threading.local()
+
+
+def get_model_registry():
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(
+            get_setting("NN_MODEL_PATH", "simple_chess_nn.pt"),
+            get_setting("NN_NUM_THREADS", 1),
+        )
+    return _registry
+
+
+def warm_up():
+    """Importe torch et charge les poids avant la première partie contre le réseau."""
+    get_model_registry().get()
+
+
+def _leaf_batch():
+    """Tampon des feuilles propre à chaque thread."""
+    from chessgame.ai.ai_nn import LeafBatch
+
+    batch = getattr(_local, "batch", None)
+    if batch is None:
+        batch = _local.batch = LeafBatch()
+    return batch
+
+
+def get_nn_ai_move(fen, depth=None, use_book=True):
+    """
+    Point d'entrée appelé depuis le backend Django : même format de réponse
+    que get_minimax_move, plus la version du modèle utilisé.
+    Le livre d'ouvertures et les tables de finales sont consultés avant le réseau.
+    """
+    # Importés ici : le serveur web n'importe ce module que pour la version du modèle
+    from chessgame.ai.ai_minimax import known_move
+    from chessgame.ai.ai_nn import choose_move
+
+    if depth is None:
+        depth = get_setting("NN_SEARCH_DEPTH", DEFAULT_SEARCH_DEPTH)
+    start = time.perf_counter()
+    board = chess.Board(fen)
+    move, source = known_move(board, use_book, get_tablebase())
+    if move:
+        return {
+            "from": move.uci()[:2],
+            "to": move.uci()[2:4],
+            "uci": move.uci(),
+            "depth": 0,
+            "nodes": 0,
+            "time_ms": round((time.perf_counter() - start) * 1000, 1),
+            "book": source == "book",
+            "tablebase": source == "tablebase",
+        }
+
+    loaded = get_model_registry().get()
+    batch = _leaf_batch()
+
+    move = choose_move(board, loaded.model, depth, batched=True, batch=batch)
+    if move:
+        return {
+            "from": move.uci()[:2],
+            "to": move.uci()[2:4],
+            "uci": move.uci(),
+            "depth": depth,
+            "nodes": batch.size,
+            "time_ms": round((time.perf_counter() - start) * 1000, 1),
+            "model": loaded.version,
+            "book": False,
+            "tablebase": False,
+        }
+    return None
@@ -0,0 +1,168 @@
+import collections
+import os
+import random
+import struct
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+from chessgame.ai.config import get_setting
+from chessgame.ai.transposition import zobrist_key
+
+# Format Polyglot : entrées de 16 octets (clé Zobrist, coup, poids, apprentissage),
+# gros-boutistes, triées par clé. La lecture se fait par memory-mapping et
+# recherche dichotomique (chess.polyglot.MemoryMappedReader).
+ENTRY_STRUCT = struct.Struct(">QHHI")
+MAX_WEIGHT = 0xFFFF
+
+DEFAULT_MAX_PLY = 24
+
+# Poids d'un coup selon le résultat de la partie, pour le camp qui l'a joué
+WIN_WEIGHT = 2
+DRAW_WEIGHT = 1
+
+
+class OpeningBook:
+    """Livre d'ouvertures ouvert en lecture (fichier mappé en mémoire)."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.mtime = os.stat(self.path).st_mtime
+        self._reader = chess.polyglot.open_reader(self.path)
+
+    def __len__(self):
+        return len(self._reader)
+
+    def entries(self, board):
+        """
+        [(coup, poids)] légaux pour cette position, du plus au moins joué.
+        Une seule clé Zobrist calculée, puis recherche dichotomique dans le fichier.
+        """
+        found = []
+        for entry in self._reader.find_all(zobrist_key(board)):
+            move = decode_move(board, entry.move)
+            if board.is_legal(move):
+                found.append((move, entry.weight))
+        found.sort(key=lambda item: item[1], reverse=True)
+        return found
+
+    def move(self, board, rng=None):
+        """Coup tiré au hasard, proportionnellement aux poids ; None hors du livre."""
+        entries = self.entries(board)
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return (rng or random).choices(moves, weights)[0]
+
+    def close(self):
+        self._reader.close()
+
+
+_books = {}
+
+
+def get_opening_book(path=None):
+    """
+    Livre du processus courant (OPENING_BOOK_PATH), rouvert si le fichier a
+    été reconstruit. Retourne None s'il n'y a pas de livre.
+    """
+    path = str(path or get_setting("OPENING_BOOK_PATH", ""))
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    book = _books.get(path)
+    if book is None or book.mtime != mtime:
+        book = _books[path] = OpeningBook(path)
+    return book
+
+
+def book_move(board, rng=None):
+    """Coup du livre pour cette position, ou None (pas de livre ou position inconnue)."""
+    book = get_opening_book()
+    if book is None:
+        return None
+    return book.move(board, rng)
+
+
+# --- Format des coups -------------------------------------------------------
+
+def decode_move(board, move):
+    """Coup Polyglot -> python-chess : le roque noté roi -> tour (e1h1) devient e1g1."""
+    if (board.kings & chess.BB_SQUARES[move.from_square]
+            and board.rooks & board.occupied_co[board.turn] & chess.BB_SQUARES[move.to_square]):
+        king_file = 6 if move.to_square > move.from_square else 2
+        return chess.Move(move.from_square, chess.square(king_file, chess.square_rank(move.from_square)))
+    return move
+
+
+def encode_move(board, move):
+    """Coup au format Polyglot (le roque est noté roi -> tour : e1h1, e1a1)."""
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if board.is_kingside_castling(move) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+def build_book(pgn_paths, out_path, max_ply=DEFAULT_MAX_PLY, min_games=2, progress=None):
+    """
+    Construit un livre Polyglot à partir de fichiers PGN.
+
+    Chaque coup des max_ply premiers demi-coups reçoit 2 points par victoire
+    et 1 par nulle du camp qui l'a joué (au minimum 1) ; les coups vus dans
+    moins de min_games parties sont écartés. Retourne (parties lues, entrées écrites).
+    """
+    counts = collections.defaultdict(lambda: [0, 0])  # (clé, coup) -> [parties, poids]
+    games = 0
+    for pgn_path in pgn_paths:
+        with open(pgn_path, encoding="utf-8", errors="replace") as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                games += 1
+                result = game.headers.get("Result", "*")
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_ply:
+                        break
+                    if result == "1/2-1/2":
+                        points = DRAW_WEIGHT
+                    elif result == ("1-0" if board.turn else "0-1"):
+                        points = WIN_WEIGHT
+                    else:
+                        points = 0
+                    counter = counts[(zobrist_key(board), encode_move(board, move))]
+                    counter[0] += 1
+                    counter[1] += points
+                    board.push(move)
+                if progress and games % 1000 == 0:
+                    progress(games, len(counts))
+
+    by_key = collections.defaultdict(list)
+    for (key, raw_move), (seen, weight) in counts.items():
+        if seen >= min_games:
+            # Un coup jamais gagnant garde un poids minimal : le livre couvre les deux camps
+            by_key[key].append((raw_move, max(1, weight)))
+
+    entries = []
+    for key, moves in by_key.items():
+        # Les poids sont sur 16 bits : mise à l'échelle position par position
+        scale = min(1.0, MAX_WEIGHT / max(weight for _, weight in moves))
+        for raw_move, weight in moves:
+            entries.append((key, raw_move, max(1, int(weight * scale))))
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+
+    tmp = f"{out_path}.tmp"
+    directory = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(directory, exist_ok=True)
+    with open(tmp, "wb") as f:
+        for key, raw_move, weight in entries:
+            f.write(ENTRY_STRUCT.pack(key, raw_move, weight, 0))
+    os.replace(tmp, out_path)
+    return games, len(entries)
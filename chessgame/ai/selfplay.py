@@ -0,0 +1,171 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import chess
+import numpy as np
+
+from chessgame.ai.ai_nn import LeafBatch, choose_move
+from chessgame.ai.encoding import PACKED_WORDS, pack_board
+from chessgame.ai.nn_registry import ModelRegistry
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+# Positions compactes (13 uint64, voir encoding.py) ; les shards de la version 1
+# (773 plans en uint8, "planes-u8") sont refusés et doivent être régénérés
+ENCODING = "packed-u64"
+
+# Résultat final vu des blancs (une partie non terminée compte comme nulle)
+RESULT_VALUES = {"1-0": 1, "0-1": -1, "1/2-1/2": 0, "*": 0}
+
+# Étiquettes stockées à côté des positions
+LABEL_DTYPE = np.dtype([("turn", "u1"), ("result", "i1")])
+
+
+def shard_name(index):
+    return f"shard_{index:05d}"
+
+
+def play_game(model, depth, max_moves, rng, opening_plies, batch):
+    """
+    Joue une partie du réseau contre lui-même. Les premiers coups sont tirés
+    au hasard pour que les parties ne soient pas toutes identiques.
+    Retourne (positions compactes, camps au trait, résultat).
+    """
+    board = chess.Board()
+    positions = []
+    turns = []
+
+    while not board.is_game_over() and len(board.move_stack) < max_moves:
+        positions.append(pack_board(board))
+        turns.append(int(board.turn))
+
+        if len(board.move_stack) < opening_plies:
+            move = rng.choice(list(board.legal_moves))
+        else:
+            move = choose_move(board, model, depth, batched=True, batch=batch)
+        board.push(move)
+
+    return positions, turns, board.result()
+
+
+# --- Worker -----------------------------------------------------------------
+
+_model = None
+
+
+def _init_worker(model_path):
+    global _model
+    # Un seul thread torch par worker : le parallélisme vient des processus
+    _model = ModelRegistry(model_path, num_threads=1).get().model
+
+
+def _write_atomic(path, array):
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def generate_shard(index, out_dir, games, depth, max_moves, opening_plies, seed):
+    """
+    Joue `games` parties et les écrit dans un shard :
+    - <shard>.x.npy : positions compactes, uint64 (N, 13), voir encoding.unpack_batch
+    - <shard>.y.npy : étiquettes (camp au trait, résultat final vu des blancs)
+    Les deux fichiers peuvent être ouverts avec np.load(..., mmap_mode="r").
+    """
+    start = time.perf_counter()
+    rng = random.Random(seed * 1_000_003 + index)
+    batch = LeafBatch()
+    positions, labels = [], []
+    results = {key: 0 for key in RESULT_VALUES}
+
+    for _ in range(games):
+        game_positions, turns, result = play_game(_model, depth, max_moves, rng, opening_plies, batch)
+        positions.extend(game_positions)
+        labels.extend((turn, RESULT_VALUES[result]) for turn in turns)
+        results[result] += 1
+
+    x = np.stack(positions) if positions else np.empty((0, PACKED_WORDS), dtype=np.uint64)
+    y = np.array(labels, dtype=LABEL_DTYPE)
+    name = shard_name(index)
+    _write_atomic(os.path.join(out_dir, f"{name}.x.npy"), x)
+    _write_atomic(os.path.join(out_dir, f"{name}.y.npy"), y)
+    return {
+        "index": index,
+        "games": games,
+        "positions": len(y),
+        "results": results,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# --- Manifeste -------------------------------------------------------------
+
+def load_manifest(out_dir, config):
+    """Manifeste existant (reprise) ou nouveau. La configuration doit être identique."""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "encoding": ENCODING, "config": config, "shards": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("encoding", "planes-u8") != ENCODING:
+        raise ValueError(f"{path} utilise l'encodage {manifest.get('encoding', 'planes-u8')}, pas {ENCODING}")
+    if manifest.get("config") != config:
+        raise ValueError(f"{path} a été produit avec une autre configuration : {manifest.get('config')}")
+    return manifest
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def generate(out_dir, num_shards, games_per_shard, workers=1, depth=1, max_moves=200,
+             opening_plies=6, seed=0, model_path="", progress=None):
+    """
+    Génère num_shards shards en parallèle. Les shards déjà listés dans le
+    manifeste sont sautés : relancer la même commande reprend là où elle
+    s'était arrêtée. progress(stats, totals) est appelé après chaque shard.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    config = {
+        "games_per_shard": games_per_shard,
+        "depth": depth,
+        "max_moves": max_moves,
+        "opening_plies": opening_plies,
+        "seed": seed,
+    }
+    manifest = load_manifest(out_dir, config)
+    todo = [index for index in range(num_shards) if shard_name(index) not in manifest["shards"]]
+
+    start = time.perf_counter()
+    totals = {"shards": 0, "games": 0, "positions": 0}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        futures = [
+            pool.submit(generate_shard, index, out_dir, games_per_shard, depth, max_moves, opening_plies, seed)
+            for index in todo
+        ]
+        for future in as_completed(futures):
+            stats = future.result()
+            manifest["shards"][shard_name(stats["index"])] = {
+                "games": stats["games"],
+                "positions": stats["positions"],
+                "results": stats["results"],
+            }
+            save_manifest(out_dir, manifest)
+
+            totals["shards"] += 1
+            totals["games"] += stats["games"]
+            totals["positions"] += stats["positions"]
+            elapsed = time.perf_counter() - start
+            totals["games_per_s"] = totals["games"] / elapsed
+            totals["positions_per_s"] = totals["positions"] / elapsed
+            if progress:
+                progress(stats, totals)
+
+    return manifest, totals
@@ -0,0 +1,118 @@
+import logging
+import multiprocessing
+import queue
+
+import chess
+
+from chessgame.ai.ai_minimax import helper_search, iterative_deepening
+from chessgame.ai.config import get_setting
+from chessgame.ai.tablebase import get_tablebase
+from chessgame.ai.transposition import SharedTranspositionTable, get_transposition_table
+
+logger = logging.getLogger(__name__)
+
+# Attente maximale des auxiliaires après la fin de la recherche principale
+# (ils consultent le drapeau d'arrêt tous les TIME_CHECK_INTERVAL nœuds)
+STOP_TIMEOUT_S = 5.0
+
+# Les processus auxiliaires héritent de la table en mémoire partagée par fork
+_mp = multiprocessing.get_context("fork")
+
+
+def _helper_main(index, tt, jobs, done, stop):
+    """Boucle d'un processus auxiliaire : une position à la fois, jusqu'à None."""
+    tablebase = get_tablebase()
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        fen, max_depth = job
+        # Un auxiliaire sur deux commence une profondeur plus loin : les
+        # processus ne parcourent pas tous le même arbre au même moment
+        stats = helper_search(chess.Board(fen), max_depth, tt, 1 + index % 2, stop.is_set, tablebase)
+        done.put(stats.nodes)
+
+
+class HelperPool:
+    """
+    Recherche parallèle Lazy SMP : le processus courant fait la recherche
+    habituelle (temps, arrêt, résultat), pendant que helpers processus
+    auxiliaires cherchent la même position et remplissent la table de
+    transposition partagée. Le processus principal y trouve des coupures
+    et des coups déjà calculés, et atteint plus vite chaque profondeur.
+    """
+
+    def __init__(self, helpers, tt):
+        if not isinstance(tt, SharedTranspositionTable):
+            raise TypeError("La recherche Lazy SMP demande une SharedTranspositionTable")
+        self.tt = tt
+        self.broken = False
+        self._stop = _mp.Event()
+        self._done = _mp.Queue()
+        self._jobs = []
+        self._processes = []
+        for index in range(helpers):
+            jobs = _mp.SimpleQueue()
+            process = _mp.Process(target=_helper_main, args=(index, tt, jobs, self._done, self._stop), daemon=True)
+            process.start()
+            self._jobs.append(jobs)
+            self._processes.append(process)
+
+    @property
+    def helpers(self):
+        return len(self._processes)
+
+    def search(self, board, max_depth, threads, time_ms=None, should_stop=None, tablebase=None, on_iteration=None):
+        """
+        Comme iterative_deepening, avec threads - 1 auxiliaires (au plus helpers).
+        Les nœuds des auxiliaires sont ajoutés aux compteurs du résultat.
+        """
+        jobs = self._jobs[:max(0, threads - 1)]
+        self._stop.clear()
+        for helper_jobs in jobs:
+            helper_jobs.put((board.fen(), max_depth))
+        try:
+            score, move, ctx = iterative_deepening(board, max_depth, self.tt, time_ms, should_stop, tablebase,
+                                                   on_iteration)
+        finally:
+            self._stop.set()
+            helper_nodes = self._collect(len(jobs))
+        ctx.stats.nodes += helper_nodes
+        ctx.stats.threads = len(jobs) + 1
+        return score, move, ctx
+
+    def _collect(self, count):
+        """Attend que les auxiliaires soient libres, pour ne pas déborder sur la requête suivante."""
+        nodes = 0
+        for _ in range(count):
+            try:
+                nodes += self._done.get(timeout=STOP_TIMEOUT_S)
+            except queue.Empty:
+                logger.warning("Processus auxiliaire Lazy SMP sans réponse : le groupe sera recréé")
+                self.broken = True
+                break
+        return nodes
+
+    def close(self):
+        for jobs in self._jobs:
+            jobs.put(None)
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        self._jobs = []
+        self._processes = []
+
+
+_pool = None
+
+
+def get_helper_pool():
+    """Auxiliaires du processus courant (ENGINE_SEARCH_THREADS - 1), créés au premier appel."""
+    global _pool
+    if _pool is not None and _pool.broken:
+        _pool.close()
+        _pool = None
+    if _pool is None:
+        _pool = HelperPool(get_setting("ENGINE_SEARCH_THREADS", 1) - 1, get_transposition_table())
+    return _pool
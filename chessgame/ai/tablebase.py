@@ -0,0 +1,154 @@
+import collections
+import os
+import threading
+
+import chess
+import chess.syzygy
+
+from chessgame.ai.config import get_setting
+from chessgame.ai.transposition import zobrist_key
+
+# Score d'une position gagnée d'après les tables : bien au-dessus de toute
+# évaluation heuristique, mais en dessous des scores de mat de la recherche
+TB_WIN_SCORE = 5000
+
+DEFAULT_CACHE_SIZE = 100_000
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Cache borné : les résultats les moins récemment utilisés sont oubliés."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is not _MISSING:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class TablebaseProber:
+    """
+    Sondes Syzygy (chess.syzygy) avec cache LRU, indexé par clé Zobrist.
+    Les positions absentes des tables (fichier manquant) sont aussi mises en
+    cache, pour ne pas retenter la lecture à chaque nœud.
+    """
+
+    def __init__(self, tablebase, max_pieces, cache_size=DEFAULT_CACHE_SIZE):
+        self.tablebase = tablebase
+        self.max_pieces = max_pieces
+        self.hits = 0
+        self.probes = 0
+        self._wdl = LRUCache(cache_size)
+        self._dtz = LRUCache(cache_size)
+
+    def covers(self, board):
+        """Assez peu de pièces, et pas de droit de roque (absents des tables Syzygy)."""
+        return chess.popcount(board.occupied) <= self.max_pieces and not board.castling_rights
+
+    def _probe(self, cache, probe, board):
+        key = zobrist_key(board)
+        value = cache.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.probes += 1
+        try:
+            value = probe(board)
+        except KeyError:  # table manquante
+            value = None
+        cache.put(key, value)
+        return value
+
+    def probe_wdl(self, board):
+        """2 gain, 0 nulle, -2 perte pour le camp au trait (±1 : gain/perte annulés par les 50 coups)."""
+        return self._probe(self._wdl, self.tablebase.probe_wdl, board)
+
+    def probe_dtz(self, board):
+        return self._probe(self._dtz, self.tablebase.probe_dtz, board)
+
+    def search_score(self, board):
+        """Score de la position pour la recherche (camp au trait), ou None si inconnue."""
+        wdl = self.probe_wdl(board)
+        if wdl is None:
+            return None
+        if wdl == 2:
+            return TB_WIN_SCORE
+        if wdl == -2:
+            return -TB_WIN_SCORE
+        return 0
+
+    def root_move(self, board):
+        """
+        Coup DTZ-optimal : le meilleur résultat, puis le mat immédiat, puis
+        (en gagnant) le plus court chemin vers une prise ou un coup de pion,
+        ou (en perdant) le plus long. None si une des positions manque.
+        """
+        if not self.covers(board):
+            return None
+        best_move, best_rank = None, None
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            try:
+                mate = board.is_checkmate()
+                wdl = self.probe_wdl(board)
+                dtz = self.probe_dtz(board)
+            finally:
+                board.pop()
+            if wdl is None or dtz is None:
+                return None
+            result = -wdl
+            distance = 0 if zeroing else abs(dtz)
+            rank = (result, mate, -distance if result > 0 else distance)
+            if best_rank is None or rank > best_rank:
+                best_move, best_rank = move, rank
+        return best_move
+
+
+def largest_table(tablebase):
+    """Nombre de pièces de la plus grande table WDL chargée (ex: "KQvK" -> 3)."""
+    return max((len(name) - 1 for name in tablebase.wdl), default=0)
+
+
+_probers = {}
+
+
+def get_tablebase(path=None):
+    """
+    Sondes du processus courant pour SYZYGY_PATH (plusieurs dossiers séparés
+    par os.pathsep). Retourne None si aucun fichier de table n'est présent.
+    """
+    path = str(path if path is not None else get_setting("SYZYGY_PATH", ""))
+    if path in _probers:
+        return _probers[path]
+
+    prober = None
+    directories = [directory for directory in path.split(os.pathsep) if os.path.isdir(directory)]
+    if directories:
+        tablebase = chess.syzygy.Tablebase()
+        for directory in directories:
+            tablebase.add_directory(directory)
+        max_pieces = min(largest_table(tablebase), get_setting("SYZYGY_PROBE_LIMIT", 7))
+        if max_pieces:
+            prober = TablebaseProber(tablebase, max_pieces, get_setting("SYZYGY_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+        else:
+            tablebase.close()
+    _probers[path] = prober
+    return prober
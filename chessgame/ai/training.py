@@ -0,0 +1,209 @@
+import json
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as f
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+from chessgame.ai.ai_nn import SimpleChessNN
+from chessgame.ai.encoding import unpack_batch
+from chessgame.ai.selfplay import ENCODING, MANIFEST_NAME
+
+
+def collate_batch(batch):
+    """Les lots sont déjà assemblés par ShardDataset.__getitems__."""
+    return batch
+
+
+class ShardDataset(Dataset):
+    """
+    Positions des shards d'auto-apprentissage, lues par memory-mapping :
+    seules les pages réellement utilisées sont chargées en mémoire.
+
+    Chaque exemple est (position float32 (773,), résultat vu des blancs),
+    ce que prédit SimpleChessNN (sortie tanh, les blancs maximisent).
+    Le DataLoader demande des lots entiers (__getitems__) : les positions
+    compactes d'un lot sont décodées en une seule opération vectorisée.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        path = os.path.join(data_dir, MANIFEST_NAME)
+        with open(path) as file:
+            manifest = json.load(file)
+        encoding = manifest.get("encoding", "planes-u8")
+        if encoding != ENCODING:
+            raise ValueError(f"{path} utilise l'encodage {encoding}, pas {ENCODING} : shards à régénérer")
+        self.shards = sorted(name for name, info in manifest["shards"].items() if info["positions"])
+        self.offsets = []
+        total = 0
+        for name in self.shards:
+            self.offsets.append(total)
+            total += manifest["shards"][name]["positions"]
+        self.length = total
+        self._starts = np.array(self.offsets, dtype=np.int64)
+        # Ouverts à la demande, dans chaque worker du DataLoader
+        self._arrays = {}
+
+    def __len__(self):
+        return self.length
+
+    def _open(self, name):
+        arrays = self._arrays.get(name)
+        if arrays is None:
+            x = np.load(os.path.join(self.data_dir, f"{name}.x.npy"), mmap_mode="r")
+            y = np.load(os.path.join(self.data_dir, f"{name}.y.npy"), mmap_mode="r")
+            arrays = self._arrays[name] = (x, y)
+        return arrays
+
+    def __getitems__(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        shard_ids = np.searchsorted(self._starts, indices, side="right") - 1
+        rows = None
+        targets = np.empty((len(indices), 1), dtype=np.float32)
+
+        for shard in np.unique(shard_ids):
+            x, y = self._open(self.shards[shard])
+            selected = shard_ids == shard
+            local = indices[selected] - self.offsets[shard]
+            if rows is None:
+                rows = np.empty((len(indices), x.shape[1]), dtype=x.dtype)
+            rows[selected] = x[local]
+            targets[selected, 0] = y["result"][local]
+
+        positions = unpack_batch(rows)
+        return torch.from_numpy(positions), torch.from_numpy(targets)
+
+    def __getitem__(self, index):
+        positions, targets = self.__getitems__([index])
+        return positions[0], targets[0]
+
+    def __getstate__(self):
+        # Les memmaps ne sont pas envoyés aux workers : chacun rouvre les fichiers
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        return state
+
+
+class ResumableSampler(Sampler):
+    """
+    Ordre aléatoire des exemples, fixé par (seed, époque) : une époque
+    interrompue peut reprendre là où elle s'était arrêtée, en sautant les
+    skip premiers exemples de cet ordre.
+    set_epoch() est appelé avant chaque époque, comme pour DistributedSampler.
+    """
+
+    def __init__(self, length, seed=0):
+        self.length = length
+        self.seed = seed
+        self.epoch = 0
+        self.skip = 0
+
+    def set_epoch(self, epoch, skip=0):
+        self.epoch = epoch
+        self.skip = skip
+
+    def __iter__(self):
+        generator = torch.Generator().manual_seed(self.seed + self.epoch)
+        order = torch.randperm(self.length, generator=generator)
+        return iter(order[self.skip:].tolist())
+
+    def __len__(self):
+        return max(0, self.length - self.skip)
+
+
+def save_atomic(obj, path):
+    """Écrit dans un fichier temporaire puis renomme : un lecteur ne voit jamais un fichier à moitié écrit."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def train(data_dir, weights_path, epochs=1, batch_size=256, lr=1e-3, workers=2, threads=1,
+          checkpoint_path=None, checkpoint_every=1000, pin_memory=False, progress=None, seed=0):
+    """
+    Entraîne SimpleChessNN sur CPU (erreur quadratique sur le résultat final).
+
+    - checkpoint_path : état complet (modèle, optimiseur, époque, exemples
+      déjà vus dans l'époque), sauvegardé toutes les checkpoint_every étapes ;
+      l'entraînement reprend depuis ce fichier, sans revoir ces exemples
+      (l'ordre des exemples d'une époque ne dépend que de seed)
+    - weights_path : poids seuls, réécrits à chaque fin d'époque, au format
+      attendu par le ModelRegistry du serveur (rechargement à chaud)
+    - progress(epoch, stats) reçoit la perte moyenne et les exemples/s
+      (sur les seuls lots vus depuis la reprise, pour une époque reprise)
+    """
+    torch.set_num_threads(threads)
+    dataset = ShardDataset(data_dir)
+    sampler = ResumableSampler(len(dataset), seed)
+    loader = DataLoader(
+        dataset,
+        batch_size=batch_size,
+        sampler=sampler,
+        num_workers=workers,
+        pin_memory=pin_memory,
+        persistent_workers=workers > 0,
+        collate_fn=collate_batch,
+    )
+
+    model = SimpleChessNN()
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    first_epoch, step, resume_position = 0, 0, 0
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        first_epoch, step = checkpoint["epoch"], checkpoint["step"]
+        resume_position = checkpoint.get("position", 0)
+
+    def save_checkpoint(epoch, position=0):
+        if checkpoint_path:
+            save_atomic({
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "epoch": epoch,
+                "step": step,
+                "position": position,
+            }, checkpoint_path)
+
+    history = []
+    for epoch in range(first_epoch, epochs):
+        model.train()
+        start = time.perf_counter()
+        samples, total_loss = 0, 0.0
+        # Exemples déjà vus avant l'interruption : ils ne sont pas relus
+        position = resume_position if epoch == first_epoch else 0
+        sampler.set_epoch(epoch, position)
+
+        for positions, targets in loader:
+            optimizer.zero_grad()
+            loss = f.mse_loss(model(positions), targets)
+            loss.backward()
+            optimizer.step()
+
+            samples += len(positions)
+            total_loss += loss.item() * len(positions)
+            step += 1
+            position += len(positions)
+            if checkpoint_every and step % checkpoint_every == 0:
+                save_checkpoint(epoch, position)
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "epoch": epoch + 1,
+            "samples": samples,
+            "loss": total_loss / samples if samples else 0.0,
+            "samples_per_s": samples / elapsed if elapsed else 0.0,
+            "seconds": elapsed,
+        }
+        history.append(stats)
+        save_checkpoint(epoch + 1)
+        save_atomic(model.state_dict(), weights_path)
+        if progress:
+            progress(epoch + 1, stats)
+
+    return model, history
@@ -0,0 +1,266 @@
+import mmap
+
+import chess
+import chess.polyglot
+
+from chessgame.ai.config import get_setting
+
+# Type de borne stockée avec le score
+EXACT = 0
+LOWER = 1  # score >= valeur stockée (coupure beta)
+UPPER = 2  # score <= valeur stockée (aucun coup n'a battu alpha)
+
+# Taille estimée d'une entrée en mémoire (tuple + clé + référence de liste)
+ENTRY_SIZE_BYTES = 136
+
+DEFAULT_SIZE_MB = 64
+
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+# Clés par case, dans l'ordre Polyglot : pion noir, pion blanc, cavalier noir...
+_PIECE_KEYS = [_RANDOM[64 * index:64 * (index + 1)] for index in range(12)]
+_CASTLING_KEYS = (
+    (chess.BB_H1, _RANDOM[768]),
+    (chess.BB_A1, _RANDOM[769]),
+    (chess.BB_H8, _RANDOM[770]),
+    (chess.BB_A8, _RANDOM[771]),
+)
+_EP_KEYS = _RANDOM[772:780]
+_TURN_KEY = _RANDOM[780]
+
+
+def zobrist_key(board: chess.Board):
+    """
+    Clé Zobrist (Polyglot) de la position, identique à chess.polyglot.zobrist_hash
+    mais parcourt les bitboards par type de pièce au lieu d'appeler piece_type_at.
+    """
+    key = 0
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    pieces = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+    for index, mask in enumerate(pieces):
+        keys = _PIECE_KEYS[2 * index]
+        for square in chess.scan_reversed(mask & black):
+            key ^= keys[square]
+        keys = _PIECE_KEYS[2 * index + 1]
+        for square in chess.scan_reversed(mask & white):
+            key ^= keys[square]
+
+    if board.castling_rights:
+        rights = board.clean_castling_rights()
+        for rook, castling_key in _CASTLING_KEYS:
+            if rights & rook:
+                key ^= castling_key
+
+    if board.ep_square is not None:
+        # Seulement si un pion peut effectivement prendre en passant
+        ep = chess.BB_SQUARES[board.ep_square]
+        ep = chess.shift_down(ep) if board.turn else chess.shift_up(ep)
+        if (chess.shift_left(ep) | chess.shift_right(ep)) & board.pawns & board.occupied_co[board.turn]:
+            key ^= _EP_KEYS[chess.square_file(board.ep_square)]
+
+    if board.turn:
+        key ^= _TURN_KEY
+    return key
+
+
+class TranspositionTable:
+    """
+    Table de transposition bornée, indexée par clé Zobrist.
+
+    Chaque case contient deux entrées :
+    - une entrée "profondeur d'abord" : remplacée seulement par une recherche
+      au moins aussi profonde, ou si elle date d'une recherche précédente
+    - une entrée "toujours remplacée" : reçoit tout le reste
+
+    Une entrée est un tuple (clé, profondeur, borne, score, coup, génération).
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        slots = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_SIZE_BYTES))
+        # Puissance de deux pour indexer avec un simple masque
+        self.size = 1 << (slots.bit_length() - 1)
+        self._mask = self.size - 1
+        self._deep = [None] * self.size
+        self._recent = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Marque le début d'une recherche : les anciennes entrées profondes deviennent remplaçables."""
+        self.generation += 1
+
+    def probe(self, key):
+        index = key & self._mask
+        entry = self._deep[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self._recent[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = key & self._mask
+        entry = (key, depth, flag, score, move, self.generation)
+        deep = self._deep[index]
+        if deep is None or depth >= deep[1] or deep[5] != self.generation:
+            self._deep[index] = entry
+        else:
+            self._recent[index] = entry
+        self.stores += 1
+
+    def clear(self):
+        self._deep = [None] * self.size
+        self._recent = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+
+# Table en mémoire partagée : une case = 2 entrées de 2 mots de 64 bits
+SHARED_SLOT_WORDS = 4
+SHARED_SLOT_BYTES = 8 * SHARED_SLOT_WORDS
+
+# Mot de données d'une entrée partagée :
+# score (dixièmes de pion, décalé) | coup | profondeur | borne | génération
+SCORE_OFFSET = 1 << 31
+MOVE_SHIFT = 32
+DEPTH_SHIFT = 47
+FLAG_SHIFT = 55
+GENERATION_SHIFT = 57
+GENERATION_MASK = 0x7F
+MAX_STORED_DEPTH = 0xFF
+
+
+def pack_move(move):
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def unpack_move(packed):
+    if not packed:
+        return None
+    return chess.Move(packed & 0x3F, (packed >> 6) & 0x3F, (packed >> 12) or None)
+
+
+class SharedTranspositionTable:
+    """
+    Table de transposition dans un mmap anonyme, partagée par les processus
+    de la recherche Lazy SMP (créés par fork après la table).
+
+    Même interface et même remplacement que TranspositionTable, mais chaque
+    entrée est encodée sur deux mots : (clé ^ données, données). Les écritures
+    se font sans verrou ; une entrée déchirée par deux écritures simultanées
+    ne correspond plus à sa clé et est simplement ignorée.
+    Les scores sont stockés en dixièmes de pion, la précision de l'évaluation.
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        slots = max(1, int(size_mb * 1024 * 1024) // SHARED_SLOT_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self._mask = self.size - 1
+        # Dernier mot : génération courante, commune à tous les processus
+        self._header = self.size * SHARED_SLOT_WORDS
+        self._mmap = mmap.mmap(-1, (self._header + 1) * 8)
+        self._words = memoryview(self._mmap).cast("Q")
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @property
+    def generation(self):
+        return self._words[self._header]
+
+    def new_search(self):
+        self._words[self._header] = (self._words[self._header] + 1) & GENERATION_MASK
+
+    def _entry(self, key, data):
+        return (
+            key,
+            (data >> DEPTH_SHIFT) & MAX_STORED_DEPTH,
+            (data >> FLAG_SHIFT) & 0x3,
+            ((data & 0xFFFFFFFF) - SCORE_OFFSET) / 10,
+            unpack_move((data >> MOVE_SHIFT) & 0x7FFF),
+            data >> GENERATION_SHIFT,
+        )
+
+    def probe(self, key):
+        words = self._words
+        base = (key & self._mask) * SHARED_SLOT_WORDS
+        for index in (base, base + 2):
+            data = words[index + 1]
+            if data and words[index] ^ data == key:
+                self.hits += 1
+                return self._entry(key, data)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        words = self._words
+        generation = words[self._header]
+        data = (
+            (round(score * 10) + SCORE_OFFSET)
+            | (pack_move(move) << MOVE_SHIFT)
+            | (min(depth, MAX_STORED_DEPTH) << DEPTH_SHIFT)
+            | (flag << FLAG_SHIFT)
+            | (generation << GENERATION_SHIFT)
+        )
+        index = (key & self._mask) * SHARED_SLOT_WORDS
+        deep = words[index + 1]
+        if deep and depth < (deep >> DEPTH_SHIFT) & MAX_STORED_DEPTH and deep >> GENERATION_SHIFT == generation:
+            index += 2  # l'entrée profonde est gardée : case "toujours remplacée"
+        words[index] = key ^ data
+        words[index + 1] = data
+        self.stores += 1
+
+    def clear(self):
+        self._mmap[:] = bytes(len(self._mmap))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+
+# Table partagée par toutes les requêtes du processus (worker Daphne)
+_shared_table = None
+
+
+def get_transposition_table():
+    """
+    Retourne la table du processus, créée au premier appel (taille : ENGINE_TT_SIZE_MB).
+    Avec ENGINE_SEARCH_THREADS > 1, elle est en mémoire partagée pour la recherche Lazy SMP.
+    """
+    global _shared_table
+    if _shared_table is None:
+        size_mb = get_setting("ENGINE_TT_SIZE_MB", DEFAULT_SIZE_MB)
+        if get_setting("ENGINE_SEARCH_THREADS", 1) > 1:
+            _shared_table = SharedTranspositionTable(size_mb)
+        else:
+            _shared_table = TranspositionTable(size_mb)
+    return _shared_table
@@ -0,0 +1,175 @@
+import asyncio
+import io
+import logging
+import time
+
+import chess
+import chess.pgn
+from django.conf import settings
+
+from chessgame import metrics, move_cache
+from chessgame.ai.nn_registry import get_model_registry
+from chessgame.engine_pool import EngineBusy, get_engine_executor
+from chessgame.engines import run_engine
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("alphabeta", "nn")
+
+# Pool saturé par d'autres requêtes : on réessaie au lieu d'abandonner la position
+BUSY_RETRY_DELAY_S = 0.1
+BUSY_RETRIES = 50
+
+
+def bounded_int(data, name, maximum):
+    """
+    Paramètre entier optionnel envoyé par le client, plafonné par le serveur.
+    Lève ValueError si la valeur n'est pas un entier positif.
+    """
+    value = data.get(name)
+    if value is None:
+        return maximum
+    value = int(value)
+    if value <= 0:
+        raise ValueError(name)
+    return min(value, maximum)
+
+
+def parse_positions(data, max_positions):
+    """
+    Positions à analyser : {"fens": [...]} ou {"pgn": "..."} (la position
+    avant chaque coup de la ligne principale, avec le coup joué).
+    Retourne [(fen, coup joué ou None)]. Lève ValueError si l'entrée est invalide.
+    """
+    positions = []
+    if data.get("pgn"):
+        game = chess.pgn.read_game(io.StringIO(str(data["pgn"])))
+        if game is None or game.errors:
+            raise ValueError("PGN invalide")
+        board = game.board()
+        for move in game.mainline_moves():
+            positions.append((board.fen(), move.uci()))
+            board.push(move)
+    elif isinstance(data.get("fens"), list):
+        for fen in data["fens"]:
+            try:
+                board = chess.Board(fen)
+            except (TypeError, ValueError):
+                raise ValueError(f"FEN invalide : {fen}")
+            positions.append((board.fen(), None))
+    else:
+        raise ValueError("Champ \"fens\" (liste) ou \"pgn\" attendu")
+
+    if not positions:
+        raise ValueError("Aucune position à analyser")
+    if len(positions) > max_positions:
+        raise ValueError(f"Au plus {max_positions} positions par analyse")
+    return positions
+
+
+def analysis_request(data):
+    """
+    Paramètres d'une analyse de partie ou de positions (HTTP et WebSocket).
+    Retourne (positions, options de analyse()). Lève ValueError avec un message pour le client.
+    """
+    engine = data.get("engine", "alphabeta")
+    if engine not in ENGINES:
+        raise ValueError(f"Moteur inconnu : {engine}")
+    try:
+        if engine == "nn":
+            depth = bounded_int(data, "max_depth", settings.NN_SEARCH_DEPTH)
+        else:
+            depth = bounded_int(data, "max_depth", settings.ENGINE_MAX_DEPTH)
+        time_ms = bounded_int(data, "time_ms", settings.ENGINE_TIME_BUDGET_MS)
+    except (TypeError, ValueError):
+        raise ValueError("time_ms et max_depth doivent être des entiers positifs")
+    positions = parse_positions(data, settings.ANALYSIS_MAX_POSITIONS)
+    options = {
+        "engine": engine,
+        "depth": depth,
+        "time_ms": time_ms,
+        "concurrency": settings.ENGINE_POOL_WORKERS,
+    }
+    return positions, options
+
+
+async def _run_engine(engine, fen, depth, time_ms):
+    if engine == "nn":
+        kwargs = {"depth": depth}
+    else:
+        kwargs = {"depth": depth, "time_ms": time_ms, "cancellable": True}
+    executor = get_engine_executor()
+    for _ in range(BUSY_RETRIES):
+        try:
+            return await executor.run(run_engine, engine, fen, use_book=False, **kwargs)
+        except EngineBusy:
+            await asyncio.sleep(BUSY_RETRY_DELAY_S)
+    raise EngineBusy()
+
+
+async def analyse_position(index, fen, played, engine, depth, time_ms):
+    """Une ligne du flux d'analyse : meilleur coup, score, profondeur (ou erreur)."""
+    start = time.perf_counter()
+    line = {"type": "result", "index": index, "fen": fen}
+    if played is not None:
+        line["played"] = played
+
+    # Mêmes clés que les endpoints d'un coup : les résultats sont partagés
+    if engine == "nn":
+        version = get_model_registry().version
+        key = move_cache.cache_key(engine, fen, depth=depth, model=version)
+    else:
+        key = move_cache.cache_key(engine, fen, depth=depth, time_ms=time_ms)
+    result = await move_cache.get_cached_move(engine, key)
+    if result is None:
+        try:
+            result = await _run_engine(engine, fen, depth, time_ms)
+        except EngineBusy:
+            metrics.engine_busy.inc(engine=engine)
+            return {"type": "error", "index": index, "fen": fen, "error": "Serveur occupé"}
+        if engine != "nn" or (result or {}).get("model") == version:
+            await move_cache.store_move(key, result)
+    metrics.record_engine_move(engine, result, time.perf_counter() - start)
+
+    if result is None:
+        # Mat ou pat : rien à jouer
+        line.update(best=None, score=None, depth=0)
+        return line
+    line.update(
+        best=result.get("uci") or result["from"] + result["to"],
+        score=result.get("score"),
+        pv=result.get("pv", []),
+        depth=result["depth"],
+        nodes=result["nodes"],
+        time_ms=result["time_ms"],
+    )
+    return line
+
+
+async def analyse(positions, engine="alphabeta", depth=None, time_ms=None, concurrency=1):
+    """
+    Analyse les positions dans le pool de moteurs, au plus concurrency à la
+    fois, et produit chaque ligne dès qu'elle est prête (pas dans l'ordre :
+    chaque ligne porte l'index de sa position), puis une ligne "done".
+    Une position en échec donne une ligne "error" sans interrompre les autres.
+    Si le consommateur s'arrête (client parti), les calculs restants sont annulés.
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index, fen, played):
+        async with semaphore:
+            try:
+                return await analyse_position(index, fen, played, engine, depth, time_ms)
+            except Exception:
+                logger.exception("Échec de l'analyse de la position %d (%s)", index, fen)
+                return {"type": "error", "index": index, "fen": fen, "error": "Erreur du moteur"}
+
+    tasks = [asyncio.ensure_future(bounded(index, fen, played)) for index, (fen, played) in enumerate(positions)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield {"type": "done", "positions": len(positions), "time_ms": round((time.perf_counter() - start) * 1000, 1)}
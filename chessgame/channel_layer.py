@@ -0,0 +1,299 @@
+import asyncio
+import contextlib
+import json
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+# Attente entre deux relèves de la base : courte quand des messages arrivent,
+# allongée jusqu'à POLL_MAX_S quand tout est calme (latence maximale entre workers)
+POLL_MIN_S = 0.001
+POLL_MAX_S = 0.02
+# Intervalle entre deux nettoyages des messages et des adhésions expirés
+CLEANUP_INTERVAL_S = 5.0
+
+
+def process_of(channel):
+    """Identifiant du processus d'un canal spécifique ("prefix.<id>!..."), "" pour un canal général."""
+    if "!" not in channel:
+        return ""
+    return channel[:channel.index("!")].rsplit(".", 1)[-1]
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """
+    Channel layer partagé par plusieurs workers Daphne d'une même machine,
+    dans une base SQLite (mode WAL) : aucun service externe à déployer.
+
+    - Chaque instance a un identifiant, repris dans le nom de ses canaux
+      spécifiques. Une seule tâche par processus relève en une requête les
+      messages de tous ses canaux et les répartit dans des files locales.
+    - Un envoi vers un canal du même processus ne passe pas par la base.
+    - group_send sérialise le message une fois et écrit les destinataires
+      des autres processus dans une seule transaction.
+    - Les messages expirent après expiry secondes ; un canal dont un message
+      expire (plus personne ne le lit) est retiré de ses groupes, comme avec
+      InMemoryChannelLayer. Les adhésions expirent après group_expiry.
+
+    Les messages doivent être sérialisables en JSON. Les accès à la base se
+    font dans un thread dédié, hors de la boucle asyncio.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, path, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.client_id = uuid.uuid4().hex[:12]
+        self._connection = None
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="channel-layer")
+        self._loop = None
+        self._buffers = {}
+        self._poller = None
+        self._last_cleanup = time.monotonic()
+
+    # --- Base (thread dédié) -------------------------------------------------
+
+    def _get_connection(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Messages éphémères : pas de synchronisation disque à chaque transaction
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS channel_messages ("
+                " id INTEGER PRIMARY KEY, process TEXT NOT NULL, channel TEXT NOT NULL,"
+                " expires REAL NOT NULL, body TEXT NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS channel_messages_process ON channel_messages (process, id)")
+            connection.execute("CREATE INDEX IF NOT EXISTS channel_messages_channel ON channel_messages (channel)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS channel_groups ("
+                " group_name TEXT NOT NULL, channel TEXT NOT NULL, expires REAL NOT NULL,"
+                " PRIMARY KEY (group_name, channel))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS channel_groups_channel ON channel_groups (channel)")
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _transaction(connection):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    async def _run(self, func, *args):
+        """func(connexion, *args) dans le thread de la base."""
+        def call():
+            return func(self._get_connection(), *args)
+        return await asyncio.get_running_loop().run_in_executor(self._db, call)
+
+    def _insert(self, connection, channels, body):
+        """Écrit le message pour chaque canal qui a encore de la place ; retourne les canaux pleins."""
+        now = time.time()
+        placeholders = ",".join("?" * len(channels))
+        counts = dict(connection.execute(
+            f"SELECT channel, COUNT(*) FROM channel_messages WHERE channel IN ({placeholders}) AND expires >= ?"
+            " GROUP BY channel",
+            (*channels, now),
+        ))
+        full = [channel for channel in channels if counts.get(channel, 0) >= self.get_capacity(channel)]
+        connection.executemany(
+            "INSERT INTO channel_messages (process, channel, expires, body) VALUES (?, ?, ?, ?)",
+            [(process_of(channel), channel, now + self.expiry, body) for channel in channels if channel not in full],
+        )
+        return full
+
+    def _send(self, connection, channel, body):
+        with self._transaction(connection):
+            return self._insert(connection, [channel], body)
+
+    def _group_send(self, connection, group, body):
+        """Écrit les messages des membres distants ; retourne les membres de ce processus."""
+        with self._transaction(connection):
+            channels = [row[0] for row in connection.execute(
+                "SELECT channel FROM channel_groups WHERE group_name = ? AND expires >= ?", (group, time.time())
+            )]
+            remote = [channel for channel in channels if process_of(channel) != self.client_id]
+            if remote:
+                self._insert(connection, remote, body)
+        return [channel for channel in channels if process_of(channel) == self.client_id]
+
+    def _take_process(self, connection, process):
+        """Retire et retourne dans l'ordre les messages de tous les canaux d'un processus."""
+        # Dans une transaction : sans AUTOINCREMENT, un id supprimé entre-temps
+        # (messages expirés) pourrait être repris par un nouveau message non lu
+        with self._transaction(connection):
+            rows = connection.execute(
+                "SELECT id, channel, expires, body FROM channel_messages WHERE process = ? ORDER BY id", (process,)
+            ).fetchall()
+            if rows:
+                connection.execute("DELETE FROM channel_messages WHERE process = ? AND id <= ?",
+                                   (process, rows[-1][0]))
+        return rows
+
+    def _take_channel(self, connection, channel):
+        """Retire et retourne le plus ancien message d'un canal général (plusieurs lecteurs possibles)."""
+        with self._transaction(connection):
+            row = connection.execute(
+                "SELECT id, channel, expires, body FROM channel_messages WHERE channel = ? ORDER BY id LIMIT 1",
+                (channel,),
+            ).fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM channel_messages WHERE id = ?", (row[0],))
+        return row
+
+    def _cleanup(self, connection, dead_channels):
+        now = time.time()
+        with self._transaction(connection):
+            expired = [row[0] for row in connection.execute(
+                "SELECT DISTINCT channel FROM channel_messages WHERE expires < ?", (now,)
+            )]
+            connection.execute("DELETE FROM channel_messages WHERE expires < ?", (now,))
+            connection.executemany(
+                "DELETE FROM channel_groups WHERE channel = ?", [(channel,) for channel in expired + dead_channels]
+            )
+            connection.execute("DELETE FROM channel_groups WHERE expires < ?", (now,))
+
+    def _flush(self, connection):
+        with self._transaction(connection):
+            connection.execute("DELETE FROM channel_messages")
+            connection.execute("DELETE FROM channel_groups")
+
+    # --- Files locales (boucle asyncio) --------------------------------------
+
+    def _buffer(self, channel):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Nouvelle boucle (async_to_sync, tests) : les files de l'ancienne sont inutilisables
+            self._loop, self._buffers, self._poller = loop, {}, None
+        buffer = self._buffers.get(channel)
+        if buffer is None:
+            buffer = self._buffers[channel] = asyncio.Queue(self.get_capacity(channel))
+        return buffer
+
+    def _deliver(self, channel, expires, body):
+        # Canal fermé ou file pleine : le message est perdu, comme pour un groupe avec InMemoryChannelLayer
+        buffer = self._buffers.get(channel)
+        if buffer is not None and not buffer.full():
+            buffer.put_nowait((expires, body))
+
+    def _expired_buffers(self):
+        """Canaux locaux dont le plus ancien message a expiré : plus personne ne les lit."""
+        now = time.time()
+        dead = [channel for channel, buffer in self._buffers.items()
+                if not buffer.empty() and buffer._queue[0][0] < now]
+        for channel in dead:
+            del self._buffers[channel]
+        return dead
+
+    async def _poll(self):
+        delay = POLL_MIN_S
+        while self._buffers:
+            rows = await self._run(self._take_process, self.client_id)
+            for _, channel, expires, body in rows:
+                self._deliver(channel, expires, body)
+            if time.monotonic() - self._last_cleanup > CLEANUP_INTERVAL_S:
+                self._last_cleanup = time.monotonic()
+                await self._run(self._cleanup, self._expired_buffers())
+            delay = POLL_MIN_S if rows else min(delay * 2, POLL_MAX_S)
+            await asyncio.sleep(delay)
+
+    def _ensure_poller(self):
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    # --- API des channel layers ------------------------------------------------
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        body = json.dumps(message)
+        if process_of(channel) == self.client_id:
+            buffer = self._buffer(channel)
+            if buffer.full():
+                raise ChannelFull(channel)
+            buffer.put_nowait((time.time() + self.expiry, body))
+            return
+        if await self._run(self._send, channel, body):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        process = process_of(channel)
+        if process == "":
+            # Canal général : lu directement dans la base, par n'importe quel processus
+            delay = POLL_MIN_S
+            while True:
+                row = await self._run(self._take_channel, channel)
+                if row is not None and row[2] >= time.time():
+                    return json.loads(row[3])
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, POLL_MAX_S)
+        assert process == self.client_id, "Channel belongs to another process"
+
+        buffer = self._buffer(channel)
+        self._ensure_poller()
+        try:
+            while True:
+                expires, body = await buffer.get()
+                if expires >= time.time():
+                    return json.loads(body)
+        except asyncio.CancelledError:
+            # Consommateur arrêté : sa file disparaît, la relève s'arrête avec la dernière
+            if buffer.empty() and self._buffers.get(channel) is buffer:
+                del self._buffers[channel]
+            raise
+
+    async def new_channel(self, prefix="specific"):
+        channel = f"{prefix}.{self.client_id}!{uuid.uuid4().hex}"
+        self._buffer(channel)
+        return channel
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        await self._run(self._execute, "INSERT OR REPLACE INTO channel_groups VALUES (?, ?, ?)",
+                        (group, channel, time.time() + self.group_expiry))
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+        await self._run(self._execute, "DELETE FROM channel_groups WHERE group_name = ? AND channel = ?",
+                        (group, channel))
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        body = json.dumps(message)
+        expires = time.time() + self.expiry
+        for channel in await self._run(self._group_send, group, body):
+            self._deliver(channel, expires, body)
+
+    async def flush(self):
+        await self._run(self._flush)
+        self._buffers = {}
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self._connection is not None:
+            await self._run(lambda connection: connection.close())
+            self._connection = None
+
+    @staticmethod
+    def _execute(connection, query, params):
+        connection.execute(query, params)
@@ -1,9 +1,34 @@
+import asyncio
 import json
+import logging
+import time
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from chessgame import analysis, metrics
+from chessgame.analysis import analysis_request
+from chessgame.engine_pool import EngineBusy, get_engine_executor
+from chessgame.engines import run_engine
+from chessgame.game_records import save_game
+from chessgame.games import SPECTATOR, get_game_registry, seat_color
+from chessgame.models import Game
+from chessgame.matchmaking import (
+    DEFAULT_RATING, DEFAULT_TIME_CONTROL, MAX_TIME_CONTROL_LENGTH, Ticket, get_matchmaking_service,
+)
 
-from chessgame.ai.ai_random import get_random_move
+logger = logging.getLogger(__name__)
 
-waiting_players = []  # Liste des joueurs en attente
+
+def parse_ticket(channel_name, data):
+    """Ticket de file d'attente à partir du message "search" (classement et cadence optionnels)."""
+    try:
+        rating = int(data.get("rating", DEFAULT_RATING))
+    except (TypeError, ValueError):
+        rating = DEFAULT_RATING
+    time_control = str(data.get("time_control") or DEFAULT_TIME_CONTROL)[:MAX_TIME_CONTROL_LENGTH]
+    return Ticket(channel_name, max(0, min(rating, 4000)), time_control)
 
 
 class MatchmakingConsumer(AsyncWebsocketConsumer):
@@ -12,104 +37,230 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
 
     async def disconnect(self, close_code):
         # Retirer le joueur de la file d'attente s'il ferme la connexion
-        if self in waiting_players:
-            waiting_players.remove(self)
+        await get_matchmaking_service().cancel(self.channel_name)
 
     async def receive(self, text_data, **kwargs):
         data = json.loads(text_data)
+        service = get_matchmaking_service()
 
         if data["action"] == "search":
-            if self in waiting_players:
-                # Évite les doublons si le joueur clique plusieurs fois sur "Rechercher"
+            # Évite les doublons si le joueur clique plusieurs fois sur "Rechercher"
+            if not await service.enqueue(parse_ticket(self.channel_name, data)):
                 return
-
-            if waiting_players:
-                opponent = waiting_players.pop(0)
-                game_id = f"game_{id(self)}_{id(opponent)}"
-
-                # Informer les deux joueurs qu'ils ont trouvés une partie
-                await self.send(text_data=json.dumps({
-                    "action": "match_found",
-                    "game_id": game_id,
-                    "role": "white"
-                }))
-                await opponent.send(text_data=json.dumps({
-                    "action": "match_found",
-                    "game_id": game_id,
-                    "role": "black"
-                }))
-            else:
-                waiting_players.append(self)
-                await self.send(text_data=json.dumps({"action": "waiting"}))
+            await self.send(text_data=json.dumps({"action": "waiting"}))
+            service.ensure_ticker(self.channel_layer)
 
         elif data["action"] == "leave_queue":
-            if self in waiting_players:
-                waiting_players.remove(self)
+            if await service.cancel(self.channel_name):
                 await self.send(text_data=json.dumps({"action": "left_queue"}))
 
+    async def match_found(self, event):
+        # Informer le joueur qu'il a trouvé une partie
+        await self.send(text_data=json.dumps({
+            "action": "match_found",
+            "game_id": event["game_id"],
+            "role": event["role"],
+            "ticket": event["ticket"],
+        }))
 
-class ChessConsumer(AsyncWebsocketConsumer):
-    players = {}
+
+class AnalysisConsumer(AsyncWebsocketConsumer):
+    """
+    Analyse en continu (ws/analysis/) : le client envoie {"type": "analyse",
+    "pgn" ou "fens", ...} et reçoit une ligne par position dès qu'elle est
+    prête, puis {"type": "done"}. Une nouvelle demande remplace la précédente.
+    """
+    task = None
 
     async def connect(self):
         await self.accept()
 
-        if len(self.players) % 2 == 0:
-            self.players[self.channel_name] = "w"
-        else:
-            self.players[self.channel_name] = "b"
+    async def disconnect(self, close_code):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def receive(self, text_data, **kwargs):
+        data = json.loads(text_data)
+        if data.get("type") == "cancel":
+            if self.task is not None:
+                self.task.cancel()
+            return
+        if data.get("type") != "analyse":
+            return
+        try:
+            positions, options = analysis_request(data)
+        except ValueError as e:
+            await self.send(text_data=json.dumps({"type": "error", "error": str(e)}))
+            return
+        if self.task is not None:
+            self.task.cancel()
+        self.task = asyncio.create_task(self.stream(positions, options))
+
+    async def stream(self, positions, options):
+        lines = analysis.analyse(positions, **options)
+        try:
+            async for line in lines:
+                await self.send(text_data=json.dumps(line))
+        finally:
+            await lines.aclose()
+
+
+class ChessConsumer(AsyncWebsocketConsumer):
+    """
+    Une connexion à une partie (ws/chess/<game_id>/). Les coups ne sont
+    diffusés qu'au groupe de cette partie : les deux joueurs et les spectateurs.
+    """
+    bot_task = None  # Calcul du coup de l'IA en cours (partie contre une IA)
+    bot_engine = "random"
+
+    async def connect(self):
+        game_id = self.scope["url_route"]["kwargs"]["game_id"]
+        if game_id == "vs-bot":
+            # Chaque partie contre l'IA a sa propre salle
+            game_id = f"vs-bot.{self.channel_name}"
+        # ?ticket=... : couleur attribuée par l'appariement ; ?role=spectator : spectateur
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        role = None
+        if "ticket" in query:
+            role = seat_color(query["ticket"][0], game_id)
+            if role is None:
+                await self.close()
+                return
+        elif query.get("role") == [SPECTATOR]:
+            role = SPECTATOR
 
-        await self.channel_layer.group_add("chess_game", self.channel_name)
+        # Parties du processus, ou partagées entre workers (GAME_STATE_BACKEND)
+        self.games = get_game_registry()
+        user = self.scope.get("user")
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        game, color = await self.games.join(game_id, self.channel_name, settings.GAME_CLOCK_MS, user_id, role)
+        if color is None:
+            # Place déjà prise, ou partie complète pour qui ne demande pas à regarder
+            await self.close()
+            return
+        self.game_id = game_id
+        self.group = game.group
+        self.color = color
+
+        await self.accept()
+        await self.channel_layer.group_add(self.group, self.channel_name)
 
         await self.send(text_data=json.dumps({
             "type": "assign_color",
-            "color": self.players[self.channel_name]
+            "color": color
         }))
 
-        print(f"✅ Joueur {self.players[self.channel_name]} connecté !")
+        logger.info("Joueur %s connecté à %s", color, game_id)
 
     async def disconnect(self, close_code):
-        if self.channel_name in self.players:
-            del self.players[self.channel_name]
-        await self.channel_layer.group_discard("chess_game", self.channel_name)
-        print("❌ Joueur déconnecté")
+        # Inutile de finir le calcul de l'IA pour un joueur parti
+        if self.bot_task is not None:
+            self.bot_task.cancel()
+        if getattr(self, "color", None) is None:
+            return
+        game = await self.games.get(self.game_id)
+        if game is not None and game.is_last(self.channel_name):
+            # Plus personne : la partie est enregistrée telle quelle (abandonnée si en cours),
+            # réclamée avant leave() qui l'oublie
+            await self.store_game(game)
+        await self.games.leave(self.game_id, self.channel_name)
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+        logger.info("Joueur déconnecté de %s", self.game_id)
 
     async def receive(self, text_data):
         data = json.loads(text_data)
 
         if data["type"] == "move":
-            source = data["source"]
-            target = data["target"]
-
-            print(f"📡 Diffusion mouvement : {source} -> {target}")
-
-            await self.channel_layer.group_send(
-                "chess_game",
-                {
-                    "type": "broadcast_move",
-                    "source": source,
-                    "target": target
-                }
-            )
-
-            # Partie contre une IA
-            if "vs-bot" in self.scope["path"]:
-                game_fen = data.get("fen")
-                if game_fen:
-                    move = get_random_move(game_fen)
-                    if move:
-                        await self.channel_layer.group_send(
-                            "chess_game",
-                            {
-                                "type": "broadcast_move",
-                                "source": move.uci()[:2],
-                                "target": move.uci()[2:]
-                            }
-                        )
+            # Ancien format {source, target} encore accepté
+            uci = data.get("uci") or f"{data.get('source', '')}{data.get('target', '')}{data.get('promotion') or ''}"
+            game, move = None, None
+            if self.color != SPECTATOR:  # les spectateurs ne jouent pas
+                game, move = await self.games.play(self.game_id, uci, self.color)
+            if move is None:
+                # Refusé avant toute diffusion : seul l'auteur est prévenu
+                metrics.ws_moves.inc(result="rejected")
+                if game is None:
+                    game = await self.games.get(self.game_id)
+                seq = game.seq if game is not None else 0
+                await self.send(text_data=json.dumps({"type": "illegal", "uci": uci, "seq": seq}))
+                return
+
+            metrics.ws_moves.inc(result="accepted")
+            logger.debug("Coup %s joué dans %s", move.uci(), self.game_id)
+            await self.broadcast(move, game.seq)
+
+            if game.board.is_game_over():
+                await self.store_game(game)
+            # Partie contre une IA : calcul dans le pool, sans bloquer la boucle
+            elif self.vs_bot:
+                self.bot_task = asyncio.create_task(self.play_bot_move(game.board.fen()))
+
+        elif data["type"] in ("join", "sync"):
+            # Le client indique combien de coups il connaît déjà
+            game = await self.games.get(self.game_id)
+            seq = game.seq if game is not None else 0
+            try:
+                since = int(data.get("since", 0))
+            except (TypeError, ValueError):
+                since = 0
+            if not 0 <= since <= seq:
+                since = 0
+            await self.send(text_data=json.dumps({
+                "type": "sync",
+                "since": since,
+                "moves": game.moves_since(since) if game is not None else [],
+                "seq": seq
+            }))
+
+    @property
+    def vs_bot(self):
+        return "vs-bot" in self.scope["path"]
+
+    async def store_game(self, game):
+        # Une seule fois par partie, quel que soit le worker qui la termine
+        if await self.games.mark_saved(self.game_id):
+            self.save(game)
+
+    def save(self, game):
+        if self.vs_bot:
+            save_game(game, Game.MODE_BOT, self.bot_engine)
+        else:
+            save_game(game, Game.MODE_ONLINE)
+
+    async def broadcast(self, move, seq):
+        await self.channel_layer.group_send(
+            self.group,
+            {
+                "type": "broadcast_move",
+                "uci": move.uci(),
+                "seq": seq
+            }
+        )
+
+    async def play_bot_move(self, game_fen):
+        start = time.perf_counter()
+        try:
+            move = await get_engine_executor().run(run_engine, self.bot_engine, game_fen)
+        except EngineBusy:
+            metrics.engine_busy.inc(engine=self.bot_engine)
+            await self.send(text_data=json.dumps({"type": "busy"}))
+            return
+        elapsed = time.perf_counter() - start
+        metrics.record_engine_move(self.bot_engine, {"from": move.uci()[:2], "to": move.uci()[2:4]} if move else None,
+                                   elapsed)
+        if move is None:
+            return
+        game, played = await self.games.play(self.game_id, move.uci(), engine=self.bot_engine,
+                                             time_ms=round(elapsed * 1000, 1))
+        if played:
+            await self.broadcast(played, game.seq)
+            if game.board.is_game_over():
+                await self.store_game(game)
 
     async def broadcast_move(self, event):
+        # Delta compact : le coup et son numéro
         await self.send(text_data=json.dumps({
             "type": "move",
-            "source": event["source"],
-            "target": event["target"]
+            "uci": event["uci"],
+            "seq": event["seq"]
         }))
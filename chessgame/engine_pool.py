@@ -0,0 +1,176 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+
+class EngineBusy(Exception):
+    """Tous les emplacements de la file de calcul sont occupés."""
+
+
+# --- Côté worker -------------------------------------------------------------
+
+# Drapeaux d'annulation partagés avec le processus principal (un par emplacement)
+_cancel_flags = None
+
+
+def _init_worker(cancel_flags, preload):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+    if settings.ENGINE_SEARCH_THREADS > 1:
+        # Auxiliaires Lazy SMP créés tôt, avant que torch ne lance ses threads
+        from chessgame.ai.smp import get_helper_pool
+        get_helper_pool()
+    # Les autres moteurs sont importés au premier coup demandé
+    from chessgame.engines import warm_up
+    warm_up(preload)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_job(slot, func, args, kwargs, cancellable):
+    if cancellable:
+        kwargs = dict(kwargs, should_stop=lambda: _cancel_flags[slot] != 0)
+    return func(*args, **kwargs)
+
+
+# --- Côté serveur ------------------------------------------------------------
+
+class EngineJob:
+    """Un calcul soumis au pool : on peut l'attendre, ou lui demander de s'arrêter."""
+
+    def __init__(self, executor, slot, future):
+        self._executor = executor
+        self._slot = slot
+        self.future = future
+
+    def done(self):
+        return self.future.done()
+
+    def stop(self):
+        """
+        Demande au calcul (cancellable) de s'arrêter : une recherche rend alors
+        le meilleur coup de sa dernière itération terminée.
+        """
+        # Sous le verrou : l'emplacement ne peut pas être rendu puis repris entre-temps
+        with self._executor._lock:
+            if not self.future.done():
+                self._executor._cancel_flags[self._slot] = 1
+
+    async def result(self):
+        try:
+            return await asyncio.wrap_future(self.future)
+        except asyncio.CancelledError:
+            # Retiré de la file s'il n'a pas commencé, prié de s'arrêter sinon
+            self.stop()
+            self.future.cancel()
+            raise
+
+
+class EngineExecutor:
+    """
+    Pool borné de processus qui font tourner les moteurs hors de la boucle asyncio.
+
+    - max_workers processus, démarrés à l'avance avec les moteurs de preload
+      déjà importés et prêts (noms du registre chessgame.engines)
+    - au plus max_pending calculs en cours ou en attente : au-delà, run() lève EngineBusy
+    - si la tâche qui attend un calcul est annulée (client déconnecté), le calcul
+      est retiré de la file, ou prié de s'arrêter s'il a déjà commencé
+    - les calculs preemptible (réflexions sur le temps de l'adversaire) cèdent
+      leur worker : un autre calcul soumis sans worker libre en arrête un
+    - un emplacement n'est rendu qu'une fois le worker vraiment libéré
+    """
+
+    def __init__(self, max_workers, max_pending, preload=()):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._cancel_flags = multiprocessing.Array("b", max_pending, lock=False)
+        self._free_slots = list(range(max_pending))
+        # Calculs preemptible en cours, par emplacement, du plus ancien au plus récent
+        self._preemptible = {}
+        self._lock = threading.Lock()
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(self._cancel_flags, tuple(preload)),
+        )
+
+    def warm_up(self):
+        """Démarre tous les workers sans attendre la première requête."""
+        return [self._pool.submit(_ping) for _ in range(self.max_workers)]
+
+    @property
+    def pending(self):
+        return self.max_pending - len(self._free_slots)
+
+    def _acquire_slot(self):
+        with self._lock:
+            if not self._free_slots:
+                raise EngineBusy()
+            slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        return slot
+
+    def _release_slot(self, slot, _future=None):
+        # Appelé depuis le thread de gestion du pool quand le calcul se termine
+        with self._lock:
+            self._preemptible.pop(slot, None)
+            self._free_slots.append(slot)
+
+    def _preempt(self):
+        """Arrête le plus ancien calcul preemptible si tous les workers sont pris."""
+        with self._lock:
+            if not self._preemptible or self.pending < self.max_workers:
+                return
+            job = self._preemptible.pop(next(iter(self._preemptible)))
+        job.stop()
+
+    def submit(self, func, *args, cancellable=False, preemptible=False, **kwargs):
+        """
+        Soumet func(*args, **kwargs) à un worker sans l'attendre (EngineJob).
+        Avec cancellable=True, func reçoit un argument should_stop() à consulter
+        régulièrement pour abandonner le calcul. Un calcul preemptible (forcément
+        cancellable) est arrêté dès qu'un autre calcul manque de worker.
+        """
+        if not preemptible:
+            self._preempt()
+        slot = self._acquire_slot()
+        task = functools.partial(_run_job, slot, func, args, kwargs, cancellable or preemptible)
+        try:
+            future = self._pool.submit(task)
+        except BaseException:
+            self._release_slot(slot)
+            raise
+        job = EngineJob(self, slot, future)
+        if preemptible:
+            with self._lock:
+                self._preemptible[slot] = job
+        # Après l'enregistrement : un calcul déjà fini est aussitôt retiré des preemptible
+        future.add_done_callback(functools.partial(self._release_slot, slot))
+        return job
+
+    async def run(self, func, *args, cancellable=False, preemptible=False, **kwargs):
+        """Exécute func(*args, **kwargs) dans un worker et attend le résultat (voir submit)."""
+        return await self.submit(func, *args, cancellable=cancellable, preemptible=preemptible, **kwargs).result()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+
+
+def get_engine_executor():
+    """Pool du processus courant, créé (et préchauffé) au premier appel."""
+    global _executor
+    if _executor is None:
+        _executor = EngineExecutor(settings.ENGINE_POOL_WORKERS, settings.ENGINE_POOL_MAX_PENDING,
+                                   settings.ENGINE_PRELOAD)
+        _executor.warm_up()
+    return _executor
@@ -0,0 +1,78 @@
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Engine:
+    """
+    Un moteur désigné par son nom. Son module n'est importé qu'au premier
+    coup demandé, dans le processus qui le calcule : le serveur web ne charge
+    ni torch ni numpy pour servir une page. warm_up : fonction optionnelle du
+    module qui prépare le moteur (tables, poids du réseau).
+    """
+
+    def __init__(self, name, module, function, warm_up=None):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.warm_up = warm_up
+        self._move_function = None
+
+    @property
+    def loaded(self):
+        return self._move_function is not None
+
+    def load(self):
+        if self._move_function is None:
+            self._move_function = getattr(importlib.import_module(self.module), self.function)
+        return self._move_function
+
+    def prepare(self):
+        """Importe le moteur et le prépare, pour que le premier coup ne paie pas ce coût."""
+        self.load()
+        if self.warm_up is not None:
+            getattr(importlib.import_module(self.module), self.warm_up)()
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+
+ENGINES = {engine.name: engine for engine in (
+    Engine("random", "chessgame.ai.ai_random", "get_random_move"),
+    Engine("minimax", "chessgame.ai.ai_minimax", "get_minimax_move", warm_up="warm_up"),
+    Engine("nn", "chessgame.ai.nn_registry", "get_nn_ai_move", warm_up="warm_up"),
+)}
+
+# Nom de l'alpha-beta dans les métriques, le cache et l'API d'analyse
+ALIASES = {"alphabeta": "minimax"}
+
+
+def get_engine(name):
+    """Moteur désigné par son nom. Lève ValueError si le nom est inconnu."""
+    try:
+        return ENGINES[ALIASES.get(name, name)]
+    except KeyError:
+        raise ValueError(f"Moteur inconnu : {name}")
+
+
+def run_engine(name, *args, **kwargs):
+    """
+    Coup du moteur name. Soumis au pool sous cette forme (un nom et des
+    arguments), le moteur n'est importé que dans le worker qui le calcule.
+    """
+    return get_engine(name)(*args, **kwargs)
+
+
+def warm_up(names):
+    """Importe et prépare les moteurs nommés. Retourne la durée de chacun (secondes)."""
+    timings = {}
+    for name in names:
+        start = time.perf_counter()
+        get_engine(name).prepare()
+        timings[name] = time.perf_counter() - start
+    if timings:
+        logger.info("Moteurs préparés : %s",
+                    ", ".join(f"{name} {elapsed * 1000:.0f} ms" for name, elapsed in timings.items()))
+    return timings
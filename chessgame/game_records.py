@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+
+from chessgame import metrics
+from chessgame.ai.transposition import pack_move
+from chessgame.models import Game, Move, encode_moves
+
+logger = logging.getLogger(__name__)
+
+
+def game_record(game, mode, engine=""):
+    """
+    Partie (GameState) prête à être écrite : instances Game et Move non
+    enregistrées, construites sans accès à la base.
+    """
+    board = game.board
+    outcome = board.outcome()
+    record = Game(
+        game_id=game.game_id,
+        mode=mode,
+        engine=engine,
+        white_id=game.users["w"],
+        black_id=game.users["b"],
+        result=outcome.result() if outcome else "*",
+        termination=outcome.termination.name.lower() if outcome else "abandoned",
+        started_at=game.started_at,
+        ended_at=datetime.datetime.now(datetime.timezone.utc),
+        ply_count=len(board.move_stack),
+        moves=encode_moves(board.move_stack),
+    )
+    engine_moves = [
+        Move(ply=ply, move=pack_move(move), engine=name, time_ms=time_ms)
+        for ply, move, name, time_ms in game.engine_moves
+    ]
+    return record, engine_moves
+
+
+class GameWriter:
+    """
+    Écriture des parties terminées par lots. add() ne fait que mettre la partie
+    en attente : aucun accès à la base pendant la partie ni sur la boucle
+    asyncio. Les lots partent toutes les interval secondes, ou dès batch_size
+    parties, en deux bulk_create (parties, puis coups des IA) dans un thread.
+    """
+
+    def __init__(self, batch_size=100, interval=1.0):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = []
+        self._full = None
+        self._flusher = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, record):
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size and self._full is not None:
+            self._full.set()
+
+    def ensure_flusher(self):
+        """Démarre l'écriture périodique si elle ne tourne pas déjà dans cette boucle asyncio."""
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._full = asyncio.Event()
+            self._flusher = loop.create_task(self._run_flusher())
+
+    async def _run_flusher(self):
+        # S'arrête quand tout est écrit ; relancée par la prochaine partie terminée
+        while self._pending:
+            if len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Écrit les parties en attente. Retourne le nombre de parties écrites."""
+        records, self._pending = self._pending, []
+        if not records:
+            return 0
+        try:
+            await database_sync_to_async(self._write)(records)
+        except Exception:
+            logger.exception("Enregistrement de %d parties impossible", len(records))
+            metrics.games_saved.inc(len(records), result="failed")
+            return 0
+        metrics.games_saved.inc(len(records), result="saved")
+        return len(records)
+
+    @staticmethod
+    def _write(records):
+        games = [game for game, _ in records]
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Game.objects.bulk_create(games)
+            else:
+                # Base sans RETURNING (MySQL) : les coups des IA ont besoin de l'id des parties
+                for game in games:
+                    game.save(force_insert=True)
+            moves = []
+            for game, engine_moves in records:
+                for move in engine_moves:
+                    move.game = game
+                    moves.append(move)
+            Move.objects.bulk_create(moves)
+
+
+def save_game(game, mode, engine=""):
+    """
+    Confie une partie (GameState) à l'écriture par lots. Les parties sans aucun
+    coup ne sont pas gardées. L'appelant s'assure, par le registre des parties
+    (mark_saved), qu'une partie n'est confiée qu'une fois.
+    """
+    writer = get_game_writer()
+    if writer is None or not game.board.move_stack:
+        return False
+    writer.add(game_record(game, mode, engine))
+    writer.ensure_flusher()
+    return True
+
+
+_writer = None
+
+
+def get_game_writer():
+    """Écriture des parties du processus courant, ou None si GAME_SAVE_INTERVAL_MS vaut 0."""
+    global _writer
+    if not settings.GAME_SAVE_INTERVAL_MS:
+        return None
+    if _writer is None:
+        _writer = GameWriter(settings.GAME_SAVE_BATCH_SIZE, settings.GAME_SAVE_INTERVAL_MS / 1000)
+    return _writer
@@ -0,0 +1,363 @@
+import asyncio
+import copy
+import datetime
+import json
+import re
+import sqlite3
+import threading
+import time
+
+import chess
+from django.conf import settings
+from django.core import signing
+
+from chessgame.models import decode_moves, encode_moves
+
+# Noms de groupes acceptés par les channel layers : lettres, chiffres, - _ .
+_GROUP_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+MAX_GROUP_LENGTH = 90
+
+SPECTATOR = "spectator"
+
+# Place attribuée par l'appariement, signée pour que le client ne puisse pas la choisir
+SEAT_SALT = "chessgame.games.seat"
+SEAT_MAX_AGE_S = 24 * 3600
+
+# Partie partagée sans aucune activité depuis ce temps : worker arrêté sans la quitter
+STALE_GAME_S = 24 * 3600
+
+# Rendu par une opération du registre SQLite qui n'a rien modifié : pas d'écriture
+UNCHANGED = object()
+
+
+def group_name(game_id):
+    """Groupe du channel layer propre à une partie."""
+    return "chess." + _GROUP_UNSAFE.sub("_", game_id)[:MAX_GROUP_LENGTH]
+
+
+def seat_ticket(game_id, color):
+    """Ticket signé donnant la couleur color ("w" ou "b") dans la partie game_id."""
+    return signing.dumps({"game_id": game_id, "color": color}, salt=SEAT_SALT)
+
+
+def seat_color(ticket, game_id):
+    """Couleur donnée par le ticket, ou None s'il est falsifié, expiré ou d'une autre partie."""
+    try:
+        seat = signing.loads(ticket, salt=SEAT_SALT, max_age=SEAT_MAX_AGE_S)
+    except signing.BadSignature:
+        return None
+    if seat.get("game_id") != game_id or seat.get("color") not in ("w", "b"):
+        return None
+    return seat["color"]
+
+
+class GameState:
+    """
+    État d'une partie en mémoire : plateau, joueurs (canal -> couleur),
+    spectateurs et pendules (millisecondes restantes, None = sans pendule).
+    users et engine_moves servent à l'enregistrement de la partie à sa fin.
+    """
+
+    def __init__(self, game_id, clock_ms=None):
+        self.game_id = game_id
+        self.group = group_name(game_id)
+        self.board = chess.Board()
+        self.players = {}
+        self.spectators = set()
+        self.clocks = {"w": clock_ms, "b": clock_ms}
+        self._turn_started = None
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.users = {"w": None, "b": None}  # id des comptes connectés
+        self.engine_moves = []  # (numéro du coup, coup, moteur, temps en ms)
+        self.saved = False
+
+    def join(self, channel, user_id=None, role=None):
+        """
+        Place le canal et retourne son rôle, ou None si la place est refusée.
+        role : couleur donnée par l'appariement ("w" ou "b"), SPECTATOR, ou None
+        pour la première couleur libre. Les spectateurs doivent le demander :
+        une partie complète refuse un troisième joueur.
+        """
+        if channel in self.players:
+            return self.players[channel]
+        if role == SPECTATOR:
+            self.spectators.add(channel)
+            return SPECTATOR
+        taken = set(self.players.values())
+        for color in (role,) if role is not None else ("w", "b"):
+            if color not in taken:
+                self.players[channel] = color
+                if user_id is not None:
+                    self.users[color] = user_id
+                return color
+        return None
+
+    def leave(self, channel):
+        self.players.pop(channel, None)
+        self.spectators.discard(channel)
+
+    def is_empty(self):
+        return not self.players and not self.spectators
+
+    def is_last(self, channel):
+        """Le canal est-il la dernière connexion à la partie ?"""
+        return set(self.players) | self.spectators <= {channel}
+
+    def color_of(self, channel):
+        return self.players.get(channel)
+
+    @property
+    def seq(self):
+        """Numéro du dernier coup joué (0 = position initiale)."""
+        return len(self.board.move_stack)
+
+    def moves_since(self, seq):
+        """Coups joués après le coup numéro seq, en UCI (resynchronisation d'un client)."""
+        return [move.uci() for move in self.board.move_stack[seq:]]
+
+    def play(self, uci, color=None, engine=None, time_ms=None):
+        """
+        Valide le coup sur le plateau du serveur et le joue (push incrémental).
+        color est le camp qui prétend jouer (None : coup du serveur, ex. l'IA).
+        engine et time_ms : moteur qui a calculé le coup, gardé dans engine_moves.
+        Sans pièce précisée, une promotion se fait en dame, comme côté client.
+        Décompte le temps du camp qui a joué. Retourne le coup, ou None s'il est refusé.
+        """
+        try:
+            move = chess.Move.from_uci(uci)
+        except ValueError:
+            return None
+        side = "w" if self.board.turn else "b"
+        if color is not None and color != side:
+            return None
+        if not self.board.is_legal(move):
+            if move.promotion is not None:
+                return None
+            move.promotion = chess.QUEEN
+            if not self.board.is_legal(move):
+                return None
+
+        now = time.monotonic()
+        if self.clocks[side] is not None and self._turn_started is not None:
+            self.clocks[side] -= int((now - self._turn_started) * 1000)
+        self._turn_started = now
+        if engine is not None:
+            self.engine_moves.append((self.seq, move, engine, time_ms))
+        self.board.push(move)
+        return move
+
+    def copy(self):
+        game = copy.copy(self)
+        game.board = self.board.copy()
+        game.players = dict(self.players)
+        game.spectators = set(self.spectators)
+        game.clocks = dict(self.clocks)
+        game.users = dict(self.users)
+        game.engine_moves = list(self.engine_moves)
+        return game
+
+
+class GameRegistry:
+    """
+    Parties en cours dans ce processus, indexées par game_id : un seul worker
+    Daphne, ou les tests. Les parties rendues sont celles du registre, modifiées
+    sur place par les opérations suivantes.
+    """
+
+    def __init__(self):
+        self._games = {}
+
+    def __len__(self):
+        return len(self._games)
+
+    async def get(self, game_id):
+        return self._games.get(game_id)
+
+    async def join(self, game_id, channel, clock_ms=None, user_id=None, role=None):
+        """
+        Place le canal dans la partie, créée au besoin (voir GameState.join).
+        Retourne (partie, rôle) ; rôle None : place refusée, rien n'est gardé.
+        """
+        game = self._games.get(game_id) or GameState(game_id, clock_ms)
+        role = game.join(channel, user_id, role)
+        if role is not None:
+            self._games[game_id] = game
+        return game, role
+
+    async def leave(self, game_id, channel):
+        """
+        Retire le canal. Retourne la partie (None si elle n'existe pas), oubliée
+        quand plus personne n'y est connecté (is_empty()).
+        """
+        game = self._games.get(game_id)
+        if game is None:
+            return None
+        game.leave(channel)
+        if game.is_empty():
+            del self._games[game_id]
+        return game
+
+    async def play(self, game_id, uci, color=None, engine=None, time_ms=None):
+        """Joue le coup (GameState.play). Retourne (partie, coup), coup None s'il est refusé."""
+        game = self._games.get(game_id)
+        if game is None:
+            return None, None
+        return game, game.play(uci, color, engine, time_ms)
+
+    async def mark_saved(self, game_id):
+        """Marque la partie enregistrée. Retourne False si elle l'était déjà : un seul enregistrement."""
+        game = self._games.get(game_id)
+        if game is None or game.saved:
+            return False
+        game.saved = True
+        return True
+
+
+def _dump_state(game):
+    return json.dumps({
+        "clocks": game.clocks,
+        "turn_started": game._turn_started,
+        "started_at": game.started_at.isoformat(),
+        "players": game.players,
+        "spectators": sorted(game.spectators),
+        "users": game.users,
+        "engine_moves": [(ply, move.uci(), engine, time_ms) for ply, move, engine, time_ms in game.engine_moves],
+        "saved": game.saved,
+    })
+
+
+def _load_state(game_id, moves, state):
+    state = json.loads(state)
+    game = GameState(game_id)
+    for move in decode_moves(moves):
+        game.board.push(move)
+    game.clocks = state["clocks"]
+    game._turn_started = state["turn_started"]
+    game.started_at = datetime.datetime.fromisoformat(state["started_at"])
+    game.players = state["players"]
+    game.spectators = set(state["spectators"])
+    game.users = state["users"]
+    game.engine_moves = [(ply, chess.Move.from_uci(uci), engine, time_ms)
+                         for ply, uci, engine, time_ms in state["engine_moves"]]
+    game.saved = state["saved"]
+    return game
+
+
+class SQLiteGameRegistry:
+    """
+    Parties partagées par plusieurs workers Daphne d'une même machine, dans
+    une base SQLite (mode WAL) : les deux joueurs d'une partie peuvent être
+    servis par des workers différents, contre le même plateau.
+
+    Chaque opération relit la partie, l'applique et la réécrit dans une
+    transaction BEGIN IMMEDIATE, dans un thread hors de la boucle asyncio.
+    Le plateau rejoué est gardé en cache tant que la partie n'a pas changé
+    (version). Les parties rendues sont des copies, jamais modifiées ensuite.
+    Les pendules utilisent time.monotonic(), commune aux processus d'une machine.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS game_states ("
+            " game_id TEXT PRIMARY KEY, version INTEGER NOT NULL, moves BLOB NOT NULL,"
+            " state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _transaction(self, game_id, update, write=True):
+        """
+        update(copie de la partie, ou None) -> (résultat, partie à écrire, None
+        pour la supprimer, ou UNCHANGED). write=False : lecture seule.
+        """
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                row = connection.execute(
+                    "SELECT version, moves, state FROM game_states WHERE game_id = ?", (game_id,)
+                ).fetchone()
+                current = None
+                if row is not None:
+                    version, moves, state = row
+                    cached = self._cache.get(game_id)
+                    if cached is None or cached[0] != version:
+                        cached = self._cache[game_id] = (version, _load_state(game_id, moves, state))
+                    current = cached[1]
+                result, game = update(current.copy() if current is not None else None)
+                if write and game is None:
+                    connection.execute("DELETE FROM game_states WHERE game_id = ?", (game_id,))
+                    self._cache.pop(game_id, None)
+                elif write and game is not UNCHANGED:
+                    version = row[0] + 1 if row is not None else 1
+                    connection.execute(
+                        "INSERT OR REPLACE INTO game_states VALUES (?, ?, ?, ?, ?)",
+                        (game_id, version, encode_moves(game.board.move_stack), _dump_state(game), time.time()),
+                    )
+                    self._cache[game_id] = (version, game)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                self._cache.pop(game_id, None)
+                raise
+            return result
+
+    async def _run(self, game_id, update, write=True):
+        return await asyncio.to_thread(self._transaction, game_id, update, write)
+
+    async def get(self, game_id):
+        return await self._run(game_id, lambda game: (game, game), write=False)
+
+    async def join(self, game_id, channel, clock_ms=None, user_id=None, role=None):
+        def update(game):
+            if game is None:
+                self._connection.execute("DELETE FROM game_states WHERE updated_at < ?",
+                                         (time.time() - STALE_GAME_S,))
+                game = GameState(game_id, clock_ms)
+            joined = game.join(channel, user_id, role)
+            if joined is None:
+                return (game, None), (game if game.players or game.spectators else None)
+            return (game, joined), game
+        return await self._run(game_id, update)
+
+    async def leave(self, game_id, channel):
+        def update(game):
+            if game is None:
+                return None, None
+            game.leave(channel)
+            return game, None if game.is_empty() else game
+        return await self._run(game_id, update)
+
+    async def play(self, game_id, uci, color=None, engine=None, time_ms=None):
+        def update(game):
+            if game is None:
+                return (None, None), UNCHANGED
+            move = game.play(uci, color, engine, time_ms)
+            # Coup refusé : la partie n'a pas changé, ni sa version
+            return (game, move), (game if move is not None else UNCHANGED)
+        return await self._run(game_id, update)
+
+    async def mark_saved(self, game_id):
+        def update(game):
+            if game is None or game.saved:
+                return False, UNCHANGED
+            game.saved = True
+            return True, game
+        return await self._run(game_id, update)
+
+
+_registry = None
+
+
+def get_game_registry():
+    """Parties du processus courant, ou partagées entre workers si GAME_STATE_BACKEND vaut "sqlite"."""
+    global _registry
+    if _registry is None:
+        if settings.GAME_STATE_BACKEND == "sqlite":
+            _registry = SQLiteGameRegistry(settings.GAME_STATE_DB_PATH)
+        else:
+            _registry = GameRegistry()
+    return _registry
@@ -0,0 +1,68 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chessgame.ai.benchmark import ENGINES, compare, run_benchmark
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmarks", "engine_baseline.json")
+
+
+class Command(BaseCommand):
+    help = ("Mesure les moteurs sur une suite fixe de positions (nœuds, nœuds/s, temps par profondeur, "
+            "tactiques résolues) et échoue en cas de régression par rapport à la référence.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+        parser.add_argument("--depth", type=int, default=4, help="Profondeur d'alpha-beta")
+        parser.add_argument("--nn-depth", type=int, default=2, help="Profondeur du réseau")
+        parser.add_argument("--positions", nargs="+", help="Restreindre la suite à ces positions")
+        parser.add_argument("--output", help="Écrit le rapport JSON dans ce fichier")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Rapport de référence")
+        parser.add_argument("--save-baseline", action="store_true",
+                            help="Remplace la référence par ce rapport au lieu de comparer")
+        parser.add_argument("--tolerance", type=float, default=0.3,
+                            help="Écart toléré sur les nœuds et les nœuds/s (0.3 = 30 %%)")
+
+    def handle(self, *args, **options):
+        def progress(engine, result):
+            solved = ""
+            if "solved" in result:
+                solved = "  résolu" if result["solved"] else "  MANQUÉ"
+            depths = result.get("time_to_depth_ms")
+            depths = f"  profondeurs (ms) {depths}" if depths else ""
+            self.stdout.write(
+                f"{engine:>8} {result['name']:<18} {result['move'] or '-':<6} "
+                f"{result['nodes']:>8} nœuds {result['time_ms']:>9.1f} ms{solved}{depths}"
+            )
+
+        report = run_benchmark(options["engines"], options["depth"], options["nn_depth"],
+                               options["positions"], progress)
+        for engine, data in report["engines"].items():
+            summary = data["summary"]
+            rate = f"{summary['solved']}/{summary['tactics']}" if summary["tactics"] else "-"
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{engine} : {summary['nodes']} nœuds en {summary['time_ms']:.0f} ms, "
+                f"{summary['nps']} nœuds/s, tactiques {rate}"
+            ))
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+
+        if options["save_baseline"]:
+            with open(options["baseline"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée dans {options['baseline']}"))
+            return
+
+        if not os.path.exists(options["baseline"]):
+            self.stdout.write(self.style.WARNING("Pas de référence : rien à comparer (--save-baseline pour en créer une)"))
+            return
+        with open(options["baseline"]) as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, options["tolerance"])
+        if problems:
+            raise CommandError("Régression :\n" + "\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("Aucune régression par rapport à la référence"))
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chessgame.ai.opening_book import DEFAULT_MAX_PLY, build_book, get_opening_book
+
+
+class Command(BaseCommand):
+    help = "Construit le livre d'ouvertures (format Polyglot) à partir de fichiers PGN."
+
+    def add_arguments(self, parser):
+        parser.add_argument("pgn", nargs="+", help="Fichiers PGN à lire")
+        parser.add_argument("--output", default=settings.OPENING_BOOK_PATH)
+        parser.add_argument("--max-ply", type=int, default=DEFAULT_MAX_PLY,
+                            help="Nombre de demi-coups retenus par partie")
+        parser.add_argument("--min-games", type=int, default=2,
+                            help="Nombre minimal de parties pour garder un coup")
+
+    def handle(self, *args, **options):
+        def progress(games, positions):
+            self.stdout.write(f"{games} parties lues, {positions} coups distincts")
+
+        games, entries = build_book(
+            options["pgn"],
+            options["output"],
+            max_ply=options["max_ply"],
+            min_games=options["min_games"],
+            progress=progress,
+        )
+        book = get_opening_book(options["output"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{entries} entrées ({len(book) if book else 0} dans le fichier) "
+            f"tirées de {games} parties -> {options['output']}"
+        ))
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chessgame.ai.selfplay import generate
+
+
+class Command(BaseCommand):
+    help = "Génère des données d'entraînement pour SimpleChessNN par auto-apprentissage (parties en parallèle)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("out_dir", help="Dossier des shards et du manifeste")
+        parser.add_argument("--shards", type=int, default=100)
+        parser.add_argument("--games-per-shard", type=int, default=50)
+        parser.add_argument("--workers", type=int, default=settings.ENGINE_POOL_WORKERS)
+        parser.add_argument("--depth", type=int, default=1)
+        parser.add_argument("--max-moves", type=int, default=200)
+        parser.add_argument("--opening-plies", type=int, default=6,
+                            help="Nombre de demi-coups aléatoires en début de partie")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--model", default=settings.NN_MODEL_PATH, help="Poids du réseau")
+
+    def handle(self, *args, **options):
+        def progress(stats, totals):
+            self.stdout.write(
+                f"{stats['index']:05d} : {stats['games']} parties, {stats['positions']} positions "
+                f"en {stats['seconds']:.1f}s | total {totals['games']} parties, "
+                f"{totals['games_per_s']:.2f} parties/s, {totals['positions_per_s']:.0f} positions/s"
+            )
+
+        manifest, totals = generate(
+            options["out_dir"],
+            num_shards=options["shards"],
+            games_per_shard=options["games_per_shard"],
+            workers=options["workers"],
+            depth=options["depth"],
+            max_moves=options["max_moves"],
+            opening_plies=options["opening_plies"],
+            seed=options["seed"],
+            model_path=options["model"],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(manifest['shards'])} shards dans {options['out_dir']} "
+            f"({totals['shards']} générés maintenant)"
+        ))
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chessgame.ai.training import train
+
+
+class Command(BaseCommand):
+    help = "Entraîne SimpleChessNN sur les shards produits par la commande selfplay."
+
+    def add_arguments(self, parser):
+        parser.add_argument("data_dir", help="Dossier des shards (contenant manifest.json)")
+        parser.add_argument("--out", default=settings.NN_MODEL_PATH,
+                            help="Poids servis par l'API (rechargés à chaud)")
+        parser.add_argument("--checkpoint", default=None,
+                            help="État complet pour reprendre l'entraînement (défaut : <out>.ckpt)")
+        parser.add_argument("--checkpoint-every", type=int, default=1000, help="En nombre d'étapes")
+        parser.add_argument("--epochs", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=256)
+        parser.add_argument("--lr", type=float, default=1e-3)
+        parser.add_argument("--workers", type=int, default=2, help="Workers du DataLoader")
+        parser.add_argument("--threads", type=int, default=settings.ENGINE_POOL_WORKERS,
+                            help="Threads torch pour le calcul")
+        parser.add_argument("--pin-memory", action="store_true")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Ordre des exemples (garder le même pour reprendre une époque)")
+
+    def handle(self, *args, **options):
+        def progress(epoch, stats):
+            self.stdout.write(
+                f"Époque {epoch}/{options['epochs']} : perte {stats['loss']:.4f}, "
+                f"{stats['samples']} exemples en {stats['seconds']:.1f}s "
+                f"({stats['samples_per_s']:.0f} exemples/s)"
+            )
+
+        train(
+            options["data_dir"],
+            options["out"],
+            epochs=options["epochs"],
+            batch_size=options["batch_size"],
+            lr=options["lr"],
+            workers=options["workers"],
+            threads=options["threads"],
+            checkpoint_path=options["checkpoint"] or options["out"] + ".ckpt",
+            checkpoint_every=options["checkpoint_every"],
+            pin_memory=options["pin_memory"],
+            progress=progress,
+            seed=options["seed"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Poids écrits dans {options['out']}"))
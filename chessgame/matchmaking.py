@@ -0,0 +1,321 @@
+import asyncio
+import collections
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from chessgame import metrics
+from chessgame.games import seat_ticket
+
+DEFAULT_RATING = 1200
+DEFAULT_TIME_CONTROL = "standard"
+MAX_TIME_CONTROL_LENGTH = 20
+
+# Classement : tranches de 100 points par cadence. La fenêtre de recherche
+# part de ±100 et s'élargit de 50 points par seconde d'attente, jusqu'à ±800.
+BUCKET_WIDTH = 100
+BASE_WINDOW = 100
+WINDOW_GROWTH_PER_S = 50
+MAX_WINDOW = 800
+
+# Nombre d'attentes conservées pour les statistiques de temps d'appariement
+WAIT_SAMPLES = 1000
+
+# File SQLite : relecture complète de la file par chaque worker (secondes)
+RESYNC_INTERVAL_S = 5
+
+
+class Ticket:
+    """Un joueur en file d'attente (ticket_id = nom du canal de sa connexion)."""
+
+    def __init__(self, ticket_id, rating=DEFAULT_RATING, time_control=DEFAULT_TIME_CONTROL, enqueued_at=None):
+        self.ticket_id = ticket_id
+        self.rating = rating
+        self.time_control = time_control
+        self.enqueued_at = time.time() if enqueued_at is None else enqueued_at
+
+
+def search_window(waited_s):
+    return min(MAX_WINDOW, BASE_WINDOW + WINDOW_GROWTH_PER_S * waited_s)
+
+
+class QueueIndex:
+    """
+    File d'attente indexée par (cadence, tranche de classement).
+    Chaque tranche est un OrderedDict : ajout, retrait et plus ancien en O(1).
+    """
+
+    def __init__(self):
+        self.tickets = {}
+        self.buckets = {}
+
+    def __len__(self):
+        return len(self.tickets)
+
+    @staticmethod
+    def bucket_of(ticket):
+        return ticket.time_control, ticket.rating // BUCKET_WIDTH
+
+    def add(self, ticket):
+        if ticket.ticket_id in self.tickets:
+            return False
+        self.tickets[ticket.ticket_id] = ticket
+        key = self.bucket_of(ticket)
+        self.buckets.setdefault(key, collections.OrderedDict())[ticket.ticket_id] = ticket
+        return True
+
+    def remove(self, ticket_id):
+        ticket = self.tickets.pop(ticket_id, None)
+        if ticket is None:
+            return None
+        key = self.bucket_of(ticket)
+        bucket = self.buckets[key]
+        del bucket[ticket_id]
+        if not bucket:
+            del self.buckets[key]
+        return ticket
+
+    def _opponent(self, ticket, window):
+        """Adversaire attendant depuis le plus longtemps dans la fenêtre de classement."""
+        best = None
+        low = (ticket.rating - window) // BUCKET_WIDTH
+        high = (ticket.rating + window) // BUCKET_WIDTH
+        for bucket_index in range(int(low), int(high) + 1):
+            for other in self.buckets.get((ticket.time_control, bucket_index), {}).values():
+                if other is ticket or abs(other.rating - ticket.rating) > window:
+                    continue
+                if best is None or other.enqueued_at < best.enqueued_at:
+                    best = other
+                # Les tickets d'une tranche sont dans l'ordre d'arrivée
+                break
+        return best
+
+    def take_pairs(self, now):
+        """Apparie la file en un seul passage, du ticket le plus ancien au plus récent."""
+        pairs = []
+        for ticket in list(self.tickets.values()):
+            if ticket.ticket_id not in self.tickets:
+                continue  # déjà apparié pendant ce passage
+            opponent = self._opponent(ticket, search_window(now - ticket.enqueued_at))
+            if opponent is not None:
+                self.remove(ticket.ticket_id)
+                self.remove(opponent.ticket_id)
+                pairs.append((ticket, opponent))
+        return pairs
+
+
+# --- Backends ---------------------------------------------------------------
+
+class InMemoryQueueBackend:
+    """File propre au processus : un seul worker Daphne, ou les tests."""
+    blocking = False
+
+    def __init__(self):
+        self._index = QueueIndex()
+        self._lock = threading.Lock()
+
+    def add(self, ticket):
+        with self._lock:
+            return self._index.add(ticket)
+
+    def remove(self, ticket_id):
+        with self._lock:
+            return self._index.remove(ticket_id) is not None
+
+    def depth(self):
+        return len(self._index)
+
+    def take_pairs(self, now):
+        with self._lock:
+            return self._index.take_pairs(now)
+
+
+class SQLiteQueueBackend:
+    """
+    File partagée par plusieurs workers d'une même machine, dans une base
+    SQLite (mode WAL). Chaque worker garde un QueueIndex en mémoire, complété
+    à chaque passe par les seuls tickets arrivés depuis (seq croissant) ; la
+    base ne sert qu'à réclamer les paires, dans une transaction BEGIN
+    IMMEDIATE : deux workers ne peuvent pas apparier le même joueur.
+
+    Toutes les méthodes sont bloquantes : MatchmakingService les appelle hors
+    de la boucle asyncio (blocking = True).
+    """
+    blocking = True
+
+    def __init__(self, path, resync_interval=RESYNC_INTERVAL_S):
+        self.path = str(path)
+        self.resync_interval = resync_interval
+        self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        self._index = QueueIndex()
+        self._last_seq = 0
+        self._synced_at = None
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS matchmaking_queue ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, ticket_id TEXT NOT NULL UNIQUE,"
+            " rating INTEGER NOT NULL, time_control TEXT NOT NULL, enqueued_at REAL NOT NULL)"
+        )
+
+    def add(self, ticket):
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO matchmaking_queue (ticket_id, rating, time_control, enqueued_at)"
+                " VALUES (?, ?, ?, ?)",
+                (ticket.ticket_id, ticket.rating, ticket.time_control, ticket.enqueued_at),
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._index.add(ticket)
+            return True
+
+    def remove(self, ticket_id):
+        with self._lock:
+            self._index.remove(ticket_id)
+            cursor = self._connection.execute("DELETE FROM matchmaking_queue WHERE ticket_id = ?", (ticket_id,))
+            return cursor.rowcount == 1
+
+    def depth(self):
+        """Tickets connus de ce worker (à jour à la dernière passe), sans accès à la base."""
+        return len(self._index)
+
+    def _sync(self):
+        # Relecture complète de temps en temps : oublie les tickets retirés par
+        # un autre worker (déconnexion) qui n'auraient jamais trouvé d'adversaire
+        now = time.monotonic()
+        if self._synced_at is None or now - self._synced_at >= self.resync_interval:
+            self._index = QueueIndex()
+            self._last_seq = 0
+            self._synced_at = now
+        rows = self._connection.execute(
+            "SELECT seq, ticket_id, rating, time_control, enqueued_at FROM matchmaking_queue"
+            " WHERE seq > ? ORDER BY seq",
+            (self._last_seq,),
+        )
+        for seq, *ticket in rows:
+            self._index.add(Ticket(*ticket))
+            self._last_seq = seq
+
+    def take_pairs(self, now):
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync()
+                pairs = []
+                for pair in self._index.take_pairs(now):
+                    ids = [ticket.ticket_id for ticket in pair]
+                    present = {row[0] for row in connection.execute(
+                        "SELECT ticket_id FROM matchmaking_queue WHERE ticket_id IN (?, ?)", ids
+                    )}
+                    if len(present) == 2:
+                        connection.execute("DELETE FROM matchmaking_queue WHERE ticket_id IN (?, ?)", ids)
+                        pairs.append(pair)
+                    else:
+                        # Ticket déjà parti (autre worker) : son adversaire attend la passe suivante
+                        for ticket in pair:
+                            if ticket.ticket_id in present:
+                                self._index.add(ticket)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                self._synced_at = None  # index peut-être modifié : relecture complète
+                raise
+            return pairs
+
+
+# --- Service ----------------------------------------------------------------
+
+class MatchmakingService:
+    """
+    File d'attente + appariement par passes régulières (tick_interval secondes).
+    Les parties trouvées sont annoncées par le channel layer au canal de
+    chaque joueur (message "match_found"), quel que soit son worker.
+    """
+
+    def __init__(self, backend, tick_interval=0.25):
+        self.backend = backend
+        self.tick_interval = tick_interval
+        self.matches = 0
+        self._waits = collections.deque(maxlen=WAIT_SAMPLES)
+        self._ticker = None
+
+    async def _call(self, method, *args):
+        # Backend à base de données : hors de la boucle asyncio
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def enqueue(self, ticket):
+        return await self._call(self.backend.add, ticket)
+
+    async def cancel(self, ticket_id):
+        return await self._call(self.backend.remove, ticket_id)
+
+    async def tick(self, now=None):
+        """Une passe d'appariement. Retourne [(blancs, noirs)] : le plus ancien a les blancs."""
+        now = time.time() if now is None else now
+        pairs = await self._call(self.backend.take_pairs, now)
+        for pair in pairs:
+            self.matches += 1
+            for ticket in pair:
+                waited = now - ticket.enqueued_at
+                self._waits.append(waited)
+                metrics.matchmaking_time_to_match.observe(waited)
+        return pairs
+
+    def stats(self):
+        waits = sorted(self._waits)
+        stats = {"queue_depth": self.backend.depth(), "matches": self.matches}
+        if waits:
+            stats["time_to_match_ms"] = {
+                "avg": round(sum(waits) / len(waits) * 1000, 1),
+                "p50": round(waits[len(waits) // 2] * 1000, 1),
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1),
+            }
+        return stats
+
+    def ensure_ticker(self, channel_layer):
+        """Démarre la boucle d'appariement si elle ne tourne pas déjà dans cette boucle asyncio."""
+        loop = asyncio.get_running_loop()
+        if self._ticker is None or self._ticker.done() or self._ticker.get_loop() is not loop:
+            self._ticker = loop.create_task(self._run_ticker(channel_layer))
+
+    async def _run_ticker(self, channel_layer):
+        # S'arrête quand la file est vide ; relancée par le prochain enqueue
+        while self.backend.depth():
+            await asyncio.sleep(self.tick_interval)
+            for white, black in await self.tick():
+                game_id = f"game_{uuid.uuid4().hex[:16]}"
+                for ticket, role, color in ((white, "white", "w"), (black, "black", "b")):
+                    await channel_layer.send(ticket.ticket_id, {
+                        "type": "match_found",
+                        "game_id": game_id,
+                        "role": role,
+                        "ticket": seat_ticket(game_id, color),
+                    })
+
+
+_service = None
+
+
+def get_matchmaking_service():
+    """Service du processus courant, avec le backend choisi dans les réglages."""
+    global _service
+    if _service is None:
+        if settings.MATCHMAKING_BACKEND == "sqlite":
+            backend = SQLiteQueueBackend(settings.MATCHMAKING_DB_PATH)
+        else:
+            backend = InMemoryQueueBackend()
+        _service = MatchmakingService(backend, settings.MATCHMAKING_TICK_MS / 1000)
+    return _service
+
+
+metrics.registry.register(metrics.Gauge(
+    "chess_matchmaking_queue_depth", "Joueurs en file d'attente.",
+    callback=lambda: _service.backend.depth() if _service is not None else 0,
+))
@@ -0,0 +1,211 @@
+import bisect
+import threading
+
+# Métriques du serveur au format texte de Prometheus (version 0.0.4), servies
+# par /metrics. Les recherches tournent dans les workers du pool : leurs
+# compteurs reviennent dans le résultat et sont enregistrés ici, côté serveur.
+
+# Bornes des histogrammes (secondes), des requêtes rapides du livre aux recherches longues
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPTH_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 12, 16, 20)
+WAIT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} : étiquettes attendues {self.labels}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labels, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", key, (), value) for key, value in items]
+
+
+class Gauge(Metric):
+    """Valeur lue au moment de l'export (callback), ou fixée avec set()."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self.callback is not None:
+            return [("", (), (), self.callback())]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", key, (), value) for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Compte par intervalle (cumulé à l'export), somme, nombre
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, ([*counts], total, n)) for key, (counts, total, n) in self._values.items())
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", key, (("le", _format_value(float(bound))),), cumulative))
+            samples.append(("_sum", key, (), total))
+            samples.append(("_count", key, (), n))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà enregistrée : {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+engine_requests = registry.register(Counter(
+    "chess_engine_requests_total", "Coups demandés aux moteurs, par origine du coup.", ("engine", "source")))
+engine_cache = registry.register(Counter(
+    "chess_engine_cache_total", "Consultations du cache des coups (hit ou miss).", ("engine", "result")))
+engine_ponder = registry.register(Counter(
+    "chess_engine_ponder_total", "Réflexions sur le temps de l'adversaire (lancées, ignorées, hit, miss).",
+    ("result",)))
+engine_busy = registry.register(Counter(
+    "chess_engine_busy_total", "Demandes refusées car le pool de moteurs est saturé.", ("engine",)))
+engine_latency = registry.register(Histogram(
+    "chess_engine_latency_seconds", "Durée d'une demande de coup, file du pool comprise.", ("engine",)))
+engine_search = registry.register(Histogram(
+    "chess_engine_search_seconds", "Durée de la recherche dans le worker.", ("engine",)))
+engine_depth = registry.register(Histogram(
+    "chess_engine_depth", "Profondeur atteinte par la recherche.", ("engine",), DEPTH_BUCKETS))
+engine_nodes = registry.register(Counter(
+    "chess_engine_nodes_total", "Nœuds visités par les recherches.", ("engine",)))
+engine_evals = registry.register(Counter(
+    "chess_engine_evals_total", "Positions évaluées par les recherches.", ("engine",)))
+engine_cutoffs = registry.register(Counter(
+    "chess_engine_cutoffs_total", "Coupures beta des recherches alpha-beta.", ("engine",)))
+engine_tt_hits = registry.register(Counter(
+    "chess_engine_tt_hits_total", "Succès de la table de transposition.", ("engine",)))
+ws_moves = registry.register(Counter(
+    "chess_ws_moves_total", "Coups reçus par WebSocket, acceptés ou refusés.", ("result",)))
+games_saved = registry.register(Counter(
+    "chess_games_saved_total", "Parties terminées enregistrées en base, ou perdues (échec d'écriture).",
+    ("result",)))
+matchmaking_time_to_match = registry.register(Histogram(
+    "chess_matchmaking_time_to_match_seconds", "Attente en file avant appariement.", (), WAIT_BUCKETS))
+
+
+def record_engine_move(engine, result, elapsed):
+    """
+    Enregistre une demande de coup : durée de bout en bout (elapsed, secondes)
+    et, si le moteur les renvoie, les compteurs de sa recherche.
+    """
+    result = result or {}
+    if result.get("cached"):
+        source = "cache"
+    elif result.get("ponder"):
+        source = "ponder"
+    elif result.get("book"):
+        source = "book"
+    elif result.get("tablebase"):
+        source = "tablebase"
+    elif result:
+        source = "search"
+    else:
+        source = "none"
+    engine_requests.inc(engine=engine, source=source)
+    engine_latency.observe(elapsed, engine=engine)
+    if source != "search":
+        return
+    if "time_ms" in result:
+        engine_search.observe(result["time_ms"] / 1000, engine=engine)
+    if "depth" in result:
+        engine_depth.observe(result["depth"], engine=engine)
+    for counter, key in ((engine_nodes, "nodes"), (engine_evals, "evals"),
+                         (engine_cutoffs, "cutoffs"), (engine_tt_hits, "tt_hits")):
+        if result.get(key):
+            counter.inc(result[key], engine=engine)
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Game',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_id', models.CharField(max_length=100)),
+                ('mode', models.CharField(choices=[('online', 'En ligne'), ('bot', "Contre l'IA")], max_length=10)),
+                ('engine', models.CharField(blank=True, max_length=20)),
+                ('result', models.CharField(default='*', max_length=7)),
+                ('termination', models.CharField(blank=True, max_length=30)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('ply_count', models.PositiveIntegerField(default=0)),
+                ('moves', models.BinaryField(default=b'')),
+                ('black', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('white', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-ended_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Move',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ply', models.PositiveIntegerField()),
+                ('move', models.PositiveIntegerField()),
+                ('engine', models.CharField(max_length=20)),
+                ('time_ms', models.FloatField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engine_moves', to='chessgame.game')),
+            ],
+            options={
+                'ordering': ['game', 'ply'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['white', '-ended_at'], name='game_white_ended'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['black', '-ended_at'], name='game_black_ended'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['-ended_at'], name='game_ended'),
+        ),
+        migrations.AddConstraint(
+            model_name='move',
+            constraint=models.UniqueConstraint(fields=('game', 'ply'), name='move_game_ply'),
+        ),
+    ]
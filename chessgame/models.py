@@ -1,3 +1,102 @@
+import array
+import sys
+
+import chess
+import chess.pgn
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from chessgame.ai.transposition import pack_move, unpack_move
+
+
+def encode_moves(moves):
+    """Coups (chess.Move) sur deux octets chacun : départ, arrivée, promotion (petit-boutiste)."""
+    packed = array.array("H", (pack_move(move) for move in moves))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def decode_moves(data):
+    packed = array.array("H", bytes(data))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return [unpack_move(value) for value in packed]
+
+
+class Game(models.Model):
+    """
+    Partie jouée sur le serveur (en ligne ou contre l'IA), enregistrée à sa fin.
+    Les coups sont stockés ensemble dans moves (encode_moves, deux octets par
+    coup) : une ligne par partie plutôt qu'une ligne par coup.
+    """
+    MODE_ONLINE = "online"
+    MODE_BOT = "bot"
+    MODES = [(MODE_ONLINE, "En ligne"), (MODE_BOT, "Contre l'IA")]
+
+    game_id = models.CharField(max_length=100)
+    mode = models.CharField(max_length=10, choices=MODES)
+    engine = models.CharField(max_length=20, blank=True)
+    white = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                              related_name="+")
+    black = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                              related_name="+")
+    # "1-0", "0-1", "1/2-1/2", ou "*" pour une partie abandonnée en cours
+    result = models.CharField(max_length=7, default="*")
+    termination = models.CharField(max_length=30, blank=True)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    ply_count = models.PositiveIntegerField(default=0)
+    moves = models.BinaryField(default=b"")
+
+    class Meta:
+        ordering = ["-ended_at"]
+        indexes = [
+            models.Index(fields=["white", "-ended_at"], name="game_white_ended"),
+            models.Index(fields=["black", "-ended_at"], name="game_black_ended"),
+            models.Index(fields=["-ended_at"], name="game_ended"),
+        ]
+
+    def __str__(self):
+        return f"{self.game_id} ({self.result})"
+
+    def move_list(self):
+        return decode_moves(self.moves)
+
+    def board(self):
+        """Position finale, coups rejoués depuis la position initiale."""
+        board = chess.Board()
+        for move in self.move_list():
+            board.push(move)
+        return board
+
+    def pgn(self):
+        """PGN de la partie (accepté tel quel par /api/analysis/)."""
+        game = chess.pgn.Game.from_board(self.board())
+        game.headers["Result"] = self.result
+        game.headers["Date"] = self.ended_at.strftime("%Y.%m.%d")
+        return str(game)
+
+
+class Move(models.Model):
+    """
+    Coup calculé par une IA dans une partie. Le coup est déjà dans Game.moves :
+    on garde ici le moteur et son temps de réflexion, pour analyser ses parties
+    ou s'en servir à l'entraînement.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="engine_moves")
+    ply = models.PositiveIntegerField()  # index du coup dans Game.moves
+    move = models.PositiveIntegerField()  # pack_move
+    engine = models.CharField(max_length=20)
+    time_ms = models.FloatField()
+
+    class Meta:
+        ordering = ["game", "ply"]
+        constraints = [models.UniqueConstraint(fields=["game", "ply"], name="move_game_ply")]
+
+    def __str__(self):
+        return f"{self.game.game_id} #{self.ply} {self.uci}"
+
+    @property
+    def uci(self):
+        return unpack_move(self.move).uci()
@@ -0,0 +1,44 @@
+import chess
+from django.core.cache import caches
+
+from chessgame import metrics
+from chessgame.ai.transposition import zobrist_key
+
+# Alias du cache dans settings.CACHES : mémoire locale sur une seule machine,
+# fichiers ou base de données pour le partager entre plusieurs workers
+CACHE_ALIAS = "engine"
+
+
+def cache_key(engine, fen, **params):
+    """
+    Clé d'un résultat : moteur, position normalisée (clé Zobrist : les
+    compteurs de coups du FEN sont ignorés) et paramètres de la recherche
+    (profondeur, temps, version du modèle...). None si le FEN est invalide.
+    """
+    try:
+        board = chess.Board(fen)
+    except (TypeError, ValueError):
+        return None
+    suffix = ":".join(f"{name}={params[name]}" for name in sorted(params))
+    return f"move:{engine}:{zobrist_key(board):016x}:{suffix}"
+
+
+async def get_cached_move(engine, key):
+    """Résultat déjà calculé pour cette clé (marqué "cached"), ou None."""
+    if key is None:
+        return None
+    result = await caches[CACHE_ALIAS].aget(key)
+    metrics.engine_cache.inc(engine=engine, result="hit" if result is not None else "miss")
+    if result is None:
+        return None
+    return {**result, "cached": True}
+
+
+async def store_move(key, result):
+    """
+    Garde le résultat d'un moteur. Les coups du livre ne sont pas gardés :
+    ils sont tirés au hasard parmi les coups connus, à chaque partie.
+    """
+    if key is None or not result or result.get("book"):
+        return
+    await caches[CACHE_ALIAS].aset(key, result)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+
+import chess
+from django.conf import settings
+
+from chessgame import metrics
+from chessgame.engines import run_engine
+
+logger = logging.getLogger(__name__)
+
+# Une réflexion terminée reste utilisable pendant ce temps (partie abandonnée sans prévenir)
+RESULT_TTL_S = 600
+
+
+def position_key(fen):
+    """Position sans les compteurs de coups, en-passant seulement s'il est jouable."""
+    return chess.Board(fen).epd()
+
+
+class PonderSearch:
+    """Réflexion sur le coup prévu de l'adversaire, dans un worker du pool."""
+
+    def __init__(self, fen, job):
+        self.key = position_key(fen)
+        self.job = job
+        self.started_at = time.monotonic()
+
+
+class PonderManager:
+    """
+    Réflexion pendant le temps de l'adversaire (parties contre l'IA).
+
+    Après chaque coup de l'IA, on cherche déjà la position qui suivra la
+    réponse prévue (deuxième coup de la variante principale). Si l'adversaire
+    joue ce coup ("ponder hit"), la recherche en cours ou terminée sert de
+    réponse : tout de suite si elle est finie, sinon après le budget habituel,
+    avec l'avance prise. Sinon elle est arrêtée.
+
+    Au plus max_active réflexions à la fois, et seulement sur un worker libre.
+    Elles sont soumises preemptible : le pool les arrête dès qu'un autre calcul
+    (coup, analyse, réseau de neurones) manquerait de worker.
+    """
+
+    def __init__(self, max_active, time_ms, max_depth):
+        self.max_active = max_active
+        self.time_ms = time_ms
+        self.max_depth = max_depth
+        self._searches = {}
+
+    def __len__(self):
+        return len(self._searches)
+
+    def active(self):
+        return sum(not search.job.done() for search in self._searches.values())
+
+    def _prune(self):
+        now = time.monotonic()
+        for game_id, search in list(self._searches.items()):
+            if search.job.done() and now - search.started_at > RESULT_TTL_S:
+                del self._searches[game_id]
+
+    def start(self, executor, game_id, fen, result):
+        """
+        Lance la réflexion de la partie après le coup de l'IA (result, joué depuis fen).
+        Retourne False si rien n'est lancé (partie finie, pas de coup prévu, plafond atteint).
+        """
+        self.cancel(game_id)
+        self._prune()
+        pv = (result or {}).get("pv") or []
+        if len(pv) < 2:
+            return False
+        board = chess.Board(fen)
+        for uci in pv[:2]:
+            board.push_uci(uci)
+        if board.is_game_over():
+            return False
+        if self.active() >= self.max_active or executor.pending >= executor.max_workers:
+            metrics.engine_ponder.inc(result="skipped")
+            return False
+        job = executor.submit(run_engine, "minimax", board.fen(), depth=self.max_depth, time_ms=self.time_ms,
+                              preemptible=True)
+        self._searches[game_id] = PonderSearch(board.fen(), job)
+        metrics.engine_ponder.inc(result="started")
+        return True
+
+    async def take(self, game_id, fen, time_ms):
+        """
+        Réponse de la réflexion si la position demandée est celle prévue, sinon None
+        (la réflexion est alors arrêtée). time_ms : budget d'une recherche normale.
+        """
+        search = self._searches.pop(game_id, None)
+        if search is None:
+            return None
+        if search.key != position_key(fen):
+            search.job.stop()
+            metrics.engine_ponder.inc(result="miss")
+            return None
+        metrics.engine_ponder.inc(result="hit")
+        if not search.job.done():
+            # Encore en cours : elle continue pendant le budget normal, avec son avance
+            try:
+                await asyncio.wait_for(asyncio.shield(search.job.result()), time_ms / 1000)
+            except asyncio.TimeoutError:
+                search.job.stop()
+        try:
+            result = await search.job.result()
+        except Exception:
+            logger.exception("Réflexion de %s en échec", game_id)
+            return None
+        if result is None:
+            return None
+        return {**result, "ponder": True}
+
+    def cancel(self, game_id):
+        search = self._searches.pop(game_id, None)
+        if search is not None:
+            search.job.stop()
+
+
+_manager = None
+
+
+def get_ponder_manager():
+    """Réflexions du processus courant, ou None si ENGINE_PONDER_MS vaut 0."""
+    global _manager
+    if not settings.ENGINE_PONDER_MS:
+        return None
+    if _manager is None:
+        _manager = PonderManager(settings.ENGINE_PONDER_MAX_ACTIVE, settings.ENGINE_PONDER_MS,
+                                 settings.ENGINE_MAX_DEPTH)
+    return _manager
@@ -1,7 +1,8 @@
 from django.urls import path
-from chessgame.consumers import MatchmakingConsumer, ChessConsumer
+from chessgame.consumers import AnalysisConsumer, MatchmakingConsumer, ChessConsumer
 
 websocket_urlpatterns = [
     path("ws/matchmaking/", MatchmakingConsumer.as_asgi()),
-    path("ws/chess/", ChessConsumer.as_asgi()),
+    path("ws/chess/<str:game_id>/", ChessConsumer.as_asgi()),
+    path("ws/analysis/", AnalysisConsumer.as_asgi()),
 ]
@@ -1,3 +1,1336 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+import chess
+import chess.polyglot
+import numpy as np
+import torch
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from chessgame.ai import ai_minimax, ai_nn
+from chessgame.ai import benchmark, selfplay, training
+from chessgame.ai.encoding import pack_board, unpack_batch
+from chessgame.ai.opening_book import OpeningBook, build_book
+from chessgame.ai.tablebase import TB_WIN_SCORE, TablebaseProber, get_tablebase
+from chessgame.ai.nn_registry import UNTRAINED_VERSION, ModelRegistry, get_nn_ai_move
+from chessgame.ai.evaluation import IncrementalEvaluator, see, static_tenths
+from chessgame import analysis, metrics, move_cache
+from chessgame.engine_pool import EngineBusy, EngineExecutor
+from chessgame.engines import Engine, get_engine, run_engine, warm_up
+from chessgame.channel_layer import SQLiteChannelLayer
+from chessgame.game_records import GameWriter, game_record
+from chessgame.models import Game, Move as DbMove, decode_moves, encode_moves
+from chessgame.ponder import PonderManager
+from chessgame.games import SPECTATOR, GameState, SQLiteGameRegistry, get_game_registry, seat_color, seat_ticket
+from chessgame.matchmaking import InMemoryQueueBackend, MatchmakingService, SQLiteQueueBackend, Ticket
+from chessgame.routing import websocket_urlpatterns
+from chessgame.ai.smp import HelperPool
+from chessgame.ai.transposition import (
+    EXACT, LOWER, SharedTranspositionTable, TranspositionTable, get_transposition_table, zobrist_key,
+)
+
+
+MIDDLEGAME_FEN = "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7"
+MATE_IN_ONE_FEN = "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1"
+
+# Positions avec roques, prise en passant et promotions possibles
+SPECIAL_MOVES_FENS = [
+    "r3k2r/pppq1ppp/2n2n2/3pp3/3PP3/2N2N2/PPPQ1PPP/R3K2R w KQkq - 0 8",
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+    "8/1P4k1/8/8/8/8/6Kp/8 w - - 0 1",
+    "r3k3/1P6/8/8/8/8/8/4K2R w Kq - 0 1",
+    "r3k2r/8/8/8/8/8/8/4K3 b kq - 0 1",
+]
+
+
+# Le résumé de chaque recherche (niveau INFO) encombrerait la sortie des tests
+logging.getLogger("chessgame").setLevel(logging.WARNING)
+
+
+def full_negamax(board, depth):
+    """Negamax complet, sans élagage : référence pour alpha-beta."""
+    if depth == 0:
+        return ai_minimax.evaluate_board(board)
+    moves = list(board.legal_moves)
+    if not moves:
+        return -ai_minimax.MATE_SCORE if board.is_check() else 0
+    best = -math.inf
+    for move in moves:
+        board.push(move)
+        best = max(best, -full_negamax(board, depth - 1))
+        board.pop()
+    return best
+
+
+class AlphaBetaSearchTests(SimpleTestCase):
+    def test_returns_legal_move_in_api_format(self):
+        result = ai_minimax.get_minimax_move(chess.STARTING_FEN, depth=3)
+        move = chess.Move.from_uci(result["from"] + result["to"])
+        self.assertIn(move, chess.Board().legal_moves)
+        self.assertGreater(result["nodes"], 0)
+
+    def test_finds_mate_in_one(self):
+        result = ai_minimax.get_minimax_move(MATE_IN_ONE_FEN, depth=3)
+        self.assertEqual((result["from"], result["to"]), ("a1", "a8"))
+
+    def test_alphabeta_matches_full_width_score(self):
+        board = chess.Board(MIDDLEGAME_FEN)
+        expected = full_negamax(board, 2)
+        score, _, _ = ai_minimax.iterative_deepening(board, 2, quiescence=False)
+        self.assertAlmostEqual(score, expected)
+
+    def test_alphabeta_visits_fewer_nodes_than_minimax(self):
+        alphabeta = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=3)
+        minimax = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=3, mode="minimax")
+        self.assertLess(alphabeta["nodes"], minimax["nodes"])
+
+    def test_no_move_when_game_over(self):
+        board = chess.Board(MATE_IN_ONE_FEN)
+        board.push_uci("a1a8")
+        self.assertIsNone(ai_minimax.get_minimax_move(board.fen()))
+
+    def test_search_stats_are_logged_once_without_printing(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), self.assertLogs("chessgame.ai.ai_minimax", "INFO") as logs:
+            result = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=3, use_book=False)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual(len(logs.records), 1)
+        for key in ("nodes", "evals", "cutoffs", "tt_hits", "depth", "time_ms"):
+            self.assertIn(key, result)
+        self.assertEqual(result["depth"], 3)
+        self.assertGreater(result["evals"], 0)
+        self.assertGreater(result["cutoffs"], 0)
+        self.assertLessEqual(result["evals"], result["nodes"])
+
+    def test_legacy_minimax_counts_leaves(self):
+        stats = ai_minimax.SearchStats()
+        ai_minimax.minimax(chess.Board(), 2, True, stats)
+        self.assertEqual(stats.evals, 400)
+        self.assertEqual(stats.nodes, 421)
+
+
+class TranspositionTableTests(SimpleTestCase):
+    def test_zobrist_key_matches_polyglot_hash(self):
+        rng = random.Random(3)
+        boards = [chess.Board(fen) for fen in SPECIAL_MOVES_FENS]
+        board = chess.Board()
+        for _ in range(300):
+            if board.is_game_over():
+                board = chess.Board()
+            board.push(rng.choice(list(board.legal_moves)))
+            boards.append(board.copy(stack=False))
+        for board in boards:
+            self.assertEqual(zobrist_key(board), chess.polyglot.zobrist_hash(board), board.fen())
+
+    def test_store_and_probe(self):
+        tt = TranspositionTable(size_mb=1)
+        key = zobrist_key(chess.Board())
+        move = chess.Move.from_uci("e2e4")
+        self.assertIsNone(tt.probe(key))
+        tt.store(key, 3, EXACT, 0.5, move)
+        self.assertEqual(tt.probe(key)[1:5], (3, EXACT, 0.5, move))
+        self.assertEqual((tt.hits, tt.misses), (1, 1))
+
+    def test_depth_preferred_entry_survives_shallow_store(self):
+        tt = TranspositionTable(size_mb=1)
+        key = 42
+        other = key + tt.size  # même case, autre position
+        tt.store(key, 6, EXACT, 1.0, None)
+        tt.store(other, 1, LOWER, 2.0, None)
+        self.assertEqual(tt.probe(key)[1], 6)
+        self.assertEqual(tt.probe(other)[1], 1)
+
+    def test_old_deep_entries_are_replaced_by_new_search(self):
+        tt = TranspositionTable(size_mb=1)
+        tt.store(42, 6, EXACT, 1.0, None)
+        tt.new_search()
+        tt.store(42 + tt.size, 1, EXACT, 2.0, None)
+        self.assertIsNone(tt.probe(42))
+
+    def test_memory_cap_bounds_table_size(self):
+        self.assertLess(TranspositionTable(size_mb=1).size, TranspositionTable(size_mb=8).size)
+
+    def test_table_is_reused_across_requests(self):
+        tt = get_transposition_table()
+        ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=3)
+        hits_before = tt.hits
+        result = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=3)
+        self.assertGreater(tt.hits, hits_before)
+        self.assertGreater(result["tt_hits"], 0)
+
+
+class LazySMPTests(SimpleTestCase):
+    def test_shared_table_store_probe_and_replacement(self):
+        tt = SharedTranspositionTable(size_mb=1)
+        key = zobrist_key(chess.Board())
+        move = chess.Move.from_uci("e7e8q")
+        self.assertIsNone(tt.probe(key))
+        tt.store(key, 3, EXACT, -8.3, move)
+        self.assertEqual(tt.probe(key)[1:5], (3, EXACT, -8.3, move))
+        # Même remplacement que TranspositionTable
+        other = key ^ tt.size
+        tt.store(other, 1, LOWER, 2.0, None)
+        self.assertEqual(tt.probe(key)[1], 3)
+        self.assertEqual(tt.probe(other)[1:5], (1, LOWER, 2.0, None))
+
+    def test_torn_shared_entry_is_ignored(self):
+        tt = SharedTranspositionTable(size_mb=1)
+        tt.store(42, 6, EXACT, 1.0, None)
+        index = (42 & (tt.size - 1)) * 4
+        tt._words[index + 1] ^= 1 << 40  # données d'une autre écriture
+        self.assertIsNone(tt.probe(42))
+
+    def test_shared_table_is_visible_across_processes(self):
+        tt = SharedTranspositionTable(size_mb=1)
+        process = multiprocessing.get_context("fork").Process(target=tt.store, args=(42, 5, EXACT, 1.5, None))
+        process.start()
+        process.join()
+        self.assertEqual(tt.probe(42)[1:4], (5, EXACT, 1.5))
+
+    def test_parallel_search_finds_mate_and_counts_all_processes(self):
+        pool = HelperPool(1, SharedTranspositionTable(size_mb=4))
+        try:
+            board = chess.Board(MATE_IN_ONE_FEN)
+            _, move, ctx = pool.search(board, 3, threads=2)
+            self.assertEqual(move.uci(), "a1a8")
+            self.assertEqual(ctx.stats.threads, 2)
+            self.assertEqual(board.fen(), MATE_IN_ONE_FEN)
+
+            board = chess.Board(MIDDLEGAME_FEN)
+            _, move, ctx = pool.search(board, 3, threads=2)
+            self.assertIn(move, board.legal_moves)
+            self.assertFalse(pool.broken)
+        finally:
+            pool.close()
+
+    def test_request_threads_are_capped_by_settings(self):
+        result = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=2, threads=8)
+        self.assertEqual(result["threads"], 1)
+
+
+class IncrementalEvaluatorTests(SimpleTestCase):
+    def assert_same_as_evaluate_board(self, evaluator):
+        expected = ai_minimax.evaluate_board(evaluator.board)
+        self.assertAlmostEqual(evaluator.evaluate(), expected, places=9, msg=evaluator.board.fen())
+        self.assertEqual(evaluator.static, static_tenths(evaluator.board))
+
+    def test_matches_evaluate_board_on_random_games(self):
+        rng = random.Random(0)
+        for _ in range(30):
+            evaluator = IncrementalEvaluator(chess.Board())
+            for _ in range(rng.randint(10, 120)):
+                moves = list(evaluator.board.legal_moves)
+                if not moves:
+                    break
+                evaluator.push(rng.choice(moves))
+                self.assert_same_as_evaluate_board(evaluator)
+            while evaluator.board.move_stack:
+                evaluator.pop()
+                self.assert_same_as_evaluate_board(evaluator)
+
+    def test_matches_evaluate_board_after_special_moves(self):
+        for fen in SPECIAL_MOVES_FENS:
+            evaluator = IncrementalEvaluator(chess.Board(fen))
+            for move in list(evaluator.board.legal_moves):
+                evaluator.push(move)
+                self.assert_same_as_evaluate_board(evaluator)
+                evaluator.pop()
+                self.assert_same_as_evaluate_board(evaluator)
+
+
+class QuiescenceTests(SimpleTestCase):
+    # Dame blanche face à un pion noir défendu par un autre pion
+    DEFENDED_PAWN_FEN = "4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1"
+
+    def see(self, fen, uci):
+        return see(chess.Board(fen), chess.Move.from_uci(uci))
+
+    def test_static_exchange_evaluation(self):
+        self.assertEqual(self.see("4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1", "e4d5"), 10)
+        self.assertEqual(self.see("4k3/8/2p5/3p4/4P3/8/8/4K3 w - - 0 1", "e4d5"), 0)
+        self.assertEqual(self.see(self.DEFENDED_PAWN_FEN, "d1d5"), -80)
+        # La dame derrière la tour participe à l'échange (rayons X)
+        self.assertEqual(self.see("3qk3/8/8/3n4/8/8/3R4/3RK3 w - - 0 1", "d2d5"), 30)
+        self.assertEqual(self.see("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6"), 10)
+
+    def test_quiescence_sees_the_recapture_beyond_the_horizon(self):
+        naive_score, move, _ = ai_minimax.iterative_deepening(
+            chess.Board(self.DEFENDED_PAWN_FEN), 1, quiescence=False)
+        self.assertEqual(move.uci(), "d1d5")
+        score, move, _ = ai_minimax.iterative_deepening(chess.Board(self.DEFENDED_PAWN_FEN), 1)
+        self.assertNotEqual(move.uci(), "d1d5")
+        self.assertLess(score, naive_score)
+
+    def test_search_evaluator_skips_attack_terms(self):
+        board = chess.Board(MIDDLEGAME_FEN)
+        _, _, ctx = ai_minimax.iterative_deepening(board, 1)
+        self.assertFalse(ctx.evaluator.attack_terms)
+        self.assertEqual(ctx.evaluator.evaluate_tenths(), static_tenths(board))
+
+
+class TimeBudgetTests(SimpleTestCase):
+    def test_stops_at_deadline_with_last_completed_iteration(self):
+        result = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=20, time_ms=200)
+        self.assertLess(result["time_ms"], 1000)
+        self.assertGreaterEqual(result["depth"], 1)
+        self.assertLess(result["depth"], 20)
+        move = chess.Move.from_uci(result["from"] + result["to"])
+        self.assertIn(move, chess.Board(MIDDLEGAME_FEN).legal_moves)
+
+    def test_board_is_restored_after_timeout(self):
+        board = chess.Board(MIDDLEGAME_FEN)
+        _, _, ctx = ai_minimax.iterative_deepening(board, 20, time_ms=100)
+        self.assertEqual(board.fen(), MIDDLEGAME_FEN)
+        self.assertEqual(ctx.evaluator.static, static_tenths(board))
+
+    def test_depth_cap_is_respected(self):
+        result = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=2, time_ms=10_000)
+        self.assertEqual(result["depth"], 2)
+
+
+@override_settings(ENGINE_TIME_BUDGET_MS=300, ENGINE_MAX_DEPTH=3)
+class MinimaxEndpointTests(SimpleTestCase):
+    def setUp(self):
+        caches[move_cache.CACHE_ALIAS].clear()
+
+    def post(self, payload):
+        return self.client.post("/api/minimax-ai-move/", payload, content_type="application/json")
+
+    def test_reports_search_statistics(self):
+        response = self.post({"fen": MIDDLEGAME_FEN})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        for key in ("from", "to", "depth", "nodes", "time_ms"):
+            self.assertIn(key, data)
+        self.assertLessEqual(data["depth"], 3)
+
+    def test_client_limits_are_capped_by_settings(self):
+        data = self.post({"fen": MIDDLEGAME_FEN, "max_depth": 50, "time_ms": 60_000}).json()
+        self.assertLessEqual(data["depth"], 3)
+
+    def test_rejects_invalid_limits(self):
+        self.assertEqual(self.post({"fen": MIDDLEGAME_FEN, "time_ms": "vite"}).status_code, 400)
+        self.assertEqual(self.post({"fen": MIDDLEGAME_FEN, "max_depth": 0}).status_code, 400)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", ("engine",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, engine="alphabeta")
+        text = "\n".join(histogram.render())
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertIn('test_seconds_bucket{engine="alphabeta",le="0.1"} 2', text)
+        self.assertIn('test_seconds_bucket{engine="alphabeta",le="1"} 3', text)
+        self.assertIn('test_seconds_bucket{engine="alphabeta",le="+Inf"} 4', text)
+        self.assertIn('test_seconds_count{engine="alphabeta"} 4', text)
+        with self.assertRaises(ValueError):
+            histogram.observe(1.0)
+
+    def test_engine_requests_are_exposed_on_metrics_endpoint(self):
+        caches[move_cache.CACHE_ALIAS].clear()
+        searches = metrics.engine_latency.count(engine="alphabeta")
+        response = self.client.post("/api/minimax-ai-move/", {"fen": MIDDLEGAME_FEN},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.engine_latency.count(engine="alphabeta"), searches + 1)
+
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn('chess_engine_latency_seconds_count{engine="alphabeta"}', text)
+        self.assertIn('chess_engine_nodes_total{engine="alphabeta"}', text)
+        self.assertIn("chess_matchmaking_queue_depth", text)
+
+
+@override_settings(ENGINE_TIME_BUDGET_MS=300, ENGINE_MAX_DEPTH=3)
+class MoveCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches[move_cache.CACHE_ALIAS].clear()
+
+    def test_key_normalizes_position_and_includes_parameters(self):
+        key = move_cache.cache_key("alphabeta", MIDDLEGAME_FEN, depth=3, time_ms=300)
+        later = MIDDLEGAME_FEN.replace(" 0 7", " 4 12")  # mêmes pièces, autres compteurs
+        self.assertEqual(move_cache.cache_key("alphabeta", later, time_ms=300, depth=3), key)
+        self.assertNotEqual(move_cache.cache_key("alphabeta", MIDDLEGAME_FEN, depth=4, time_ms=300), key)
+        self.assertNotEqual(move_cache.cache_key("nn", MIDDLEGAME_FEN, depth=3, time_ms=300), key)
+        self.assertIsNone(move_cache.cache_key("alphabeta", "pas un fen"))
+
+    def test_repeated_position_skips_the_search(self):
+        hits = metrics.engine_cache.value(engine="alphabeta", result="hit")
+        first = self.client.post("/api/minimax-ai-move/", {"fen": MIDDLEGAME_FEN},
+                                 content_type="application/json").json()
+        with mock.patch("chessgame.views.get_engine_executor") as executor:
+            second = self.client.post("/api/minimax-ai-move/", {"fen": MIDDLEGAME_FEN},
+                                      content_type="application/json").json()
+        executor.assert_not_called()
+        self.assertNotIn("cached", first)
+        self.assertTrue(second.pop("cached"))
+        self.assertEqual(second, first)
+        self.assertEqual(metrics.engine_cache.value(engine="alphabeta", result="hit"), hits + 1)
+
+    async def test_book_moves_are_not_cached(self):
+        key = move_cache.cache_key("alphabeta", chess.STARTING_FEN, depth=3)
+        await move_cache.store_move(key, {"from": "e2", "to": "e4", "book": True})
+        self.assertIsNone(await move_cache.get_cached_move("alphabeta", key))
+        await move_cache.store_move(key, {"from": "e2", "to": "e4", "book": False})
+        self.assertEqual((await move_cache.get_cached_move("alphabeta", key))["to"], "e4")
+
+
+class EngineExecutorTests(SimpleTestCase):
+    def setUp(self):
+        self.executor = EngineExecutor(max_workers=1, max_pending=1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    async def test_runs_engine_in_worker_process(self):
+        result = await self.executor.run(ai_minimax.get_minimax_move, MIDDLEGAME_FEN, depth=2)
+        self.assertEqual(result["depth"], 2)
+        self.assertEqual(self.executor.pending, 0)
+
+    async def test_rejects_jobs_when_queue_is_full(self):
+        task = asyncio.create_task(self.executor.run(
+            ai_minimax.get_minimax_move, MIDDLEGAME_FEN, depth=20, time_ms=10_000, cancellable=True
+        ))
+        await asyncio.sleep(0)
+        with self.assertRaises(EngineBusy):
+            await self.executor.run(ai_minimax.get_minimax_move, MIDDLEGAME_FEN, depth=1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+    async def test_cancelled_search_stops_and_frees_its_slot(self):
+        task = asyncio.create_task(self.executor.run(
+            ai_minimax.get_minimax_move, MIDDLEGAME_FEN, depth=20, time_ms=10_000, cancellable=True
+        ))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        start = time.monotonic()
+        while self.executor.pending and time.monotonic() - start < 5:
+            await asyncio.sleep(0.05)
+        self.assertEqual(self.executor.pending, 0)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_busy_pool_returns_429(self):
+        busy = mock.Mock()
+        busy.run = mock.AsyncMock(side_effect=EngineBusy)
+        with mock.patch("chessgame.views.get_engine_executor", return_value=busy):
+            response = self.client.post(
+                "/api/minimax-ai-move/", {"fen": MIDDLEGAME_FEN}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 429)
+
+
+class PonderTests(SimpleTestCase):
+    def setUp(self):
+        self.executor = EngineExecutor(max_workers=1, max_pending=2)
+        self.ponder = PonderManager(max_active=1, time_ms=10_000, max_depth=20)
+        self.result = ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=2, use_book=False)
+        board = chess.Board(MIDDLEGAME_FEN)
+        for uci in self.result["pv"][:2]:
+            board.push_uci(uci)
+        self.expected_fen = board.fen()
+
+    def tearDown(self):
+        # Worker libéré avant la suite : aucun résultat ne doit arriver pendant d'autres tests
+        for game_id in ("partie", "autre"):
+            self.ponder.cancel(game_id)
+        start = time.monotonic()
+        while self.executor.pending and time.monotonic() - start < 5:
+            time.sleep(0.05)
+        self.executor.shutdown()
+
+    async def wait_for_free_worker(self):
+        start = time.monotonic()
+        while self.executor.pending and time.monotonic() - start < 5:
+            await asyncio.sleep(0.05)
+        return self.executor.pending
+
+    async def test_hit_returns_the_running_search_within_the_budget(self):
+        self.assertTrue(self.ponder.start(self.executor, "partie", MIDDLEGAME_FEN, self.result))
+        await asyncio.sleep(0.3)
+        start = time.monotonic()
+        move = await self.ponder.take("partie", self.expected_fen, time_ms=300)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertTrue(move["ponder"])
+        self.assertIn(chess.Move.from_uci(move["uci"]), chess.Board(self.expected_fen).legal_moves)
+        self.assertEqual(metrics.engine_requests.value(engine="alphabeta", source="ponder"), 0)
+        self.assertEqual(await self.wait_for_free_worker(), 0)
+
+    async def test_miss_stops_the_search(self):
+        misses = metrics.engine_ponder.value(result="miss")
+        self.ponder.start(self.executor, "partie", MIDDLEGAME_FEN, self.result)
+        self.assertIsNone(await self.ponder.take("partie", MIDDLEGAME_FEN, time_ms=300))
+        self.assertEqual(metrics.engine_ponder.value(result="miss"), misses + 1)
+        self.assertEqual(await self.wait_for_free_worker(), 0)
+        self.assertEqual(len(self.ponder), 0)
+
+    async def test_leaves_workers_free_for_real_requests(self):
+        self.assertTrue(self.ponder.start(self.executor, "partie", MIDDLEGAME_FEN, self.result))
+        # Plafond atteint : l'autre partie ne réfléchit pas
+        self.assertFalse(self.ponder.start(self.executor, "autre", MIDDLEGAME_FEN, self.result))
+        # Une analyse arrive sans worker libre : la réflexion lui cède le sien
+        start = time.monotonic()
+        with mock.patch("chessgame.analysis.get_engine_executor", return_value=self.executor):
+            line = await analysis.analyse_position(0, MIDDLEGAME_FEN, None, "alphabeta", 2, 1999)
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertEqual(line["type"], "result")
+        self.assertEqual(await self.wait_for_free_worker(), 0)
+
+    def test_game_over_or_missing_pv_is_not_pondered(self):
+        self.assertFalse(self.ponder.start(self.executor, "partie", MIDDLEGAME_FEN, {**self.result, "pv": []}))
+        self.assertFalse(self.ponder.start(self.executor, "partie", MIDDLEGAME_FEN, None))
+        self.assertEqual(self.executor.pending, 0)
+
+    def test_stop_endpoint_cancels_the_game_search(self):
+        with mock.patch("chessgame.views.get_ponder_manager", return_value=self.ponder):
+            self.ponder.start(self.executor, "partie", MIDDLEGAME_FEN, self.result)
+            response = self.client.post("/api/ponder-stop/", {"game_id": "partie"},
+                                        content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.ponder), 0)
+
+
+class EngineRegistryTests(SimpleTestCase):
+    def test_engines_are_resolved_by_name(self):
+        self.assertIs(get_engine("alphabeta"), get_engine("minimax"))
+        with self.assertRaises(ValueError):
+            get_engine("stockfish")
+        move = run_engine("random", MIDDLEGAME_FEN)
+        self.assertIn(move, chess.Board(MIDDLEGAME_FEN).legal_moves)
+        self.assertEqual(run_engine("minimax", MIDDLEGAME_FEN, depth=1, use_book=False)["depth"], 1)
+
+    def test_engine_is_imported_on_first_use_and_warmed_up(self):
+        engine = Engine("test", "chessgame.ai.ai_minimax", "get_minimax_move", warm_up="warm_up")
+        self.assertFalse(engine.loaded)
+        with mock.patch("chessgame.ai.ai_minimax.warm_up") as hook:
+            with mock.patch.dict("chessgame.engines.ENGINES", {"test": engine}):
+                timings = warm_up(["test"])
+        hook.assert_called_once_with()
+        self.assertTrue(engine.loaded)
+        self.assertEqual(list(timings), ["test"])
+
+    def test_web_worker_starts_without_torch(self):
+        code = (
+            "import sys; import AIChessMate.asgi, AIChessMate.urls; "
+            "print(sorted(name for name in ('torch', 'chessgame.ai.ai_nn', 'chessgame.ai.ai_minimax', "
+            "'chessgame.ai.ai_random') "
+            "if name in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "AIChessMate.settings", "CHESSGAME_LOG_LEVEL": "WARNING"},
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+
+class BatchedNNEvaluationTests(SimpleTestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = ai_nn.SimpleChessNN().eval()
+
+    def test_packed_encoding_round_trips_to_board_to_tensor(self):
+        rng = random.Random(7)
+        boards = [chess.Board(fen) for fen in [chess.STARTING_FEN, MIDDLEGAME_FEN] + SPECIAL_MOVES_FENS]
+        board = chess.Board()
+        for _ in range(200):
+            if board.is_game_over():
+                board = chess.Board()
+            board.push(rng.choice(list(board.legal_moves)))
+            boards.append(board.copy(stack=False))
+
+        packed = np.stack([pack_board(board) for board in boards])
+        self.assertEqual(packed.dtype, np.uint64)
+        expected = torch.stack([ai_nn.board_to_tensor(board) for board in boards]).numpy()
+        np.testing.assert_array_equal(unpack_batch(packed), expected)
+
+    def test_leaf_batch_evaluates_transpositions_once(self):
+        batch = ai_nn.LeafBatch()
+        board = chess.Board()
+        first = batch.add(board)
+        for uci in ("g1f3", "g8f6", "f3g1", "f6g8"):
+            board.push_uci(uci)
+        self.assertEqual(batch.add(board), first)
+        self.assertEqual(batch.size, 1)
+
+    def test_batched_search_matches_per_leaf_search(self):
+        batch = ai_nn.LeafBatch(capacity=8)  # oblige le tampon à grandir
+        for fen in (chess.STARTING_FEN, MIDDLEGAME_FEN):
+            board = chess.Board(fen)
+            expected, _ = ai_nn.nn_minimax(board, 2, self.model, board.turn)
+            score, move = ai_nn.nn_minimax_batched(board, 2, self.model, board.turn, batch)
+            self.assertAlmostEqual(score, expected, places=5)
+            self.assertIn(move, board.legal_moves)
+            self.assertEqual(board.fen(), fen)
+
+    def test_self_play_uses_batched_search(self):
+        result = ai_nn.simulate_self_play_game(self.model, depth=1, max_moves=6, batched=True)
+        self.assertIn(result, ("1-0", "0-1", "1/2-1/2", "*"))
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "model.pt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def save_weights(self, seed, mtime):
+        torch.manual_seed(seed)
+        torch.save(ai_nn.SimpleChessNN().state_dict(), self.path)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_serves_untrained_model_without_weights_file(self):
+        loaded = ModelRegistry(self.path).get()
+        self.assertEqual(loaded.version, UNTRAINED_VERSION)
+        self.assertFalse(loaded.model.training)
+
+    def test_loads_weights_once(self):
+        self.save_weights(1, 1_000_000)
+        registry = ModelRegistry(self.path)
+        self.assertIs(registry.get(), registry.get())
+
+    def test_hot_reload_keeps_in_flight_model_usable(self):
+        self.save_weights(1, 1_000_000)
+        registry = ModelRegistry(self.path, check_interval=0)
+        in_flight = registry.get()
+        self.save_weights(2, 2_000_000)
+        reloaded = registry.get()
+        self.assertNotEqual(reloaded.version, in_flight.version)
+        board = chess.Board()
+        self.assertIsNotNone(ai_nn.choose_move(board, in_flight.model))
+        self.assertIsNotNone(ai_nn.choose_move(board, reloaded.model))
+
+    def test_nn_move_has_minimax_response_shape(self):
+        result = get_nn_ai_move(chess.STARTING_FEN, depth=1)
+        for key in ("from", "to", "depth", "nodes", "time_ms", "model"):
+            self.assertIn(key, result)
+        self.assertEqual(result["nodes"], 20)
+
+    def test_nn_endpoint(self):
+        response = self.client.post(
+            "/api/nn-ai-move/", {"fen": chess.STARTING_FEN}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("from", response.json())
+
+
+class SelfPlayPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out_dir = self.tmp.name
+        self.options = {"games_per_shard": 1, "max_moves": 10, "opening_plies": 2,
+                        "model_path": os.path.join(self.out_dir, "absent.pt")}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_memory_mappable_shards_and_manifest(self):
+        manifest, totals = selfplay.generate(self.out_dir, num_shards=2, **self.options)
+        self.assertEqual(sorted(manifest["shards"]), ["shard_00000", "shard_00001"])
+        self.assertEqual(totals["games"], 2)
+
+        x = np.load(os.path.join(self.out_dir, "shard_00000.x.npy"), mmap_mode="r")
+        y = np.load(os.path.join(self.out_dir, "shard_00000.y.npy"), mmap_mode="r")
+        self.assertEqual(x.dtype, np.uint64)
+        self.assertEqual(x.shape, (10, 13))
+        self.assertEqual(len(y), 10)
+        # La position initiale, blancs au trait, est la première de chaque partie
+        np.testing.assert_array_equal(unpack_batch(x[:1])[0], ai_nn.board_to_tensor(chess.Board()).numpy())
+        self.assertEqual(y[0]["turn"], 1)
+
+    def test_resumes_from_manifest(self):
+        selfplay.generate(self.out_dir, num_shards=1, **self.options)
+        manifest, totals = selfplay.generate(self.out_dir, num_shards=2, **self.options)
+        self.assertEqual(totals["shards"], 1)
+        self.assertEqual(len(manifest["shards"]), 2)
+
+    def test_refuses_to_mix_configurations(self):
+        selfplay.generate(self.out_dir, num_shards=1, **self.options)
+        with self.assertRaises(ValueError):
+            selfplay.generate(self.out_dir, num_shards=1, depth=2, **self.options)
+
+
+class TrainingTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp.name
+        selfplay.generate(self.data_dir, num_shards=2, games_per_shard=1, max_moves=12,
+                          model_path=os.path.join(self.data_dir, "absent.pt"))
+        self.weights = os.path.join(self.data_dir, "model.pt")
+        self.checkpoint = os.path.join(self.data_dir, "model.ckpt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dataset_reads_every_shard(self):
+        dataset = training.ShardDataset(self.data_dir)
+        self.assertEqual(len(dataset), 24)
+        position, target = dataset[12]
+        self.assertEqual(position.shape, (773,))
+        self.assertEqual(position.dtype, torch.float32)
+        self.assertEqual(target.shape, (1,))
+
+        positions, targets = dataset.__getitems__([23, 0, 12])
+        self.assertEqual(positions.shape, (3, 773))
+        torch.testing.assert_close(positions[2], position)
+        torch.testing.assert_close(targets[2], target)
+
+    def test_dataset_rejects_unpacked_shards(self):
+        path = os.path.join(self.data_dir, selfplay.MANIFEST_NAME)
+        with open(path) as file:
+            manifest = json.load(file)
+        del manifest["encoding"]  # manifeste de la version 1 : plans uint8
+        with open(path, "w") as file:
+            json.dump(manifest, file)
+        with self.assertRaises(ValueError):
+            training.ShardDataset(self.data_dir)
+
+    def test_trained_weights_are_served_by_registry(self):
+        _, history = training.train(self.data_dir, self.weights, epochs=1, batch_size=8, workers=0)
+        self.assertEqual(history[0]["samples"], 24)
+        self.assertGreater(history[0]["samples_per_s"], 0)
+        self.assertNotEqual(ModelRegistry(self.weights).get().version, UNTRAINED_VERSION)
+
+    def test_resumes_from_checkpoint(self):
+        training.train(self.data_dir, self.weights, epochs=1, workers=0, checkpoint_path=self.checkpoint)
+        _, history = training.train(self.data_dir, self.weights, epochs=2, workers=0,
+                                    checkpoint_path=self.checkpoint)
+        self.assertEqual([stats["epoch"] for stats in history], [2])
+
+    def test_interrupted_epoch_resumes_after_the_seen_batches(self):
+        calls, mse_loss = [], torch.nn.functional.mse_loss
+
+        def interrupted(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return mse_loss(*args, **kwargs)
+
+        with mock.patch("chessgame.ai.training.f.mse_loss", side_effect=interrupted), \
+                self.assertRaises(KeyboardInterrupt):
+            training.train(self.data_dir, self.weights, epochs=1, batch_size=8, workers=0,
+                           checkpoint_path=self.checkpoint, checkpoint_every=1)
+        _, history = training.train(self.data_dir, self.weights, epochs=1, batch_size=8, workers=0,
+                                    checkpoint_path=self.checkpoint)
+        # Deux lots sur trois déjà appris : seul le dernier reste à voir
+        self.assertEqual(history[0]["samples"], 8)
+
+
+@override_settings(ENGINE_TIME_BUDGET_MS=300, ENGINE_MAX_DEPTH=2, ANALYSIS_MAX_POSITIONS=10)
+class AnalysisTests(SimpleTestCase):
+    PGN = "1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 *"
+
+    def setUp(self):
+        caches[move_cache.CACHE_ALIAS].clear()
+
+    def test_positions_from_pgn_keep_the_played_moves(self):
+        positions = analysis.parse_positions({"pgn": self.PGN}, 10)
+        self.assertEqual(len(positions), 6)
+        self.assertEqual(positions[0], (chess.STARTING_FEN, "e2e4"))
+        self.assertEqual(positions[-1][1], "g8f6")
+
+    def test_invalid_requests_are_rejected(self):
+        for data in ({}, {"fens": []}, {"fens": ["pas un fen"]}, {"fens": [chess.STARTING_FEN] * 20}):
+            with self.assertRaises(ValueError):
+                analysis.parse_positions(data, 10)
+        with self.assertRaises(ValueError), self.assertLogs("chess.pgn", "ERROR"):
+            analysis.parse_positions({"pgn": "1. e4 e4 *"}, 10)
+        response = self.client.post("/api/analysis/", {"fens": [chess.STARTING_FEN], "engine": "stockfish"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    async def test_results_are_streamed_as_ndjson(self):
+        fens = [MATE_IN_ONE_FEN, MIDDLEGAME_FEN]
+        response = await self.async_client.post("/api/analysis/", {"fens": fens},
+                                                content_type="application/json")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(chunk) async for chunk in response.streaming_content]
+        self.assertEqual(lines[-1]["type"], "done")
+        results = {line["index"]: line for line in lines[:-1]}
+        self.assertEqual(sorted(results), [0, 1])
+        self.assertEqual(results[0]["best"], "a1a8")
+        self.assertGreater(results[0]["score"], ai_minimax.MATE_THRESHOLD)
+        for line in results.values():
+            self.assertEqual(line["type"], "result")
+            self.assertLessEqual(line["depth"], 2)
+
+    async def test_failed_position_does_not_stop_the_stream(self):
+        async def run_engine(engine, fen, depth, time_ms):
+            if fen == MIDDLEGAME_FEN:
+                raise RuntimeError("worker perdu")
+            return None
+
+        with mock.patch("chessgame.analysis._run_engine", side_effect=run_engine), \
+                self.assertLogs("chessgame.analysis", "ERROR"):
+            lines = [line async for line in analysis.analyse(
+                [(MIDDLEGAME_FEN, None), (chess.STARTING_FEN, None)], depth=1, time_ms=100)]
+        results = {line["index"]: line["type"] for line in lines[:-1]}
+        self.assertEqual(results, {0: "error", 1: "result"})
+        self.assertEqual(lines[-1]["type"], "done")
+
+    async def test_game_is_analysed_over_websocket(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), "/ws/analysis/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.send_json_to({"type": "analyse", "pgn": "1. e4 e5 *"})
+        lines = [await communicator.receive_json_from(timeout=30) for _ in range(3)]
+        await communicator.disconnect()
+        self.assertEqual(lines[-1], {**lines[-1], "type": "done", "positions": 2})
+        played = sorted(line["played"] for line in lines[:-1])
+        self.assertEqual(played, ["e2e4", "e7e5"])
+
+
+# Parties non enregistrées : pas de base de données dans ces tests
+@override_settings(GAME_SAVE_INTERVAL_MS=0)
+class GameRoomsTests(SimpleTestCase):
+    async def join(self, game_id, query=""):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chess/{game_id}/{query}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        message = await communicator.receive_json_from()
+        return communicator, message["color"]
+
+    async def refused(self, game_id, query=""):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chess/{game_id}/{query}")
+        connected, _ = await communicator.connect()
+        return not connected
+
+    async def test_moves_only_reach_their_own_game(self):
+        white_a, color_a = await self.join("game_a")
+        black_a, color_b = await self.join("game_a")
+        spectator_a, role = await self.join("game_a", "?role=spectator")
+        white_b, _ = await self.join("game_b")
+        self.assertEqual((color_a, color_b, role), ("w", "b", SPECTATOR))
+
+        await white_a.send_json_to({"type": "move", "uci": "e2e4"})
+        for communicator in (white_a, black_a, spectator_a):
+            message = await communicator.receive_json_from()
+            self.assertEqual((message["uci"], message["seq"]), ("e2e4", 1))
+        self.assertTrue(await white_b.receive_nothing())
+        games = get_game_registry()
+        self.assertEqual((await games.get("game_a")).board.peek(), chess.Move.from_uci("e2e4"))
+
+        for communicator in (white_a, black_a, spectator_a, white_b):
+            await communicator.disconnect()
+        self.assertIsNone(await games.get("game_a"))
+        self.assertIsNone(await games.get("game_b"))
+
+    async def test_matchmaking_ticket_gives_the_color(self):
+        # Le noir se connecte le premier : il garde quand même les noirs
+        black, color_b = await self.join("game_seat", f"?ticket={seat_ticket('game_seat', 'b')}")
+        white, color_w = await self.join("game_seat", f"?ticket={seat_ticket('game_seat', 'w')}")
+        self.assertEqual((color_b, color_w), ("b", "w"))
+        # Ticket déjà utilisé, d'une autre partie ou falsifié, troisième joueur sans rôle : refusés
+        self.assertTrue(await self.refused("game_seat", f"?ticket={seat_ticket('game_seat', 'w')}"))
+        self.assertTrue(await self.refused("game_other", f"?ticket={seat_ticket('game_seat', 'w')}"))
+        self.assertTrue(await self.refused("game_new", "?ticket=w"))
+        self.assertTrue(await self.refused("game_seat"))
+        self.assertIsNone(await get_game_registry().get("game_other"))
+        for communicator in (black, white):
+            await communicator.disconnect()
+
+    def test_clock_is_charged_to_the_side_that_moved(self):
+        game = GameState("clock", clock_ms=60_000)
+        game.join("white")
+        game.join("black")
+        # Horloge propre au module : les autres threads gardent le vrai time.monotonic
+        with mock.patch("chessgame.games.time") as clock:
+            clock.monotonic.side_effect = [0.0, 2.5]
+            game.play("e2e4", "w")
+            game.play("e7e5", "b")
+        self.assertEqual(game.clocks, {"w": 60_000, "b": 57_500})
+
+    def test_server_rejects_illegal_and_out_of_turn_moves(self):
+        game = GameState("validation")
+        self.assertIsNone(game.play("e2e5", "w"))
+        self.assertIsNone(game.play("e7e5", "w"))
+        self.assertIsNone(game.play("e2e4", "b"))
+        self.assertIsNone(game.play("not-a-move", "w"))
+        self.assertEqual(game.seq, 0)
+
+        for uci in ("g2g4", "h7h5", "g4h5", "g7g6", "h5g6", "a7a6", "g6g7", "a6a5"):
+            game.play(uci)
+        # Promotion sans pièce précisée : en dame, comme côté client
+        self.assertEqual(game.play("g7h8", "w"), chess.Move.from_uci("g7h8q"))
+        self.assertEqual(game.moves_since(7), ["a6a5", "g7h8q"])
+
+    async def test_rejected_move_is_not_broadcast_and_clients_resync(self):
+        white, _ = await self.join("game_sync")
+        black, _ = await self.join("game_sync")
+        spectator, _ = await self.join("game_sync", "?role=spectator")
+
+        await black.send_json_to({"type": "move", "uci": "e7e5"})
+        self.assertEqual(await black.receive_json_from(), {"type": "illegal", "uci": "e7e5", "seq": 0})
+        await spectator.send_json_to({"type": "move", "uci": "e2e4"})
+        self.assertEqual((await spectator.receive_json_from())["type"], "illegal")
+        self.assertTrue(await white.receive_nothing())
+
+        for player, uci in ((white, "e2e4"), (black, "e7e5"), (white, "g1f3")):
+            await player.send_json_to({"type": "move", "uci": uci})
+            for communicator in (white, black, spectator):
+                await communicator.receive_json_from()
+
+        await spectator.send_json_to({"type": "join", "since": 1})
+        self.assertEqual(await spectator.receive_json_from(),
+                         {"type": "sync", "since": 1, "moves": ["e7e5", "g1f3"], "seq": 3})
+        # Un client en avance sur le serveur repart de zéro
+        await spectator.send_json_to({"type": "sync", "since": 9})
+        self.assertEqual((await spectator.receive_json_from())["moves"], ["e2e4", "e7e5", "g1f3"])
+
+        for communicator in (white, black, spectator):
+            await communicator.disconnect()
+
+
+class MatchmakingTests(SimpleTestCase):
+    def setUp(self):
+        self.service = MatchmakingService(InMemoryQueueBackend())
+
+    async def test_pairs_close_ratings_oldest_first(self):
+        await self.service.enqueue(Ticket("a", 1500, enqueued_at=0.0))
+        await self.service.enqueue(Ticket("b", 1210, enqueued_at=0.1))
+        await self.service.enqueue(Ticket("c", 1250, enqueued_at=0.2))
+        await self.service.enqueue(Ticket("d", 1550, enqueued_at=0.3))
+        pairs = [(white.ticket_id, black.ticket_id) for white, black in await self.service.tick(now=0.3)]
+        self.assertEqual(pairs, [("a", "d"), ("b", "c")])
+        self.assertEqual(self.service.stats()["queue_depth"], 0)
+
+    async def test_window_widens_with_waiting_time(self):
+        await self.service.enqueue(Ticket("a", 1200, enqueued_at=0))
+        await self.service.enqueue(Ticket("b", 1600, enqueued_at=0))
+        await self.service.enqueue(Ticket("c", 1200, "blitz", enqueued_at=0))
+        self.assertEqual(await self.service.tick(now=1), [])
+        pairs = await self.service.tick(now=7)
+        self.assertEqual([(white.ticket_id, black.ticket_id) for white, black in pairs], [("a", "b")])
+
+        stats = self.service.stats()
+        self.assertEqual((stats["queue_depth"], stats["matches"]), (1, 1))
+        self.assertEqual(stats["time_to_match_ms"]["p50"], 7000)
+
+    async def test_sqlite_queue_is_shared_between_workers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "queue.sqlite3")
+            first = MatchmakingService(SQLiteQueueBackend(path))
+            second = MatchmakingService(SQLiteQueueBackend(path))
+            self.assertTrue(await first.enqueue(Ticket("a", 1200, enqueued_at=0)))
+            self.assertFalse(await second.enqueue(Ticket("a", 1200, enqueued_at=0)))
+            await second.enqueue(Ticket("b", 1220, enqueued_at=1))
+            await second.enqueue(Ticket("c", 1240, enqueued_at=2))
+
+            self.assertEqual(len(await first.tick(now=2)), 1)
+            self.assertEqual(await second.tick(now=2), [])
+            self.assertTrue(await second.cancel("c"))
+            self.assertEqual(second.stats()["queue_depth"], 0)
+            # Le premier worker l'apprend à sa prochaine relecture complète
+            first.backend.resync_interval = 0
+            await first.tick(now=2)
+            self.assertEqual(first.stats()["queue_depth"], 0)
+
+    async def test_sqlite_queue_only_claims_tickets_still_waiting(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "queue.sqlite3")
+            first = MatchmakingService(SQLiteQueueBackend(path))
+            second = MatchmakingService(SQLiteQueueBackend(path))
+            await first.enqueue(Ticket("a", 1200, enqueued_at=0))
+            await first.tick(now=0)
+            # "a" se déconnecte sur l'autre worker, que le premier n'a pas encore relu
+            await second.cancel("a")
+            await second.enqueue(Ticket("b", 1200, enqueued_at=1))
+            self.assertEqual(await first.tick(now=1), [])
+            await first.enqueue(Ticket("c", 1200, enqueued_at=2))
+            pairs = await first.tick(now=2)
+            self.assertEqual([(white.ticket_id, black.ticket_id) for white, black in pairs], [("b", "c")])
+
+    async def test_consumers_receive_the_same_game(self):
+        application = URLRouter(websocket_urlpatterns)
+        players = [WebsocketCommunicator(application, "/ws/matchmaking/") for _ in range(2)]
+        for player in players:
+            await player.connect()
+            await player.send_json_to({"action": "search"})
+            self.assertEqual((await player.receive_json_from())["action"], "waiting")
+
+        found = [await player.receive_json_from(timeout=2) for player in players]
+        self.assertEqual({message["action"] for message in found}, {"match_found"})
+        self.assertEqual(found[0]["game_id"], found[1]["game_id"])
+        self.assertEqual({message["role"] for message in found}, {"white", "black"})
+        for message in found:
+            self.assertEqual(seat_color(message["ticket"], message["game_id"]), message["role"][0])
+        for player in players:
+            await player.disconnect()
+
+
+BOOK_PGN = """[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O Nf6 1-0
+
+[Result "1/2-1/2"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O Nf6 1/2-1/2
+
+[Result "0-1"]
+
+1. d4 d5 2. c4 0-1
+"""
+
+
+class GameRecordsTests(TransactionTestCase):
+    def setUp(self):
+        self.writer = GameWriter(batch_size=100, interval=60)
+        patcher = mock.patch("chessgame.game_records._writer", self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def join(self, path):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        await communicator.connect()
+        await communicator.receive_json_from()  # assign_color
+        return communicator
+
+    def test_moves_are_packed_in_two_bytes(self):
+        moves = [chess.Move.from_uci(uci) for uci in ("e2e4", "g8f6", "a7a8q", "h2h1n")]
+        data = encode_moves(moves)
+        self.assertEqual(len(data), 2 * len(moves))
+        self.assertEqual(decode_moves(data), moves)
+
+    async def test_finished_game_is_written_in_a_batch(self):
+        white, black = await self.join("/ws/chess/records/"), await self.join("/ws/chess/records/")
+        for player, uci in ((white, "f2f3"), (black, "e7e5"), (white, "g2g4"), (black, "d8h4")):
+            await player.send_json_to({"type": "move", "uci": uci})
+            for communicator in (white, black):
+                await communicator.receive_json_from()
+        # Partie finie : en attente, rien n'a encore été écrit
+        self.assertEqual(len(self.writer), 1)
+        self.assertEqual(await Game.objects.acount(), 0)
+        await white.disconnect()
+        await black.disconnect()
+
+        self.assertEqual(await self.writer.flush(), 1)
+        game = await Game.objects.aget(game_id="records")
+        self.assertEqual((game.mode, game.result, game.termination, game.ply_count),
+                         (Game.MODE_ONLINE, "0-1", "checkmate", 4))
+        self.assertEqual([move.uci() for move in game.move_list()], ["f2f3", "e7e5", "g2g4", "d8h4"])
+        self.assertTrue(game.board().is_checkmate())
+        self.assertTrue(game.pgn().endswith("1. f3 e5 2. g4 Qh4# 0-1"))
+
+    async def test_abandoned_bot_game_keeps_engine_moves(self):
+        player = await self.join("/ws/chess/vs-bot/")
+        await player.send_json_to({"type": "move", "uci": "e2e4"})
+        await player.receive_json_from()
+        reply = await player.receive_json_from(timeout=10)
+        await player.disconnect()
+        await self.writer.flush()
+
+        game = await Game.objects.aget(mode=Game.MODE_BOT)
+        self.assertEqual((game.result, game.termination, game.engine), ("*", "abandoned", "random"))
+        engine_moves = [move async for move in game.engine_moves.all()]
+        self.assertEqual([(move.ply, move.uci, move.engine) for move in engine_moves], [(1, reply["uci"], "random")])
+
+    def test_batch_costs_the_same_queries_whatever_its_size(self):
+        def records(count):
+            result = []
+            for index in range(count):
+                game = GameState(f"batch_{index}")
+                for uci in ("e2e4", "e7e5", "g1f3"):
+                    game.play(uci)
+                game.engine_moves.append((1, chess.Move.from_uci("e7e5"), "random", 1.0))
+                result.append(game_record(game, Game.MODE_BOT, "random"))
+            return result
+
+        with CaptureQueriesContext(connection) as small:
+            GameWriter._write(records(2))
+        with CaptureQueriesContext(connection) as large:
+            GameWriter._write(records(50))
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(Game.objects.count(), 52)
+        self.assertEqual(DbMove.objects.count(), 52)
+
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "channels.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def test_messages_reach_channels_of_other_workers(self):
+        first, second = SQLiteChannelLayer(self.path), SQLiteChannelLayer(self.path)
+        try:
+            channel_a, channel_b = await first.new_channel(), await second.new_channel()
+            await first.group_add("game_a", channel_a)
+            await second.group_add("game_a", channel_b)
+
+            await second.group_send("game_a", {"type": "broadcast_move", "uci": "e2e4"})
+            for layer, channel in ((first, channel_a), (second, channel_b)):
+                message = await asyncio.wait_for(layer.receive(channel), 2)
+                self.assertEqual(message["uci"], "e2e4")
+
+            await first.group_discard("game_a", channel_a)
+            await second.group_send("game_a", {"type": "broadcast_move", "uci": "e7e5"})
+            self.assertEqual((await asyncio.wait_for(second.receive(channel_b), 2))["uci"], "e7e5")
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(first.receive(channel_a), 0.2)
+
+            await first.send(channel_b, {"type": "match_found", "game_id": "g"})
+            self.assertEqual((await asyncio.wait_for(second.receive(channel_b), 2))["game_id"], "g")
+        finally:
+            await first.close()
+            await second.close()
+
+    async def test_full_and_expired_channels(self):
+        first = SQLiteChannelLayer(self.path, expiry=0.2, capacity=2)
+        second = SQLiteChannelLayer(self.path)
+        try:
+            # Canal d'un worker qui ne lit plus : file pleine, puis messages expirés
+            channel = await second.new_channel()
+            await second.group_add("game_a", channel)
+            await first.send(channel, {"type": "ping"})
+            await first.send(channel, {"type": "ping"})
+            with self.assertRaises(ChannelFull):
+                await first.send(channel, {"type": "ping"})
+
+            await asyncio.sleep(0.3)
+            await first._run(first._cleanup, [])
+            count = await first._run(lambda connection: connection.execute(
+                "SELECT (SELECT COUNT(*) FROM channel_messages) + (SELECT COUNT(*) FROM channel_groups)"
+            ).fetchone()[0])
+            self.assertEqual(count, 0)
+        finally:
+            await first.close()
+            await second.close()
+
+    async def test_game_room_over_sqlite_layer(self):
+        layers = {"default": {"BACKEND": "chessgame.channel_layer.SQLiteChannelLayer", "CONFIG": {"path": self.path}}}
+        # Un registre de parties par joueur : comme deux workers Daphne servant la même partie
+        states = os.path.join(self.tmp.name, "games.sqlite3")
+        registries = [SQLiteGameRegistry(states), SQLiteGameRegistry(states)]
+        with override_settings(CHANNEL_LAYERS=layers, GAME_SAVE_INTERVAL_MS=0), \
+                mock.patch("chessgame.consumers.get_game_registry", side_effect=registries):
+            application = URLRouter(websocket_urlpatterns)
+            players = [WebsocketCommunicator(application, "/ws/chess/sqlite_room/") for _ in range(2)]
+            colors = []
+            for player in players:
+                await player.connect()
+                colors.append((await player.receive_json_from())["color"])
+            self.assertEqual(colors, ["w", "b"])
+            # Le second worker valide le coup contre le plateau du premier
+            await players[1].send_json_to({"type": "move", "uci": "e7e5"})
+            self.assertEqual((await players[1].receive_json_from())["type"], "illegal")
+            await players[0].send_json_to({"type": "move", "uci": "e2e4"})
+            for player in players:
+                self.assertEqual((await player.receive_json_from())["uci"], "e2e4")
+            await players[1].send_json_to({"type": "move", "uci": "e7e5"})
+            for player in players:
+                self.assertEqual((await player.receive_json_from())["seq"], 2)
+            for player in players:
+                await player.disconnect()
+            await get_channel_layer().close()
+        self.assertIsNone(await registries[0].get("sqlite_room"))
+
+    async def test_shared_game_state_survives_the_worker_cache(self):
+        path = os.path.join(self.tmp.name, "games.sqlite3")
+        first, second = SQLiteGameRegistry(path), SQLiteGameRegistry(path)
+        await first.join("partie", "canal_a", clock_ms=60_000, user_id=7)
+        await second.join("partie", "canal_b")
+        for registry, uci, color in ((first, "e2e4", "w"), (second, "e7e5", "b"), (first, "g1f3", "w")):
+            _, move = await registry.play("partie", uci, color)
+            self.assertIsNotNone(move)
+        _, move = await second.play("partie", "b8c6", None, engine="random", time_ms=1.5)
+        self.assertIsNotNone(move)  # coup du serveur : sans camp, mais au trait
+
+        game = await second.get("partie")
+        self.assertEqual(game.moves_since(0), ["e2e4", "e7e5", "g1f3", "b8c6"])
+        self.assertEqual((game.users["w"], game.players), (7, {"canal_a": "w", "canal_b": "b"}))
+        self.assertEqual([(ply, engine) for ply, _, engine, _ in game.engine_moves], [(3, "random")])
+        self.assertTrue(await first.mark_saved("partie"))
+        self.assertFalse(await second.mark_saved("partie"))
+
+    async def test_rejected_move_leaves_the_shared_game_untouched(self):
+        registry = SQLiteGameRegistry(os.path.join(self.tmp.name, "games.sqlite3"))
+        await registry.join("partie", "canal_a")
+        await registry.play("partie", "e2e4", "w")
+
+        def version():
+            return registry._connection.execute("SELECT version FROM game_states").fetchone()[0]
+
+        before = version()
+        for uci, color in (("e7e5", "w"), ("e2e5", "b"), ("pas un coup", "b")):
+            game, move = await registry.play("partie", uci, color)
+            self.assertIsNone(move)
+            self.assertEqual(game.seq, 1)
+        self.assertEqual(version(), before)
+
+
+class OpeningBookTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        pgn_path = os.path.join(self.tmp.name, "games.pgn")
+        with open(pgn_path, "w") as f:
+            f.write(BOOK_PGN)
+        self.path = os.path.join(self.tmp.name, "book.bin")
+        self.games, self.entries = build_book([pgn_path], self.path, max_ply=8, min_games=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_builds_a_sorted_polyglot_file(self):
+        self.assertEqual((self.games, self.entries), (3, 8))
+        with chess.polyglot.open_reader(self.path) as reader:
+            keys = [entry.key for entry in reader]
+            self.assertEqual(keys, sorted(keys))
+            # Lisible par n'importe quel lecteur Polyglot
+            self.assertEqual(reader.find(chess.Board()).move, chess.Move.from_uci("e2e4"))
+
+    def test_lookup_weights_and_castling(self):
+        book = OpeningBook(self.path)
+        board = chess.Board()
+        # 1 victoire + 1 nulle ; d4 (une seule partie) est écarté par min_games
+        self.assertEqual(book.entries(board), [(chess.Move.from_uci("e2e4"), 3)])
+        for uci in ("e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "f8c5"):
+            board.push_uci(uci)
+        self.assertEqual(book.move(board), chess.Move.from_uci("e1g1"))
+        board.push_uci("e1g1")
+        board.push_uci("h7h6")
+        self.assertIsNone(book.move(board))
+        book.close()
+
+    def test_engines_play_book_moves_without_searching(self):
+        with override_settings(OPENING_BOOK_PATH=self.path):
+            result = ai_minimax.get_minimax_move(chess.STARTING_FEN, depth=2)
+            self.assertEqual((result["from"], result["to"], result["book"]), ("e2", "e4", True))
+            self.assertEqual(result["nodes"], 0)
+            self.assertTrue(get_nn_ai_move(chess.STARTING_FEN)["book"])
+            self.assertFalse(ai_minimax.get_minimax_move(MIDDLEGAME_FEN, depth=2)["book"])
+            self.assertFalse(ai_minimax.get_minimax_move(chess.STARTING_FEN, depth=1, use_book=False)["book"])
+
+
+class LoneKingTablebase:
+    """Tables factices (aucun fichier Syzygy ici) : le camp réduit à son roi perd."""
+
+    wdl = {"KQvK": None}
+
+    def __init__(self):
+        self.calls = 0
+
+    def probe_wdl(self, board):
+        self.calls += 1
+        if chess.popcount(board.occupied_co[board.turn]) > 1:
+            return 2
+        return -2
+
+    def probe_dtz(self, board):
+        self.calls += 1
+        return 5 if self.probe_wdl(board) > 0 else -5
+
+
+class TablebaseTests(SimpleTestCase):
+    def test_degrades_without_table_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(get_tablebase(tmp))
+        self.assertIsNone(get_tablebase(os.path.join(tempfile.gettempdir(), "no-such-syzygy-dir")))
+
+    def test_probes_are_cached(self):
+        tablebase = LoneKingTablebase()
+        prober = TablebaseProber(tablebase, max_pieces=3, cache_size=2)
+        boards = [chess.Board(fen) for fen in ("8/8/8/4k3/8/8/3QK3/8 w - - 0 1",
+                                               "8/8/8/4k3/8/8/3QK3/8 b - - 0 1",
+                                               "8/8/8/4k3/8/3Q4/4K3/8 b - - 0 1")]
+        self.assertEqual(prober.probe_wdl(boards[0]), 2)
+        self.assertEqual(prober.probe_wdl(boards[0]), 2)
+        self.assertEqual((tablebase.calls, prober.hits), (1, 1))
+        prober.probe_wdl(boards[1])
+        prober.probe_wdl(boards[2])
+        prober.probe_wdl(boards[0])  # évincée par les deux autres
+        self.assertEqual(tablebase.calls, 4)
+        self.assertFalse(prober.covers(chess.Board()))
+
+    def test_root_probe_prefers_mate_and_search_cuts_subtrees(self):
+        prober = TablebaseProber(LoneKingTablebase(), max_pieces=3)
+        board = chess.Board("7k/8/6K1/8/8/8/8/Q7 w - - 0 1")
+        self.assertEqual(prober.root_move(board), chess.Move.from_uci("a1a8"))
+
+        board = chess.Board("8/8/8/4k3/8/8/3QK3/8 w - - 0 1")
+        plain = ai_minimax.iterative_deepening(board, 3)[2]
+        score, move, ctx = ai_minimax.iterative_deepening(board, 3, tablebase=prober)
+        self.assertEqual(score, TB_WIN_SCORE)
+        self.assertGreater(ctx.stats.tb_hits, 0)
+        self.assertLess(ctx.stats.nodes, plain.stats.nodes)
+        self.assertEqual(board.fen(), "8/8/8/4k3/8/8/3QK3/8 w - - 0 1")
+
+    def test_engines_answer_from_tables_without_searching(self):
+        prober = TablebaseProber(LoneKingTablebase(), max_pieces=3)
+        with mock.patch("chessgame.ai.ai_minimax.get_tablebase", return_value=prober):
+            result = ai_minimax.get_minimax_move("7k/8/6K1/8/8/8/8/Q7 w - - 0 1", depth=3)
+        self.assertEqual((result["from"], result["to"], result["tablebase"]), ("a1", "a8", True))
+        self.assertEqual(result["nodes"], 0)
+
+
+class EngineBenchmarkTests(SimpleTestCase):
+    def run_small_suite(self):
+        return benchmark.run_benchmark(["minimax", "random"], depth=2,
+                                       names=["back_rank_mate", "kp_vs_k"])
+
+    def test_report_has_nodes_speed_and_solve_rate(self):
+        report = self.run_small_suite()
+        minimax = report["engines"]["minimax"]
+        self.assertEqual(minimax["summary"]["solve_rate"], 1.0)
+        self.assertGreater(minimax["summary"]["nps"], 0)
+        for result in minimax["positions"]:
+            self.assertEqual(len(result["time_to_depth_ms"]), result["depth"])
+        # Nombre de nœuds reproductible : c'est ce qui rend la comparaison fiable
+        self.assertEqual(self.run_small_suite()["engines"]["minimax"]["summary"]["nodes"],
+                         minimax["summary"]["nodes"])
+        self.assertEqual(benchmark.compare(report, report), [])
+
+    def test_regressions_fail_the_command(self):
+        report = self.run_small_suite()
+        baseline = json.loads(json.dumps(report))
+        for result in baseline["engines"]["minimax"]["positions"]:
+            result["nodes"] //= 2
+        for result in baseline["engines"]["random"]["positions"]:
+            if "solved" in result:
+                result["solved"] = True
+        problems = benchmark.compare(report, baseline)
+        self.assertEqual(len(problems), 2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            with open(path, "w") as f:
+                json.dump(baseline, f)
+            with self.assertRaises(CommandError):
+                call_command("bench_engine", "--engines", "minimax", "random", "--depth", "2",
+                             "--positions", "back_rank_mate", "kp_vs_k", "--baseline", path,
+                             stdout=io.StringIO())
+
+    def test_restricted_suite_is_compared_on_the_same_positions(self):
+        report = self.run_small_suite()
+        baseline = json.loads(json.dumps(report))
+        # Position absente de la suite restreinte, qui fausserait les totaux de la référence
+        baseline["engines"]["minimax"]["positions"].append(
+            {"name": "autre", "category": "milieu", "move": "e2e4", "nodes": 10 ** 9, "time_ms": 1.0}
+        )
+        baseline["engines"]["minimax"]["summary"] = benchmark.summarize(baseline["engines"]["minimax"]["positions"])
+        self.assertEqual(benchmark.compare(report, baseline), [])
@@ -9,5 +9,8 @@ urlpatterns = [
     path("api/random-ai-move/", random_ai_move, name="random_ai_move"),
     path("api/minimax-ai-move/", minimax_ai_move, name="minimax_ai_move"),
     path("api/nn-ai-move/", nn_ai_move, name="nn_ai_move"),
+    path("api/ponder-stop/", ponder_stop_view, name="ponder_stop"),
+    path("api/analysis/", analysis_view, name="analysis"),
+    path("metrics/", metrics_view, name="metrics"),
 
 ]
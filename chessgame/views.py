@@ -1,6 +1,8 @@
 import json
+import time
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
@@ -8,11 +10,14 @@ from django.contrib.auth import logout
 from django.contrib.auth.forms import UserCreationForm
 from django.views.decorators.csrf import csrf_exempt
 
-from chessgame.ai.ai_random import *
+from chessgame import analysis, metrics, move_cache
+from chessgame.analysis import analysis_request, bounded_int
+from chessgame.engine_pool import EngineBusy, get_engine_executor
+from chessgame.engines import get_engine, run_engine
+from chessgame.ponder import get_ponder_manager
 
-from chessgame.ai.ai_minimax import *
-
-from chessgame.ai.ai_nn import *
+# Version du modèle seulement : le réseau (et torch) n'est chargé que dans les workers
+from chessgame.ai.nn_registry import get_model_registry
 
 
 def login_view(request):
@@ -52,11 +57,11 @@ def register_view(request):
 
 @login_required
 def game_view(request, room_name=None):
-    mode_param = request.GET.get("mode")  # Ex: "random", "minimax"
+    mode_param = request.GET.get("mode")  # Ex: "random", "minimax", "nn"
 
     if room_name == "vs-bot":
-        if mode_param == "minimax":
-            mode = "minimax"
+        if mode_param in ("minimax", "nn"):
+            mode = mode_param
         else:
             mode = "random"
     else:
@@ -65,6 +70,9 @@ def game_view(request, room_name=None):
     return render(request, "game.html", {
         "mode": mode,
         "room_name": room_name,
+        # Place donnée par l'appariement, ou ?role=spectator pour regarder la partie
+        "ticket": request.GET.get("ticket", ""),
+        "role": request.GET.get("role", ""),
     })
 
 
@@ -75,12 +83,12 @@ def random_ai_move(request):
             data = json.loads(request.body)
             fen = data.get("fen")
 
-            move = get_random_move(fen)
-            if move:
-                return JsonResponse({
-                    "from": move.uci()[:2],
-                    "to": move.uci()[2:4]
-                })
+            start = time.perf_counter()
+            move = get_engine("random")(fen)
+            result = {"from": move.uci()[:2], "to": move.uci()[2:4]} if move else None
+            metrics.record_engine_move("random", result, time.perf_counter() - start)
+            if result:
+                return JsonResponse(result)
             else:
                 return JsonResponse({"error": "No legal moves"}, status=400)
         except Exception as e:
@@ -88,15 +96,52 @@ def random_ai_move(request):
     return JsonResponse({"error": "Méthode non autorisée"}, status=405)
 
 
+def busy_response(engine):
+    metrics.engine_busy.inc(engine=engine)
+    return JsonResponse({"error": "Serveur occupé, réessayez dans un instant"}, status=429)
+
+
 @csrf_exempt
-def minimax_ai_move(request):
+async def minimax_ai_move(request):
     if request.method == "POST":
         data = json.loads(request.body)
         fen = data.get("fen")
         if not fen:
             return JsonResponse({"error": "FEN manquant"}, status=400)
-
-        move = get_minimax_move(fen)
+        try:
+            time_ms = bounded_int(data, "time_ms", settings.ENGINE_TIME_BUDGET_MS)
+            max_depth = bounded_int(data, "max_depth", settings.ENGINE_MAX_DEPTH)
+            threads = bounded_int(data, "threads", settings.ENGINE_SEARCH_THREADS)
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "time_ms, max_depth et threads doivent être des entiers positifs"},
+                                status=400)
+
+        # Partie contre l'IA : identifiant choisi par le client, pour la réflexion
+        game_id = str(data.get("game_id") or "")[:64]
+        ponder = get_ponder_manager() if game_id else None
+
+        start = time.perf_counter()
+        move = await ponder.take(game_id, fen, time_ms) if ponder is not None else None
+        if move is None:
+            key = move_cache.cache_key("alphabeta", fen, depth=max_depth, time_ms=time_ms)
+            move = await move_cache.get_cached_move("alphabeta", key)
+        if move is None:
+            executor = get_engine_executor()
+            # Si le client se déconnecte, la tâche est annulée et la recherche arrêtée
+            try:
+                move = await executor.run(
+                    run_engine, "minimax", fen, depth=max_depth, time_ms=time_ms, threads=threads, cancellable=True
+                )
+            except EngineBusy:
+                return busy_response("alphabeta")
+            await move_cache.store_move(key, move)
+        metrics.record_engine_move("alphabeta", move, time.perf_counter() - start)
+
+        if ponder is not None:
+            if move:
+                ponder.start(get_engine_executor(), game_id, fen, move)
+            else:
+                ponder.cancel(game_id)
         if move:
             return JsonResponse(move)
         return JsonResponse({"error": "Aucun coup possible"}, status=200)
@@ -104,12 +149,69 @@ def minimax_ai_move(request):
 
 
 @csrf_exempt
-def nn_ai_move(request):
+async def nn_ai_move(request):
     if request.method == "POST":
         data = json.loads(request.body)
         fen = data.get("fen")
         if not fen:
             return JsonResponse({"error": "FEN manquant"}, status=400)
 
-        move = get_nn_ai_move(fen)
+        start = time.perf_counter()
+        version = get_model_registry().version
+        key = move_cache.cache_key("nn", fen, depth=settings.NN_SEARCH_DEPTH, model=version)
+        move = await move_cache.get_cached_move("nn", key)
+        if move is None:
+            try:
+                move = await get_engine_executor().run(run_engine, "nn", fen)
+            except EngineBusy:
+                return busy_response("nn")
+            # Le worker n'a peut-être pas encore rechargé un nouveau fichier de poids
+            if move and move.get("model", version) == version:
+                await move_cache.store_move(key, move)
+        metrics.record_engine_move("nn", move, time.perf_counter() - start)
         return JsonResponse(move or {})
+    return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+
+@csrf_exempt
+def ponder_stop_view(request):
+    """Fin d'une partie contre l'IA (nouvelle partie, page fermée) : la réflexion est arrêtée."""
+    if request.method != "POST":
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+    try:
+        game_id = str(json.loads(request.body).get("game_id") or "")[:64]
+    except (ValueError, AttributeError):
+        return JsonResponse({"error": "game_id manquant"}, status=400)
+    ponder = get_ponder_manager()
+    if ponder is not None and game_id:
+        ponder.cancel(game_id)
+    return JsonResponse({})
+
+
+async def ndjson_lines(lines):
+    async for line in lines:
+        yield json.dumps(line) + "\n"
+
+
+@csrf_exempt
+async def analysis_view(request):
+    """
+    Analyse d'une partie ({"pgn": ...}) ou d'une liste de positions ({"fens": [...]}).
+    Les résultats sont envoyés en NDJSON, une ligne par position dès qu'elle est prête.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+    try:
+        positions, options = analysis_request(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    response = StreamingHttpResponse(
+        ndjson_lines(analysis.analyse(positions, **options)), content_type="application/x-ndjson"
+    )
+    response["X-Accel-Buffering"] = "no"  # pas de mise en tampon par un proxy nginx
+    return response
+
+
+def metrics_view(request):
+    """Métriques du serveur pour Prometheus (format texte)."""
+    return HttpResponse(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -100,7 +100,7 @@ document.addEventListener("DOMContentLoaded", function () {
                     highlightKingInCheck();
                     updateTurnStatus();
                     clearHighlights();
-                    sendMessage({type: "move", source, target});
+                    sendMessage({type: "move", uci: source + target + type});
                 }
             };
             overlay.appendChild(img);
@@ -124,7 +124,7 @@ document.addEventListener("DOMContentLoaded", function () {
         highlightKingInCheck();
         updateTurnStatus();
         clearHighlights();
-        sendMessage({type: "move", source, target});
+        sendMessage({type: "move", uci: source + target});
         return true;
     }
 
@@ -151,10 +151,17 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 
     const protocol = window.location.protocol === "https:" ? "wss" : "ws";
-    const socketUrl = `${protocol}://${window.location.host}/ws/chess/`;
+    const roomName = chessboardElement.dataset.roomName;
+    // Couleur attribuée par l'appariement (ticket signé), ou spectateur sur demande
+    const seat = new URLSearchParams();
+    if (chessboardElement.dataset.ticket) seat.set("ticket", chessboardElement.dataset.ticket);
+    else if (chessboardElement.dataset.role) seat.set("role", chessboardElement.dataset.role);
+    const query = seat.toString() ? `?${seat}` : "";
+    const socketUrl = `${protocol}://${window.location.host}/ws/chess/${encodeURIComponent(roomName)}/${query}`;
     let socket = new WebSocket(socketUrl);
 
-    socket.onopen = () => sendMessage({type: "join"});
+    // À la (re)connexion, le serveur renvoie seulement les coups manquants
+    socket.onopen = () => sendMessage({type: "join", since: game.history().length});
     socket.onclose = reconnectWebSocket;
     socket.onerror = console.error;
     socket.onmessage = handleIncomingMessage;
@@ -167,7 +174,7 @@ document.addEventListener("DOMContentLoaded", function () {
 
     function reconnectWebSocket() {
         socket = new WebSocket(socketUrl);
-        socket.onopen = () => sendMessage({type: "join"});
+        socket.onopen = () => sendMessage({type: "join", since: game.history().length});
         socket.onmessage = handleIncomingMessage;
     }
 
@@ -184,15 +191,47 @@ document.addEventListener("DOMContentLoaded", function () {
         }
 
         if (data.type === "move") {
-            const move = game.move({from: data.source, to: data.target, promotion: "q"});
-            if (move) {
-                board.setPosition(game.fen());
-                highlightLastMove(data.source, data.target);
-                highlightKingInCheck();
-                updateTurnStatus();
-                clearHighlights();
+            const known = game.history().length;
+            if (data.seq <= known) return;  // notre propre coup, déjà joué
+            if (data.seq > known + 1) {
+                sendMessage({type: "sync", since: known});
+                return;
             }
+            applyUci(data.uci);
+            refreshBoard();
         }
+
+        if (data.type === "sync") {
+            if (data.since === 0) {
+                game.reset();
+            } else if (data.since !== game.history().length) {
+                sendMessage({type: "sync", since: 0});
+                return;
+            }
+            data.moves.forEach(applyUci);
+            refreshBoard();
+        }
+
+        if (data.type === "illegal") {
+            // Coup refusé par le serveur : on l'annule et on se recale sur lui
+            if (game.history().length > data.seq) game.undo();
+            board.setPosition(game.fen());
+            updateTurnStatus();
+            sendMessage({type: "sync", since: game.history().length});
+        }
+    }
+
+    function applyUci(uci) {
+        return game.move({from: uci.slice(0, 2), to: uci.slice(2, 4), promotion: uci[4] || "q"});
+    }
+
+    function refreshBoard() {
+        board.setPosition(game.fen());
+        const last = game.history({verbose: true}).pop();
+        if (last) highlightLastMove(last.from, last.to);
+        highlightKingInCheck();
+        updateTurnStatus();
+        clearHighlights();
     }
 
     function highlightLastMove(from, to) {
@@ -15,6 +15,8 @@ document.addEventListener("DOMContentLoaded", function () {
     let kingInCheckSquare = null;
     let selectedSquare = null;
     let legalTargetSquares = [];
+    // Identifiant de la partie : le serveur réfléchit pendant notre temps de jeu
+    const gameId = Date.now().toString(36) + Math.random().toString(36).slice(2);
 
     injectStyles();
 
@@ -40,6 +42,17 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 
 
+    /**
+     * Arrête la réflexion du serveur pour cette partie (page quittée, partie finie)
+     */
+    function stopPondering() {
+        navigator.sendBeacon("/api/ponder-stop/", JSON.stringify({game_id: gameId}));
+    }
+
+    if (aiMode === "minimax") {
+        window.addEventListener("pagehide", stopPondering);
+    }
+
     if (backHomeBtn) {
         backHomeBtn.addEventListener("click", () => window.location.href = "/");
     }
@@ -249,6 +262,9 @@ document.addEventListener("DOMContentLoaded", function () {
                         makeRandomAIMove();
                 }
             }, 500);
+        } else if (aiMode === "minimax") {
+            // Le coup du joueur termine la partie : plus de réponse à préparer
+            stopPondering();
         }
         return true;
     }
@@ -299,7 +315,7 @@ document.addEventListener("DOMContentLoaded", function () {
                     "Content-Type": "application/json",
                     "X-CSRFToken": getCSRFToken()
                 },
-                body: JSON.stringify({fen: game.fen()})
+                body: JSON.stringify({fen: game.fen(), game_id: gameId})
             });
 
             const data = await response.json();